@@ -6,10 +6,20 @@ This file configures how the application is built into an executable.
 
 from PyInstaller.utils.hooks import collect_data_files
 import os
+import sys
 
 # Collect data files (exercises)
+# The built-in exercises are packed into a single bundle file, which the app
+# memory-maps instead of opening every .txt file from the bundled data dir.
+sys.path.insert(0, os.path.abspath('.'))
+from typing_trainer.services.bundle import build_bundle
+
 exercises_path = os.path.join('typing_trainer', 'exercises')
-datas = [(exercises_path, 'typing_trainer/exercises')]
+bundle_dir = os.path.join('build', 'exercise_bundle')
+os.makedirs(bundle_dir, exist_ok=True)
+bundle_path = os.path.join(bundle_dir, 'exercises.tpxb')
+build_bundle([exercises_path], bundle_path)
+datas = [(bundle_path, 'typing_trainer/exercises')]
 
 # Collect Textual and Rich data files if needed
 datas += collect_data_files('textual')
@@ -30,12 +40,30 @@ a = Analysis(
         'rich',
         'typing_trainer',
         'typing_trainer.app',
+        'typing_trainer.keyboard_layouts',
         'typing_trainer.models',
+        'typing_trainer.services.bundle',
+        'typing_trainer.services.generator',
+        'typing_trainer.services.history',
+        'typing_trainer.services.keylog',
         'typing_trainer.services.loader',
         'typing_trainer.services.metrics',
+        'typing_trainer.services.mistakes',
+        'typing_trainer.services.ngrams',
+        'typing_trainer.services.profiler',
+        'typing_trainer.services.search',
+        'typing_trainer.services.session',
+        'typing_trainer.services.watcher',
+        'typing_trainer.startup',
+        'typing_trainer.views.about_view',
+        'typing_trainer.views.custom_exercise_view',
+        'typing_trainer.views.exercise_list',
+        'typing_trainer.views.finger_map_view',
+        'typing_trainer.views.finger_map_view_compact',
         'typing_trainer.views.menu_view',
         'typing_trainer.views.typing_view',
         'typing_trainer.views.summary_view',
+        'typing_trainer.views.target_text',
     ],
     hookspath=[],
     hooksconfig={},
@@ -17,11 +17,25 @@ if sys.platform == "win32":
     if sys.stderr.encoding != 'utf-8':
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
+# --serve ADDRESS runs the multi-session server, --connect ADDRESS connects to one
+if len(sys.argv) > 1 and sys.argv[1] in ("--serve", "--connect"):
+    from typing_trainer.server import main as server_main
+    sys.exit(server_main([sys.argv[1][2:]] + sys.argv[2:]))
+
+# --startup-report prints import times and time to first menu paint on exit
+STARTUP_REPORT = "--startup-report" in sys.argv
+if STARTUP_REPORT:
+    sys.argv.remove("--startup-report")
+    from typing_trainer import startup
+    startup.enable()
+
 from typing_trainer.app import main
 
 if __name__ == "__main__":
     try:
         main()
+        if STARTUP_REPORT:
+            print(startup.report.format())
     except KeyboardInterrupt:
         # User pressed Ctrl+C - exit gracefully
         print("\nExiting...")
@@ -1,69 +1,218 @@
 """Main application for the touch typing trainer."""
 
+import os
 import sys
 from pathlib import Path
+from typing import List, Optional
 from textual.app import App
+from . import startup
+from .models import Exercise
 from .views.menu_view import MenuView
-from .views.typing_view import TypingView
-from .views.summary_view import SummaryView
 from .services.loader import ExerciseLoader
 
 
+def get_cache_dir() -> Path:
+    """Get the per-user directory for TouchPy cache files."""
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home())
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "TouchPy"
+
+
+def get_data_dir() -> Path:
+    """Get the per-user directory for TouchPy data files (such as the session history)."""
+    if sys.platform == "win32":
+        base = Path(os.environ.get("APPDATA") or Path.home())
+    else:
+        base = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+    return base / "TouchPy"
+
+
+def get_exercise_dirs() -> List[Path]:
+    """Get the exercise directories: the bundled exercises, then the external ones that override them."""
+    if getattr(sys, 'frozen', False):
+        # Running as compiled .exe
+        if hasattr(sys, '_MEIPASS'):
+            # One-file mode
+            base_path = Path(sys._MEIPASS)
+        else:
+            # One-dir mode (TouchPy.spec uses this)
+            # In one-dir mode, sys.executable points to the exe
+            # The bundled files are relative to the exe directory
+            # But wait, PyInstaller structure for imports...
+            # Usually: dist/TouchPy/typing_trainer/exercises
+            base_path = Path(sys.executable).parent
+
+        internal_dir = base_path / "typing_trainer" / "exercises"
+        
+        # External exercises next to the .exe
+        app_dir = Path(sys.executable).parent
+        external_dir = app_dir / "exercises"
+    else:
+        # Running in development mode
+        internal_dir = Path(__file__).parent / "exercises"
+        app_dir = Path(__file__).parent.parent
+        external_dir = app_dir / "exercises"
+    return [internal_dir, external_dir]
+
+
+def create_loader() -> ExerciseLoader:
+    """Create a loader for both exercise locations, reusing the on-disk index when possible."""
+    index_path = get_cache_dir() / "exercise_index.json"
+    return ExerciseLoader(get_exercise_dirs(), index_path=index_path)
+
+
 class TypingTrainerApp(App):
     """A terminal-based touch typing trainer application."""
     
+    # Seconds between checks of the exercise directories for changes
+    WATCH_INTERVAL = 2.0
+    
     CSS = """
     Screen {
         background: $background;
     }
     """
     
-    def __init__(self):
-        """Initialize the typing trainer app."""
+    def __init__(self, loader: Optional[ExerciseLoader] = None,
+                 exercises: Optional[List[Exercise]] = None, watch: bool = True):
+        """Initialize the typing trainer app.
+        
+        Args:
+            loader: Exercise loader (default: one for the bundled and external
+                exercise directories, see create_loader)
+            exercises: Exercises already loaded with the loader; when given,
+                the menu shows them right away instead of loading again
+            watch: Whether to pick up changes to the exercise directories
+        """
         super().__init__()
         self.title = "Touch Typing Trainer"
         
-        # Set up exercises directories
-        if getattr(sys, 'frozen', False):
-            # Running as compiled .exe
-            if hasattr(sys, '_MEIPASS'):
-                # One-file mode
-                base_path = Path(sys._MEIPASS)
-            else:
-                # One-dir mode (TouchPy.spec uses this)
-                # In one-dir mode, sys.executable points to the exe
-                # The bundled files are relative to the exe directory
-                # But wait, PyInstaller structure for imports...
-                # Usually: dist/TouchPy/typing_trainer/exercises
-                base_path = Path(sys.executable).parent
-
-            internal_dir = base_path / "typing_trainer" / "exercises"
-            
-            # External exercises next to the .exe
-            app_dir = Path(sys.executable).parent
-            external_dir = app_dir / "exercises"
-        else:
-            # Running in development mode
-            internal_dir = Path(__file__).parent / "exercises"
-            app_dir = Path(__file__).parent.parent
-            external_dir = app_dir / "exercises"
-        
-        # Load exercises from both locations
-        self.loader = ExerciseLoader([internal_dir, external_dir])
+        self.loader = loader or create_loader()
+        self.preloaded = exercises
+        self.watching_exercises = watch
+        self.watcher = None
+        # Worker of the last directory check, so checks never overlap
+        self._watch_worker = None
         self.exercises = []
+        
+        # Session history, opened in the background; None until then, or if it cannot be opened
+        self.history = None
+        startup.mark("app constructed")
     
     def on_mount(self) -> None:
-        """Load exercises and show the menu when the app starts."""
-        # Load exercises
-        self.exercises = self.loader.load_exercises()
+        """Show the menu right away and load exercises in the background."""
+        if self.preloaded is not None:
+            self.menu_screen = MenuView(list(self.preloaded))
+            self.push_screen(self.menu_screen)
+            self.run_worker(self._use_preloaded_exercises, thread=True)
+            return
+        self.menu_screen = MenuView([])
+        self.push_screen(self.menu_screen)
+        self.run_worker(self._load_exercises, thread=True)
+    
+    def on_unmount(self) -> None:
+        """Write any pending session history before exiting."""
+        if self.history is not None:
+            self.history.close()
+    
+    def _open_history(self):
+        """Open the session history store, or return None if it cannot be opened."""
+        import sqlite3
+        from .services.history import HistoryStore
+        try:
+            return HistoryStore(get_data_dir() / "history.db")
+        except (OSError, sqlite3.Error):
+            # The app still works, without history
+            return None
+    
+    def _load_exercises(self) -> None:
+        """Load exercises, streaming them into the menu (runs in a worker thread)."""
+        from .services.watcher import ExerciseWatcher
+        from .keyboard_layouts import prewarm_layout_cache
+        
+        self.history = self._open_history()
+        
+        def on_batch(batch, done, total):
+            self.call_from_thread(self.menu_screen.add_exercises, batch, done, total)
+        
+        # Snapshot the directories first so edits made while loading are not missed
+        watcher = ExerciseWatcher(self.loader) if self.watching_exercises else None
+        exercises = self.loader.load_exercises(on_batch=on_batch)
+        if watcher is not None:
+            watcher.set_exercises(exercises)
+        self.watcher = watcher
+        self.call_from_thread(self._on_exercises_loaded, exercises)
+        
+        # Render the keyboard layouts in the background so typing starts on cache hits
+        for layout in sorted({exercise.layout for exercise in exercises}):
+            prewarm_layout_cache(layout)
+    
+    def _use_preloaded_exercises(self) -> None:
+        """Finish starting up with exercises loaded before the app (runs in a worker thread)."""
+        from .services.watcher import ExerciseWatcher
+        
+        self.history = self._open_history()
+        if self.watching_exercises:
+            watcher = ExerciseWatcher(self.loader)
+            watcher.set_exercises(self.preloaded)
+            self.watcher = watcher
+        self.call_from_thread(self._on_exercises_loaded, list(self.preloaded))
+    
+    def _on_exercises_loaded(self, exercises) -> None:
+        """Handle the end of exercise loading."""
+        self.exercises = exercises
+        startup.mark("exercises loaded")
         
         if not self.exercises:
             self.exit(message="No exercises found! Please add .txt files to the exercises/ directory.")
             return
         
-        # Create and push the menu screen
-        menu_screen = MenuView(self.exercises)
-        self.push_screen(menu_screen)
+        # Report files that could not be loaded
+        if self.loader.errors:
+            self._report_errors(self.loader.errors)
+        
+        # Pick up exercises that are added, changed or removed while running
+        if self.watcher is not None:
+            self.set_interval(self.WATCH_INTERVAL, self._poll_exercises)
+    
+    def _report_errors(self, errors) -> None:
+        """Show a warning for exercise files that could not be loaded."""
+        lines = [f"{file_path.name}: {error}" for file_path, error in errors[:5]]
+        if len(errors) > 5:
+            lines.append(f"...and {len(errors) - 5} more")
+        self.notify("\n".join(lines), title="Could not load some exercises", severity="warning", timeout=10)
+    
+    def _poll_exercises(self) -> None:
+        """Check the exercise directories for changes in a worker thread.
+        
+        A tick is skipped while the previous check is still running (a slow or
+        network folder can take longer than WATCH_INTERVAL): cancelling a
+        thread worker does not stop it, so two checks would otherwise update
+        the snapshot at the same time.
+        """
+        if self._watch_worker is not None and not self._watch_worker.is_finished:
+            return
+        self._watch_worker = self.run_worker(self._watch_exercises, thread=True, group="watch")
+    
+    def check_exercises(self) -> None:
+        """Check the exercise directories for changes now (e.g. when a file could not be read)."""
+        if self.watcher is not None:
+            self._poll_exercises()
+    
+    def _watch_exercises(self) -> None:
+        """Apply directory changes to the menu (runs in a worker thread)."""
+        changes = self.watcher.poll()
+        if changes:
+            self.call_from_thread(self._on_exercises_changed, changes)
+    
+    def _on_exercises_changed(self, changes) -> None:
+        """Update the menu with added, updated and removed exercises."""
+        self.menu_screen.apply_changes(changes)
+        self.exercises = self.menu_screen.exercises
+        if changes.errors:
+            self._report_errors(changes.errors)
 
 
 def main():
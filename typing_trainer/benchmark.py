@@ -0,0 +1,483 @@
+"""Headless benchmark of the typing hot path.
+
+Replays synthetic keystroke streams over every exercise through a real
+TypingView in a headless app: each key press goes through the view's change
+handler, so the session, target window, keyboard and stats code (and its
+change tracking) is exactly what runs when typing. The view's profiler
+hooks time each stage. Reports per-keystroke latency percentiles (the
+median over several repeats), allocations and render cost. Results can be
+saved as a baseline and later runs compared against it:
+
+    python -m typing_trainer.benchmark --json baseline.json
+    python -m typing_trainer.benchmark --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import gc
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from rich.console import Console
+from textual.app import App
+from textual.message import Message
+from textual.widgets import Static
+from . import __version__
+from .models import Exercise
+from .services.loader import ExerciseLoader
+from .services.profiler import STAGES as VIEW_STAGES
+from .views.typing_view import TypingView
+
+
+# Bump when the layout of the results changes
+RESULTS_VERSION = 2
+
+# Work done per key press, in order: the view's profiled stages, the rest of
+# its change handler, a stats tick, and turning changed widget content into
+# segments as the widgets would
+STAGES = VIEW_STAGES + ("other", "metrics", "paint_target", "paint_keyboard")
+
+PERCENTILES = (50, 90, 99)
+# Percentiles checked against a baseline; p99 is reported but depends too
+# much on scheduling and garbage collection to fail a run on
+GATED_PERCENTILES = (50, 90)
+
+DEFAULT_SEED = 1
+# Each measurement is the median over this many passes, which keeps single
+# noisy passes from showing up as regressions
+DEFAULT_REPEAT = 3
+# Size of the headless terminal in cells
+DEFAULT_WIDTH = 120
+DEFAULT_HEIGHT = 50
+# Chance of a wrong key, and of correcting it with backspace afterwards
+DEFAULT_ERROR_RATE = 0.04
+DEFAULT_CORRECTION_RATE = 0.5
+# Key presses between stats ticks (about TICK_SECONDS at 60 WPM)
+DEFAULT_TICK_EVERY = 3
+
+# A gated percentile only counts as a regression if its median over the
+# passes grew by more than this fraction of the baseline and by more than
+# MIN_REGRESSION_US. Use a larger --repeat before tightening it.
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_US = 5.0
+
+_WRONG_KEYS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def keystroke_stream(lines: List[str], rng: random.Random, error_rate: float = DEFAULT_ERROR_RATE,
+                     correction_rate: float = DEFAULT_CORRECTION_RATE) -> Iterator[str]:
+    """Generate the content of the input widget after each key press.
+
+    Mostly types the target correctly, with occasional wrong keys that are
+    sometimes erased with backspace and typed again. The input is cleared
+    after each full line, like in the typing view.
+
+    Args:
+        lines: Lines of the exercise
+        rng: Random source (seeded, so runs are repeatable)
+        error_rate: Chance that a key press is wrong
+        correction_rate: Chance that a wrong key press is corrected
+
+    Yields:
+        The complete input text after each key press
+    """
+    for line in lines:
+        typed = ""
+        for position, expected in enumerate(line):
+            if rng.random() < error_rate:
+                wrong = rng.choice(_WRONG_KEYS)
+                if wrong == expected.lower():
+                    wrong = "x" if wrong != "x" else "z"
+                yield typed + wrong
+                # The last key of a line moves on to the next line, so it cannot be corrected
+                if position == len(line) - 1 or rng.random() >= correction_rate:
+                    typed += wrong
+                    continue
+                # Backspace
+                yield typed
+            typed += expected
+            yield typed
+
+
+class StageTimings:
+    """Per-keystroke timings of each stage, in nanoseconds."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[int]] = {stage: [] for stage in STAGES}
+        self.totals: List[int] = []
+
+    def add(self, stage_times: List[int]) -> None:
+        """Record the stage times of one key press (in STAGES order)."""
+        for stage, elapsed in zip(STAGES, stage_times):
+            self.stages[stage].append(elapsed)
+        self.totals.append(sum(stage_times))
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+
+class _BenchmarkApp(App):
+    """Bare app that hosts the typing views being benchmarked."""
+
+    # Sessions are not saved
+    history = None
+
+
+class _BenchmarkTypingView(TypingView):
+    """Typing view that keeps its profiler traces in memory instead of saving them."""
+
+    def _save_trace(self, profiler) -> None:
+        pass
+
+
+class _InputEvent:
+    """Stands in for TextArea.Changed, carrying the input text after a key press."""
+
+    __slots__ = ("text_area", "time")
+
+    class _Input:
+        __slots__ = ("text",)
+
+        def __init__(self, text: str):
+            self.text = text
+
+    def __init__(self, text: str):
+        self.text_area = self._Input(text)
+        # Stamped with Textual's clock, like a real message
+        self.time = Message().time
+
+
+async def run_exercise(pilot, exercise: Exercise, timings: Optional[StageTimings], rng: random.Random,
+                       error_rate: float = DEFAULT_ERROR_RATE, tick_every: int = DEFAULT_TICK_EVERY,
+                       memory: Optional[Dict[str, int]] = None) -> int:
+    """Type one exercise in a real typing view, timing each stage of every key press.
+
+    The view is pushed on the app, and each key press is handed to its
+    on_text_area_changed handler. Stats ticks are run every `tick_every`
+    key presses, and changed widget content is rendered to segments.
+
+    Args:
+        pilot: Pilot of the headless app (see App.run_test)
+        exercise: Exercise to type
+        timings: Timings to add to, or None to run without the profiler
+        rng: Random source for the keystroke stream
+        error_rate: Chance that a key press is wrong
+        tick_every: Key presses between stats updates
+        memory: If given, the key presses run under tracemalloc and this is
+            filled with the "peak" and "retained" bytes traced while typing
+
+    Returns:
+        Number of key presses replayed
+    """
+    app = pilot.app
+    view = _BenchmarkTypingView(exercise)
+    await app.push_screen(view)
+    await pilot.pause()
+    profiler = None
+    if timings is not None:
+        view.action_toggle_profiler()
+        await pilot.pause()
+        profiler = view.profiler
+
+    target_widget = view.query_one("#target_text_container", Static)
+    keyboard_widget = view.query_one("#keyboard_layout", Static)
+    console = Console(file=io.StringIO(), width=app.size.width, color_system="truecolor", legacy_windows=False)
+    target_options = console.options.update_width(target_widget.content_size.width)
+    keyboard_options = console.options.update_width(keyboard_widget.content_size.width)
+    painted_target = target_widget.content
+    painted_keyboard = keyboard_widget.content
+
+    if memory is not None:
+        gc.collect()
+        tracemalloc.start()
+
+    clock = time.perf_counter_ns
+    presses = 0
+    for text in keystroke_stream(view.lines, rng, error_rate):
+        if view.exercise_completed:
+            break
+        painted = profiler.keystroke_count if profiler is not None else 0
+        view.on_text_area_changed(_InputEvent(text))
+        presses += 1
+
+        t0 = clock()
+        if presses % tick_every == 0 and not view.exercise_completed:
+            view._update_metrics_timer()
+        t1 = clock()
+        content = target_widget.content
+        if content is not painted_target:
+            painted_target = content
+            console.render_lines(content, target_options, pad=False)
+        t2 = clock()
+        content = keyboard_widget.content
+        if content is not painted_keyboard:
+            painted_keyboard = content
+            console.render_lines(content, keyboard_options, pad=False)
+        t3 = clock()
+
+        if profiler is not None:
+            profiler.painted()
+            if profiler.keystroke_count > painted:
+                keystroke = profiler.keystrokes[-1]
+                stages = [int(keystroke.stages.get(stage, 0.0) * 1e9) for stage in VIEW_STAGES]
+                handler = int((keystroke.handler_end - keystroke.handler_start) * 1e9)
+                timings.add(stages + [max(0, handler - sum(stages)), t1 - t0, t2 - t1, t3 - t2])
+
+    if memory is not None:
+        memory["retained"], memory["peak"] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Back to an empty screen stack for the next exercise
+    await pilot.pause()
+    while len(app.screen_stack) > 1:
+        await app.pop_screen()
+        await pilot.pause()
+    return presses
+
+
+def percentile(sorted_values: List[int], q: float) -> float:
+    """Get a percentile of sorted values (nearest rank)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return float(sorted_values[rank])
+
+
+def summarize(values_ns: List[int]) -> Dict[str, float]:
+    """Summarize timings as mean, percentiles and max, in microseconds."""
+    values = sorted(values_ns)
+    summary = {"mean": sum(values) / len(values) / 1000 if values else 0.0}
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(values, q) / 1000
+    summary["max"] = values[-1] / 1000 if values else 0.0
+    return summary
+
+
+def _median_summary(summaries: List[Dict[str, float]]) -> Dict[str, float]:
+    """Take the median of each value over the summaries of several passes."""
+    return {key: statistics.median(summary[key] for summary in summaries) for key in summaries[0]}
+
+
+async def measure_memory(pilot, exercises: List[Exercise], seed: int, error_rate: float) -> Dict[str, float]:
+    """Type every exercise once with allocations traced, without the profiler.
+
+    Returns:
+        Peak traced memory while typing a single exercise (KiB), and memory
+        still held after the exercise per key press (bytes)
+    """
+    peak = 0
+    retained = 0
+    presses = 0
+    for exercise in exercises:
+        memory: Dict[str, int] = {}
+        presses += await run_exercise(pilot, exercise, None, random.Random(seed), error_rate, memory=memory)
+        peak = max(peak, memory["peak"])
+        retained += memory["retained"]
+    return {
+        "peak_kib": peak / 1024,
+        "retained_bytes_per_key": retained / presses if presses else 0.0,
+    }
+
+
+def run_benchmark(exercises: List[Exercise], repeat: int = DEFAULT_REPEAT, seed: int = DEFAULT_SEED,
+                  width: int = DEFAULT_WIDTH, error_rate: float = DEFAULT_ERROR_RATE,
+                  memory: bool = True) -> dict:
+    """Benchmark typing every exercise.
+
+    Args:
+        exercises: Exercises to type
+        repeat: Number of passes over all exercises; every reported value is
+            the median over the passes
+        seed: Seed of the keystroke streams
+        width: Width of the headless terminal in cells
+        error_rate: Chance that a key press is wrong
+        memory: Whether to also measure allocations (a separate, slower pass)
+
+    Returns:
+        Results dict (see RESULTS_VERSION), suitable for saving as JSON
+    """
+    return asyncio.run(_run_benchmark(exercises, max(repeat, 1), seed, width, error_rate, memory))
+
+
+async def _run_benchmark(exercises: List[Exercise], repeat: int, seed: int, width: int,
+                         error_rate: float, memory: bool) -> dict:
+    """Run the passes of run_benchmark in one headless app."""
+    app = _BenchmarkApp()
+    passes: List[Tuple[StageTimings, Dict[str, StageTimings]]] = []
+    async with app.run_test(size=(width, DEFAULT_HEIGHT)) as pilot:
+        for _ in range(repeat):
+            timings = StageTimings()
+            per_exercise: Dict[str, StageTimings] = {}
+            for exercise in exercises:
+                exercise_timings = per_exercise.setdefault(exercise.id, StageTimings())
+                gc.collect()
+                await run_exercise(pilot, exercise, exercise_timings, random.Random(seed), error_rate)
+                for stage in STAGES:
+                    timings.stages[stage].extend(exercise_timings.stages[stage])
+                timings.totals.extend(exercise_timings.totals)
+            passes.append((timings, per_exercise))
+        memory_results = await measure_memory(pilot, exercises, seed, error_rate) if memory else None
+
+    latency = {
+        stage: _median_summary([summarize(timings.stages[stage]) for timings, _ in passes])
+        for stage in STAGES
+    }
+    latency["total"] = _median_summary([summarize(timings.totals) for timings, _ in passes])
+    results = {
+        "version": RESULTS_VERSION,
+        "touchpy": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"repeat": repeat, "seed": seed, "width": width, "error_rate": error_rate},
+        "exercises": len(exercises),
+        "keystrokes": len(passes[0][0]),
+        "latency_us": latency,
+        "per_exercise": {
+            exercise.id: _median_summary([summarize(per_exercise[exercise.id].totals)
+                                          for _, per_exercise in passes])
+            for exercise in exercises
+        },
+    }
+    if memory_results is not None:
+        results["memory"] = memory_results
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Compare results against a baseline.
+
+    Compares the GATED_PERCENTILES (medians over the passes of each run, so
+    both runs should use a --repeat of 3 or more) and the memory figures.
+
+    Args:
+        results: Results of this run
+        baseline: Results of an earlier run
+        tolerance: Allowed growth as a fraction of the baseline
+
+    Returns:
+        One message per regressed measurement (empty if none regressed)
+    """
+    regressions = []
+    for stage, summary in results["latency_us"].items():
+        old = baseline.get("latency_us", {}).get(stage)
+        if not old:
+            continue
+        for key in [f"p{q}" for q in GATED_PERCENTILES]:
+            if key not in old:
+                continue
+            new_value, old_value = summary[key], old[key]
+            if new_value > old_value * (1 + tolerance) and new_value - old_value > MIN_REGRESSION_US:
+                regressions.append(f"{stage} {key}: {old_value:.1f} -> {new_value:.1f} us")
+
+    old_memory = baseline.get("memory")
+    new_memory = results.get("memory")
+    if old_memory and new_memory:
+        for key in ("peak_kib", "retained_bytes_per_key"):
+            new_value, old_value = new_memory[key], old_memory.get(key)
+            if old_value is not None and new_value > old_value * (1 + tolerance) and new_value - old_value > 1:
+                regressions.append(f"memory {key}: {old_value:.1f} -> {new_value:.1f}")
+    return regressions
+
+
+def format_results(results: dict, slowest: int = 5) -> str:
+    """Format results as a text report.
+
+    Args:
+        results: Results from run_benchmark
+        slowest: Number of exercises to list by p99 latency
+
+    Returns:
+        The report as text
+    """
+    lines = [
+        f"TouchPy {results['touchpy']} on Python {results['python']}",
+        f"{results['exercises']} exercises, {results['keystrokes']} key presses per pass, "
+        f"median of {results['settings']['repeat']} pass{'es' if results['settings']['repeat'] != 1 else ''}",
+        "",
+        f"  {'stage':<15}" + "".join(f"{name:>10}" for name in ["mean", *[f"p{q}" for q in PERCENTILES], "max"]) + "   (us)",
+    ]
+    for stage, summary in results["latency_us"].items():
+        values = [summary["mean"], *[summary[f"p{q}"] for q in PERCENTILES], summary["max"]]
+        lines.append(f"  {stage:<15}" + "".join(f"{value:10.1f}" for value in values))
+
+    memory = results.get("memory")
+    if memory:
+        lines.append("")
+        lines.append(f"Peak memory per exercise: {memory['peak_kib']:.1f} KiB, "
+                     f"retained: {memory['retained_bytes_per_key']:.1f} bytes per key press")
+
+    by_p99 = sorted(results["per_exercise"].items(), key=lambda item: item[1]["p99"], reverse=True)
+    if by_p99:
+        lines.append("")
+        lines.append("Slowest exercises (p99 per key press):")
+        for exercise_id, summary in by_p99[:slowest]:
+            lines.append(f"  {summary['p99']:8.1f} us  {exercise_id}")
+    return "\n".join(lines)
+
+
+def load_exercises(dirs: List[Path]) -> Tuple[List[Exercise], list]:
+    """Load the exercises to benchmark.
+
+    Returns:
+        Tuple of (exercises, list of (path, error message))
+    """
+    loader = ExerciseLoader(dirs)
+    return loader.load_exercises(), loader.errors
+
+
+def main(argv=None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the TouchPy typing hot path headlessly.")
+    parser.add_argument("dirs", nargs="*", type=Path,
+                        help="Directories with exercises (default: the bundled exercises)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Passes over all exercises; values are medians over the passes (default %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed of the keystroke streams")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="Headless terminal width in cells")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE, help="Chance of a wrong key")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the allocation pass")
+    parser.add_argument("--json", type=Path, help="Write the results to this file (e.g. to use as a baseline)")
+    parser.add_argument("--baseline", type=Path, help="Compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed growth over the baseline as a fraction (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    dirs = args.dirs or [Path(__file__).parent / "exercises"]
+    exercises, errors = load_exercises(dirs)
+    for file_path, error in errors:
+        print(f"Warning: Could not load {file_path}: {error}", file=sys.stderr)
+    if not exercises:
+        print("No exercises found.", file=sys.stderr)
+        return 2
+
+    results = run_benchmark(exercises, repeat=args.repeat, seed=args.seed, width=args.width,
+                            error_rate=args.error_rate, memory=not args.no_memory)
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print("")
+        if regressions:
+            print(f"Regressions against {args.baseline}:")
+            for message in regressions:
+                print(f"  {message}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,95 +1,298 @@
-import re
+import threading
+from collections import OrderedDict, namedtuple
 from rich.text import Text
-from .views.finger_map_view_compact import FINGER_MAP_ENGLISH, FINGER_MAP_NORWEGIAN
+
+
+# Labels used for the space bar in the finger maps
+SPACE_LABELS = ("SPACE BAR", "MELLOMROMSTAST")
+
+ERROR_STYLE = "white on red"
+HIGHLIGHT_STYLE = "white on blue"
+
+# Default number of rendered layouts kept by the layout cache
+LAYOUT_CACHE_SIZE = 512
+
+LayoutCacheInfo = namedtuple("LayoutCacheInfo", ["hits", "misses", "evictions", "currsize", "maxsize"])
+
+
+class KeyboardModel:
+    """A finger map parsed once into a base Text and the spans of each key cell.
+
+    Highlighting a key is then a matter of copying the base Text and adding
+    a style span over the key's cells, with no markup parsing per frame.
+    """
+
+    def __init__(self, markup: str):
+        """Parse a finger map.
+
+        Args:
+            markup: The finger map as a string with Rich markup
+        """
+        self.text = Text.from_markup(markup)
+        self.key_cells = {}
+        self.space_cells = []
+
+        plain = self.text.plain
+        for span in self.text.spans:
+            # Key cells sit right after a border: │[color]  X [/color] │
+            if span.start == 0 or plain[span.start - 1] != "│":
+                continue
+            cell = plain[span.start:span.end]
+            if len(cell) in (4, 5) and cell.startswith("  ") and cell[2] != " " and not cell[3:].strip():
+                self.key_cells.setdefault(cell[2], []).append((span.start, span.end))
+            elif len(cell) == 1:
+                self.key_cells.setdefault(cell, []).append((span.start, span.end))
+
+        for label in SPACE_LABELS:
+            start = plain.find(label)
+            while start != -1:
+                self.space_cells.append((start, start + len(label)))
+                start = plain.find(label, start + len(label))
+
+    def cells_for(self, char):
+        """Get the cells of a key, matching both upper and lower case.
+
+        Args:
+            char: Character on the key
+
+        Returns:
+            List of (start, end) offsets into the base Text
+        """
+        if char == " ":
+            return self.space_cells
+        if not char or not char.strip():
+            return []
+        cells = []
+        for ch in {char.upper(), char.lower()}:
+            cells.extend(self.key_cells.get(ch, ()))
+        return cells
+
+    def normalize_key(self, char):
+        """Map a character to a canonical key with the same highlighting.
+
+        Upper and lower case share a key, and characters that are not on
+        the layout normalize to None.
+
+        Args:
+            char: Character to normalize
+
+        Returns:
+            Canonical key character, or None if highlighting it is a no-op
+        """
+        if char == " ":
+            return " " if self.space_cells else None
+        if not char or not char.strip():
+            return None
+        lower = char.lower()
+        if lower in self.key_cells or char.upper() in self.key_cells:
+            return lower
+        return None
+
+    def keys(self):
+        """Get the canonical keys that can be highlighted on this layout."""
+        keys = {self.normalize_key(ch) for ch in self.key_cells}
+        if self.space_cells:
+            keys.add(" ")
+        keys.discard(None)
+        return sorted(keys)
+
+
+class LayoutCache:
+    """Bounded LRU cache of rendered keyboard layouts.
+
+    Rendered Text objects are shared between callers and must not be
+    modified. The cache is thread safe so it can be prewarmed in the
+    background.
+    """
+
+    def __init__(self, maxsize=LAYOUT_CACHE_SIZE):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of rendered layouts to keep
+        """
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Look up a rendered layout and mark it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached Text, or None on a miss
+        """
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        """Store a rendered layout, evicting the least recently used if full.
+
+        Args:
+            key: Cache key
+            text: Rendered layout
+        """
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def info(self):
+        """Get cache statistics.
+
+        Returns:
+            LayoutCacheInfo with hit, miss and eviction counters
+        """
+        with self._lock:
+            return LayoutCacheInfo(self.hits, self.misses, self.evictions, len(self._entries), self.maxsize)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+# Parsed on first use of each layout
+_MODELS = {}
+_models_lock = threading.Lock()
+
+_cache = LayoutCache()
+
+
+def _layout_name(name):
+    """Normalize a layout name to a key of _MODELS."""
+    if name and name.lower() == "norwegian":
+        return "Norwegian"
+    return "English"
+
+
+def get_model(name):
+    """Get the parsed keyboard model for a layout name.
+
+    Args:
+        name: Layout name ("English" or "Norwegian")
+
+    Returns:
+        KeyboardModel for the layout (English if the name is unknown)
+    """
+    name = _layout_name(name)
+    model = _MODELS.get(name)
+    if model is None:
+        with _models_lock:
+            model = _MODELS.get(name)
+            if model is None:
+                # The finger map markup is only imported when a layout is needed
+                from .views import finger_map_view_compact
+                markup = {
+                    "English": finger_map_view_compact.FINGER_MAP_ENGLISH,
+                    "Norwegian": finger_map_view_compact.FINGER_MAP_NORWEGIAN,
+                }[name]
+                model = _MODELS[name] = KeyboardModel(markup)
+    return model
 
 
 def get_layout(name, highlight_key=None, error_keys=None):
     """Get the keyboard layout with optional highlighting.
-    
+
+    Results are memoized in an LRU cache keyed by layout, normalized
+    highlight key and the set of error keys. The returned Text is shared
+    and must not be modified.
+
     Args:
         name: Layout name ("English" or "Norwegian")
         highlight_key: Character to highlight as next key to press
         error_keys: List of characters to highlight as error keys
-        
+
     Returns:
         Rich Text object with the keyboard layout
     """
-    # Get the appropriate finger map
-    if name and name.lower() == "norwegian":
-        layout_str = FINGER_MAP_NORWEGIAN
-    else:
-        layout_str = FINGER_MAP_ENGLISH
-    
-    # Track if space should be highlighted
-    space_style = None
-    
+    layout_name = _layout_name(name)
+    model = get_model(layout_name)
+
+    highlight = model.normalize_key(highlight_key)
+    errors = frozenset(model.normalize_key(ch) for ch in error_keys or ()) - {None}
+    key = (layout_name, highlight, errors)
+
+    text = _cache.get(key)
+    if text is None:
+        text = _render_layout(model, highlight, errors)
+        _cache.put(key, text)
+    return text
+
+
+def _render_layout(model, highlight_key, error_keys):
+    """Render a keyboard layout with highlighting.
+
+    Args:
+        model: KeyboardModel to render
+        highlight_key: Character to highlight as next key to press
+        error_keys: Characters to highlight as error keys
+
+    Returns:
+        Rich Text object with the keyboard layout
+    """
+    text = model.text.copy()
+
     # Apply error highlighting first (red background)
-    if error_keys:
-        for char in error_keys:
-            if not char:
-                continue
-            
-            # Handle space - mark for later
-            if char == ' ':
-                space_style = "white on red"
-                continue
-            
-            if not char.strip():
-                continue
-            
-            # Try both upper and lower case
-            for ch in [char.upper(), char.lower()]:
-                layout_str = _highlight_char(layout_str, ch, "white on red")
-    
-    # Apply next key highlighting (blue background with white text) - this takes precedence
+    for char in error_keys:
+        for start, end in model.cells_for(char):
+            text.stylize(ERROR_STYLE, start, end)
+
+    # Apply next key highlighting (blue background) - added last so it takes precedence
     if highlight_key:
-        if highlight_key == ' ':
-            # Highlight space bar (overrides error style if set)
-            space_style = "white on blue"
-        elif highlight_key.strip():
-            # Try both upper and lower case
-            for ch in [highlight_key.upper(), highlight_key.lower()]:
-                layout_str = _highlight_char(layout_str, ch, "white on blue")
-    
-    # Apply space bar highlighting if needed
-    if space_style:
-        layout_str = layout_str.replace("MELLOMROMSTAST", f"[{space_style}]MELLOMROMSTAST[/{space_style}]")
-        layout_str = layout_str.replace("SPACE BAR", f"[{space_style}]SPACE BAR[/{space_style}]")
-    
-    # Convert to Rich Text object
-    from rich.markup import render
-    return Text.from_markup(layout_str)
-
-
-def _highlight_char(layout_str, char, style):
-    """Helper function to highlight a specific character in the layout.
-    
+        for start, end in model.cells_for(highlight_key):
+            text.stylize(HIGHLIGHT_STYLE, start, end)
+
+    return text
+
+
+def prewarm_layout_cache(name, error_keys=None):
+    """Render the layout once for every key so later lookups are cache hits.
+
+    Meant to be run in a background thread at app start.
+
     Args:
-        layout_str: The layout string with Rich markup
-        char: Character to highlight  
-        style: Rich style to apply (e.g., "white on blue")
-        
+        name: Layout name ("English" or "Norwegian")
+        error_keys: Error keys to combine with each highlight key
+
+    Returns:
+        Number of layouts rendered
+    """
+    layout_name = _layout_name(name)
+    model = get_model(layout_name)
+    errors = frozenset(model.normalize_key(ch) for ch in error_keys or ()) - {None}
+
+    rendered = 0
+    for highlight in [None] + model.keys():
+        key = (layout_name, highlight, errors)
+        if key not in _cache:
+            _cache.put(key, _render_layout(model, highlight, errors))
+            rendered += 1
+    return rendered
+
+
+def layout_cache_info():
+    """Get hit, miss and eviction counters of the layout render cache.
+
     Returns:
-        Modified layout string
+        LayoutCacheInfo named tuple
     """
-    # Escape special regex characters
-    escaped_char = re.escape(char)
-    
-    # Pattern to match the character within any color tag
-    # The structure is: │[color]  CHAR [/color] │ (2 spaces before, 1 space after)
-    # Or: │[color]  CHAR  [/color]│ (2 spaces before, 2 spaces after)
-    
-    # Try to find and replace the character with various spacing patterns
-    patterns = [
-        # Standard pattern: │[color]  CHAR [/color] │
-        (rf'│\[[a-z]+\](  {escaped_char} )\[/[a-z]+\] │', rf'│[{style}]\1[/{style}] │'),
-        # Alternative: │[color]  CHAR  [/color]│
-        (rf'│\[[a-z]+\](  {escaped_char}  )\[/[a-z]+\]│', rf'│[{style}]\1[/{style}]│'),
-        # For special keys like TAB, CAPS, SHIFT, BKSP, ENTER
-        (rf'│\[[a-z]+\]({escaped_char})\[/[a-z]+\] │', rf'│[{style}]\1[/{style}] │'),
-    ]
-    
-    for pattern, replacement in patterns:
-        layout_str = re.sub(pattern, replacement, layout_str, flags=re.IGNORECASE)
-    
-    return layout_str
+    return _cache.info()
@@ -1,27 +1,163 @@
 """Data models for the typing trainer application."""
 
-from dataclasses import dataclass
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
+
+
+# Number of recently opened exercise texts kept in memory
+TEXT_CACHE_SIZE = 8
+
+
+def decode_exercise_body(data: bytes) -> str:
+    """Decode the raw bytes of an exercise body into its text.
+
+    Args:
+        data: UTF-8 encoded body (everything after the title line)
+
+    Returns:
+        The exercise text with normalized newlines and surrounding whitespace stripped
+    """
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+class TextCache:
+    """Small LRU cache of exercise texts keyed by (source path, body offset)."""
+
+    def __init__(self, maxsize: int = TEXT_CACHE_SIZE):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of texts to keep
+        """
+        self.maxsize = maxsize
+        self._texts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        """Get a cached text and mark it as recently used."""
+        with self._lock:
+            text = self._texts.get(key)
+            if text is not None:
+                self._texts.move_to_end(key)
+            return text
+
+    def put(self, key, text: str) -> None:
+        """Store a text, evicting the least recently used one if full."""
+        with self._lock:
+            self._texts[key] = text
+            self._texts.move_to_end(key)
+            while len(self._texts) > self.maxsize:
+                self._texts.popitem(last=False)
+
+    def discard(self, source_path) -> None:
+        """Forget every cached text read from a file (e.g. after it changed)."""
+        with self._lock:
+            for key in [key for key in self._texts if key[0] == source_path]:
+                del self._texts[key]
+
+    def clear(self) -> None:
+        """Remove all cached texts."""
+        with self._lock:
+            self._texts.clear()
+
+
+text_cache = TextCache()
 
 
-@dataclass
 class Exercise:
     """Represents a typing exercise.
-    
+
+    Only metadata is stored. The text is read from the source file when it
+    is accessed, and kept in a small shared cache of recently opened texts.
+
     Attributes:
         id: Unique identifier for the exercise (typically the filename)
         title: Display title of the exercise
-        text: The text content to type
         source_path: Path to the source file
         layout: The keyboard layout to use (e.g. "English", "Norwegian")
+        body_offset: Byte offset of the text in the source file
+        word_count: Number of words in the exercise text
+        char_count: Number of characters in the exercise text
+        store: Optional object with read_text(offset, length) holding the text
+            (e.g. a memory-mapped bundle) instead of a plain text file
+        body_length: Length of the text in bytes within the store
+        source_mtime_ns: Modification time of the source file when it was loaded
+        source_size: Size of the source file in bytes when it was loaded
     """
-    id: str
-    title: str
-    text: str
-    source_path: Path
-    layout: str = "English"
-    
+
+    __slots__ = ("id", "title", "source_path", "layout", "body_offset",
+                 "word_count", "char_count", "store", "body_length",
+                 "source_mtime_ns", "source_size", "_text")
+
+    def __init__(self, id: str, title: str, text: Optional[str] = None,
+                 source_path: Optional[Path] = None, layout: str = "English",
+                 body_offset: int = 0, word_count: Optional[int] = None,
+                 char_count: Optional[int] = None, store=None, body_length: int = 0,
+                 source_mtime_ns: Optional[int] = None, source_size: Optional[int] = None):
+        """Initialize an exercise record.
+
+        Args:
+            id: Unique identifier for the exercise
+            title: Display title of the exercise
+            text: Text to keep in memory for exercises that have no source file
+            source_path: Path to the source file
+            layout: The keyboard layout to use
+            body_offset: Byte offset of the text in the source file
+            word_count: Number of words in the text (computed if not given)
+            char_count: Number of characters in the text (computed if not given)
+            store: Object to read the text from instead of source_path
+            body_length: Length of the text in bytes within the store
+            source_mtime_ns: Modification time of the source file, to detect
+                that it changed before the text is read (not checked if None)
+            source_size: Size of the source file in bytes (not checked if None)
+        """
+        self.id = id
+        self.title = title
+        self.source_path = source_path
+        self.layout = layout
+        self.body_offset = body_offset
+        self.store = store
+        self.body_length = body_length
+        self.source_mtime_ns = source_mtime_ns
+        self.source_size = source_size
+        self._text = text
+
+        if text is not None:
+            if word_count is None:
+                word_count = len(text.split())
+            if char_count is None:
+                char_count = len(text)
+        self.word_count = word_count
+        self.char_count = char_count
+
+    def __repr__(self) -> str:
+        return f"Exercise(id={self.id!r}, title={self.title!r}, layout={self.layout!r})"
+
     @property
-    def word_count(self) -> int:
-        """Calculate the number of words in the exercise text."""
-        return len(self.text.split())
+    def text(self) -> str:
+        """The text content to type, loaded on demand.
+
+        Raises:
+            OSError: If the source file cannot be read, or changed since it was
+                loaded (so body_offset may no longer point at the text)
+        """
+        if self._text is not None:
+            return self._text
+        if self.store is not None:
+            return self.store.read_text(self.body_offset, self.body_length)
+
+        key = (self.source_path, self.body_offset)
+        text = text_cache.get(key)
+        if text is None:
+            with open(self.source_path, 'rb') as f:
+                if self.source_size is not None:
+                    stat = os.fstat(f.fileno())
+                    if stat.st_size != self.source_size or stat.st_mtime_ns != self.source_mtime_ns:
+                        raise OSError(f"{self.source_path.name} changed since it was loaded")
+                f.seek(self.body_offset)
+                text = decode_exercise_body(f.read())
+            text_cache.put(key, text)
+        return text
@@ -0,0 +1,609 @@
+"""Multi-session server: serves the trainer to many terminals from one preloaded process.
+
+The server loads the exercise library (with the texts in a read-only shared
+mapping), renders the keyboard layouts and imports every screen once, then
+forks a process per connection. The forked sessions share that state
+copy-on-write (gc.freeze keeps the garbage collector from touching it), so
+each one only adds its own session state.
+Each session runs the app on a pseudo-terminal relayed over the connection,
+under a memory limit, and the number of sessions is capped.
+
+Clients connect with the `connect` command, which bridges the local terminal
+to the server. For SSH access, point the account's ForceCommand at it:
+
+    python -m typing_trainer.server serve /run/touchpy.sock
+    python -m typing_trainer.server connect /run/touchpy.sock
+
+On a Unix socket each session's history is recorded under the connecting
+process's account (SO_PEERCRED). Over TCP the server cannot tell who is
+connecting: the user name a client sends is only used with
+--trust-client-user, otherwise TCP sessions are recorded under the account
+running the server.
+
+Linux and other POSIX systems only.
+"""
+
+import argparse
+import errno
+import gc
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import threading
+from typing import List, Optional, Set, Tuple
+
+
+DEFAULT_MAX_SESSIONS = 120
+# Address space limit of a session in MiB (threads reserve address space
+# for their stacks and malloc arenas, so this is well above actual use)
+DEFAULT_SESSION_MEMORY_MB = 1024
+# Seconds a new connection has to send its hello before it is dropped, so
+# idle sockets cannot hold on to session slots
+HELLO_TIMEOUT = 10.0
+# Permissions of a Unix socket: every account may connect, since sessions are
+# recorded under the connecting account anyway (0o660 limits it to a group)
+DEFAULT_SOCKET_MODE = 0o666
+
+# Client to server frames: a type byte and payload length, then the payload.
+# Server to client traffic is the raw terminal output.
+_FRAME = struct.Struct("!cI")
+_HELLO = b"h"   # JSON: term, colorterm, cols, rows, user
+_DATA = b"d"    # Keyboard input
+_RESIZE = b"r"  # !HH: cols, rows
+_WINSIZE = struct.Struct("HHHH")
+
+_MAX_FRAME = 1 << 20
+_BUFFER_SIZE = 65536
+
+
+def parse_address(address: str):
+    """Parse a server address.
+
+    Args:
+        address: Path of a Unix socket, or HOST:PORT for TCP
+
+    Returns:
+        Tuple of (socket family, address for bind/connect)
+    """
+    if ":" in address and not address.startswith(("/", ".")):
+        host, _, port = address.rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def encode_frame(kind: bytes, payload: bytes = b"") -> bytes:
+    """Encode a client to server frame."""
+    return _FRAME.pack(kind, len(payload)) + payload
+
+
+class FrameReader:
+    """Splits the client byte stream back into frames."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[bytes, bytes]]:
+        """Add received bytes and return the frames completed by them.
+
+        Raises:
+            ValueError: If a frame is larger than allowed
+        """
+        self._buffer += data
+        frames = []
+        while len(self._buffer) >= _FRAME.size:
+            kind, length = _FRAME.unpack_from(self._buffer)
+            if length > _MAX_FRAME:
+                raise ValueError("Frame too large")
+            end = _FRAME.size + length
+            if len(self._buffer) < end:
+                break
+            frames.append((kind, bytes(self._buffer[_FRAME.size:end])))
+            del self._buffer[:end]
+        return frames
+
+
+def _set_winsize(fd: int, cols: int, rows: int) -> None:
+    """Set the size of a terminal."""
+    import fcntl
+    import termios
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, _WINSIZE.pack(rows, cols, 0, 0))
+
+
+def _read_hello(conn: socket.socket, reader: FrameReader) -> Tuple[dict, List[Tuple[bytes, bytes]]]:
+    """Read the hello frame a client starts with.
+
+    Returns:
+        Tuple of (hello dict, frames received after it)
+
+    Raises:
+        ConnectionError: If the client closed the connection first
+        socket.timeout: If the hello did not arrive within the socket's timeout
+        ValueError: If the client sent something other than a valid hello
+    """
+    frames = []
+    while not frames:
+        data = conn.recv(_BUFFER_SIZE)
+        if not data:
+            raise ConnectionError("Client closed the connection")
+        frames = reader.feed(data)
+    kind, payload = frames[0]
+    if kind != _HELLO:
+        raise ValueError("Expected a hello frame")
+    hello = json.loads(payload.decode("utf-8"))
+    if not isinstance(hello, dict):
+        raise ValueError("Hello is not an object")
+    try:
+        hello["cols"] = max(1, min(int(hello.get("cols", 80)), 1000))
+        hello["rows"] = max(1, min(int(hello.get("rows", 24)), 1000))
+    except (TypeError, ValueError):
+        raise ValueError("Bad terminal size in hello") from None
+    for key in ("term", "colorterm", "user"):
+        if not isinstance(hello.get(key, ""), str):
+            raise ValueError(f"Bad {key} in hello")
+    return hello, frames[1:]
+
+
+def _peer_user(conn: socket.socket) -> Optional[str]:
+    """Get the login name of the process on the other end of a Unix socket."""
+    if conn.family != socket.AF_UNIX or not hasattr(socket, "SO_PEERCRED"):
+        return None
+    try:
+        import pwd
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return pwd.getpwuid(uid).pw_name
+    except (OSError, KeyError):
+        return None
+
+
+class SharedState:
+    """State loaded once by the server and shared by every session."""
+
+    def __init__(self, shared_store: bool = True):
+        """Load the exercises, prebuild layouts and import the screens.
+
+        Args:
+            shared_store: Whether to move the exercise texts into a read-only
+                shared mapping (see share_exercises), instead of each session
+                reading them from the exercise files
+        """
+        from .app import create_loader
+        from .keyboard_layouts import prewarm_layout_cache
+        from .services.bundle import share_exercises
+
+        self.loader = create_loader()
+        self.exercises = self.loader.load_exercises()
+        if shared_store:
+            self.exercises = share_exercises(self.exercises)
+        for layout in sorted({exercise.layout for exercise in self.exercises}):
+            prewarm_layout_cache(layout)
+
+        # Import the screens now, so sessions do not each import them
+        from .views import about_view, custom_exercise_view, finger_map_view, summary_view, typing_view  # noqa: F401
+        from .services import generator, history  # noqa: F401
+
+
+class SessionServer:
+    """Accepts connections and runs each session in a forked process."""
+
+    def __init__(self, address: str, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 session_memory_mb: Optional[int] = DEFAULT_SESSION_MEMORY_MB,
+                 shared_store: bool = True, trust_client_user: bool = False,
+                 socket_mode: int = DEFAULT_SOCKET_MODE):
+        """Initialize the server.
+
+        Args:
+            address: Unix socket path or HOST:PORT to listen on
+            max_sessions: Maximum number of concurrent sessions
+            session_memory_mb: Address space limit per session in MiB (None = no limit)
+            shared_store: Whether sessions read exercise texts from one shared mapping
+            trust_client_user: Whether to record TCP sessions under the user name
+                the client sends (which any client can choose freely)
+            socket_mode: Permission bits of a Unix socket (connecting needs write permission)
+        """
+        self.address = address
+        self.max_sessions = max_sessions
+        self.session_memory_mb = session_memory_mb
+        self.shared_store = shared_store
+        self.trust_client_user = trust_client_user
+        self.socket_mode = socket_mode
+        self.sessions: Set[int] = set()
+        self.shared: Optional[SharedState] = None
+        self._listener: Optional[socket.socket] = None
+        self._stopping = False
+
+    def serve_forever(self) -> None:
+        """Preload the shared state, then accept connections until interrupted."""
+        self.shared = SharedState(self.shared_store)
+        print(f"Loaded {len(self.shared.exercises)} exercises"
+              f"{' into shared memory' if self.shared_store else ''}")
+
+        # Everything loaded so far is shared with the sessions; keep the
+        # garbage collector from writing to (and so copying) those pages
+        gc.collect()
+        gc.freeze()
+
+        self._listener = self._listen()
+        print(f"Serving on {self.address} (up to {self.max_sessions} sessions)")
+        signal.signal(signal.SIGTERM, self._on_terminate)
+
+        selector = selectors.DefaultSelector()
+        selector.register(self._listener, selectors.EVENT_READ)
+        try:
+            while not self._stopping:
+                if selector.select(timeout=1.0):
+                    conn, _ = self._listener.accept()
+                    self._accept(conn)
+                self._reap()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            selector.close()
+            self.close()
+
+    def close(self) -> None:
+        """Stop listening and end every session."""
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            family, address = parse_address(self.address)
+            if family == socket.AF_UNIX:
+                try:
+                    os.unlink(address)
+                except OSError:
+                    pass
+        for pid in list(self.sessions):
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.sessions):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.sessions.clear()
+
+    def _on_terminate(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _listen(self) -> socket.socket:
+        """Open the listening socket."""
+        family, address = parse_address(self.address)
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            try:
+                os.unlink(address)
+            except FileNotFoundError:
+                pass
+        else:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(address)
+        if family == socket.AF_UNIX:
+            # The socket is created with the server's umask, which usually
+            # keeps other accounts from connecting
+            os.chmod(address, self.socket_mode)
+        listener.listen(64)
+        return listener
+
+    def _accept(self, conn: socket.socket) -> None:
+        """Start a session for a new connection, unless the server is full."""
+        if len(self.sessions) >= self.max_sessions:
+            try:
+                conn.sendall(f"TouchPy server is full ({self.max_sessions} sessions). "
+                             f"Please try again later.\r\n".encode("utf-8"))
+                # Read the client's hello, so closing does not reset the
+                # connection before the message arrives
+                conn.shutdown(socket.SHUT_WR)
+                conn.settimeout(0.5)
+                conn.recv(_BUFFER_SIZE)
+            except OSError:
+                pass
+            conn.close()
+            return
+
+        pid = os.fork()
+        if pid == 0:
+            # Session process
+            status = 1
+            try:
+                self._listener.close()
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                status = run_session(conn, self.shared, self.session_memory_mb, self.trust_client_user)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+
+        conn.close()
+        self.sessions.add(pid)
+        print(f"Session {pid} started ({len(self.sessions)} active)")
+
+    def _reap(self) -> None:
+        """Collect sessions that have ended."""
+        while self.sessions:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.sessions.clear()
+                return
+            if pid == 0:
+                return
+            if pid in self.sessions:
+                self.sessions.discard(pid)
+                print(f"Session {pid} ended ({len(self.sessions)} active)")
+
+
+def run_session(conn: socket.socket, shared: SharedState, memory_mb: Optional[int],
+                trust_client_user: bool = False) -> int:
+    """Run one session in a forked process.
+
+    The app runs on a new pseudo-terminal that becomes the process's
+    controlling terminal, and a thread relays between it and the connection.
+    Connections that do not send a valid hello within HELLO_TIMEOUT seconds
+    are closed without starting the app.
+
+    Args:
+        conn: The client connection
+        shared: State preloaded by the server
+        memory_mb: Address space limit in MiB (None = no limit)
+        trust_client_user: Whether to use the user name from the hello when the
+            peer's account cannot be checked (TCP)
+
+    Returns:
+        Exit status for the process
+    """
+    import pty
+    import resource
+    import termios
+
+    reader = FrameReader()
+    conn.settimeout(HELLO_TIMEOUT)
+    try:
+        hello, pending = _read_hello(conn, reader)
+    except (OSError, ValueError) as e:
+        print(f"Session {os.getpid()}: no valid hello ({e}), closing", file=sys.stderr)
+        conn.close()
+        return 1
+    conn.settimeout(None)
+
+    master, slave = pty.openpty()
+    _set_winsize(slave, hello["cols"], hello["rows"])
+
+    # Make the pty this session's terminal, so resizes arrive as SIGWINCH
+    os.setsid()
+    import fcntl
+    fcntl.ioctl(slave, termios.TIOCSCTTY, 0)
+    for fd in (0, 1, 2):
+        os.dup2(slave, fd)
+    os.close(slave)
+
+    os.environ["TERM"] = hello.get("term") or "xterm-256color"
+    if hello.get("colorterm"):
+        os.environ["COLORTERM"] = hello["colorterm"]
+    else:
+        os.environ.pop("COLORTERM", None)
+    # On a Unix socket the peer's account is known; over TCP the client's
+    # claim is only used when the server was told to trust it
+    user = _peer_user(conn)
+    if user is None and trust_client_user:
+        user = hello.get("user")
+    if user:
+        os.environ["TOUCHPY_USER"] = user
+    else:
+        os.environ.pop("TOUCHPY_USER", None)
+
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    from .app import TypingTrainerApp
+    app = TypingTrainerApp(loader=shared.loader, exercises=shared.exercises, watch=False)
+
+    relay = threading.Thread(target=_relay, args=(conn, master, reader, pending, app), daemon=True)
+    relay.start()
+    try:
+        app.run()
+    finally:
+        # Closing the terminal lets the relay send the last output and stop
+        for fd in (0, 1, 2):
+            os.close(fd)
+        relay.join(timeout=2.0)
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        conn.close()
+    return 0
+
+
+def _relay(conn: socket.socket, master: int, reader: FrameReader,
+           pending: List[Tuple[bytes, bytes]], app) -> None:
+    """Copy input from the connection to the pty and output back (runs in a thread).
+
+    Runs until the app closes its terminal. If the client goes away first,
+    the app is told to exit and its output is drained until it has, so it
+    never blocks writing to a full terminal.
+    """
+
+    def handle(frames):
+        for kind, payload in frames:
+            if kind == _DATA:
+                os.write(master, payload)
+            elif kind == _RESIZE and len(payload) == 4:
+                cols, rows = struct.unpack("!HH", payload)
+                _set_winsize(master, cols, rows)
+
+    def client_gone():
+        selector.unregister(conn)
+        try:
+            app.call_from_thread(app.exit)
+        except RuntimeError:
+            # The app is not running (any more)
+            pass
+
+    selector = selectors.DefaultSelector()
+    selector.register(conn, selectors.EVENT_READ)
+    selector.register(master, selectors.EVENT_READ)
+    connected = True
+    try:
+        handle(pending)
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is conn:
+                    if not connected:
+                        continue
+                    try:
+                        data = conn.recv(_BUFFER_SIZE)
+                        if data:
+                            handle(reader.feed(data))
+                            continue
+                    except (OSError, ValueError):
+                        pass
+                    connected = False
+                    client_gone()
+                    continue
+
+                try:
+                    output = os.read(master, _BUFFER_SIZE)
+                except OSError as e:
+                    if e.errno == errno.EIO:
+                        # The app closed its terminal
+                        return
+                    raise
+                if not output:
+                    return
+                if connected:
+                    try:
+                        conn.sendall(output)
+                    except OSError:
+                        connected = False
+                        client_gone()
+    finally:
+        selector.close()
+
+
+def connect(address: str) -> int:
+    """Bridge the local terminal to a server until the session ends.
+
+    Args:
+        address: Unix socket path or HOST:PORT of the server
+
+    Returns:
+        Exit status
+    """
+    import getpass
+    import termios
+    import tty
+
+    family, target = parse_address(address)
+    conn = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        conn.connect(target)
+    except OSError as e:
+        print(f"Could not connect to {address}: {e}", file=sys.stderr)
+        return 1
+
+    stdin = sys.stdin.fileno()
+    stdout = sys.stdout.fileno()
+    size = os.get_terminal_size(stdout)
+    hello = {
+        "term": os.environ.get("TERM", "xterm-256color"),
+        "colorterm": os.environ.get("COLORTERM", ""),
+        "cols": size.columns,
+        "rows": size.lines,
+        "user": getpass.getuser(),
+    }
+    try:
+        conn.sendall(encode_frame(_HELLO, json.dumps(hello).encode("utf-8")))
+    except OSError:
+        # A full server hangs up right away; its message is still read below
+        pass
+
+    def on_resize(signum, frame):
+        size = os.get_terminal_size(stdout)
+        conn.sendall(encode_frame(_RESIZE, struct.pack("!HH", size.columns, size.lines)))
+
+    saved = termios.tcgetattr(stdin)
+    signal.signal(signal.SIGWINCH, on_resize)
+    tty.setraw(stdin)
+    selector = selectors.DefaultSelector()
+    selector.register(stdin, selectors.EVENT_READ)
+    selector.register(conn, selectors.EVENT_READ)
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is conn:
+                    data = conn.recv(_BUFFER_SIZE)
+                    if not data:
+                        return 0
+                    os.write(stdout, data)
+                else:
+                    data = os.read(stdin, _BUFFER_SIZE)
+                    if not data:
+                        return 0
+                    conn.sendall(encode_frame(_DATA, data))
+    except (ConnectionError, OSError):
+        return 0
+    finally:
+        selector.close()
+        termios.tcsetattr(stdin, termios.TCSADRAIN, saved)
+        signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+        conn.close()
+
+
+def _octal(value: str) -> int:
+    """Parse a permission mode given in octal."""
+    try:
+        mode = int(value, 8)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an octal mode: {value!r}")
+    if not 0 <= mode <= 0o777:
+        raise argparse.ArgumentTypeError(f"mode out of range: {value!r}")
+    return mode
+
+
+def main(argv=None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Serve TouchPy to many terminals, or connect to a server.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the server")
+    serve_parser.add_argument("address", help="Unix socket path or HOST:PORT to listen on")
+    serve_parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS,
+                              help="Maximum number of concurrent sessions (default %(default)s)")
+    serve_parser.add_argument("--session-memory", type=int, default=DEFAULT_SESSION_MEMORY_MB, metavar="MB",
+                              help="Address space limit per session in MiB, 0 for none (default %(default)s)")
+    serve_parser.add_argument("--no-shared-store", action="store_true",
+                              help="Let each session read exercise texts from the files instead of shared memory")
+    serve_parser.add_argument("--trust-client-user", action="store_true",
+                              help="Record TCP sessions under the user name the client sends; "
+                                   "only use on a trusted network (Unix sockets always use the peer's account)")
+    serve_parser.add_argument("--socket-mode", type=_octal, default=DEFAULT_SOCKET_MODE, metavar="MODE",
+                              help="Permissions of a Unix socket in octal, e.g. 660 to only let the socket's "
+                                   f"group connect (default {DEFAULT_SOCKET_MODE:o})")
+
+    connect_parser = subparsers.add_parser("connect", help="Connect this terminal to a server")
+    connect_parser.add_argument("address", help="Unix socket path or HOST:PORT of the server")
+
+    args = parser.parse_args(argv)
+    if not hasattr(os, "fork"):
+        print("Server mode needs a POSIX system (Linux or macOS).", file=sys.stderr)
+        return 2
+    if args.command == "serve":
+        SessionServer(args.address, args.max_sessions, args.session_memory or None,
+                      shared_store=not args.no_shared_store,
+                      trust_client_user=args.trust_client_user,
+                      socket_mode=args.socket_mode).serve_forever()
+        return 0
+    return connect(args.address)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
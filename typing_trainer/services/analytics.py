@@ -0,0 +1,259 @@
+"""Post-session typing analytics.
+
+Computes latency distributions, WPM curves, consistency and error rates
+from keystroke logs using NumPy array operations, so whole classes of
+sessions can be analyzed at once. NumPy is an optional dependency that
+only this module needs (pip install "numpy>=1.22.0"); the app never
+imports it.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Tuple
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        'typing_trainer.services.analytics needs NumPy, which is not installed '
+        'with the app: pip install "numpy>=1.22.0"'
+    ) from e
+from .keylog import BACKSPACE, KeystrokeLog
+from .metrics import CHARS_PER_WORD
+
+
+# Gaps longer than this are treated as pauses and left out of latency stats
+DEFAULT_MAX_INTERVAL_MS = 2000.0
+
+# Trailing window for the rolling WPM curve
+DEFAULT_WPM_WINDOW_SECONDS = 10.0
+
+
+class LatencyStats(NamedTuple):
+    """Distribution of inter-key latencies for one key or bigram (milliseconds)."""
+    count: int
+    mean: float
+    median: float
+    p90: float
+
+
+@dataclass
+class SessionAnalytics:
+    """Analytics for one or more typing sessions.
+
+    Attributes:
+        key_latency: Latency before each key, by expected character
+        bigram_latency: Latency of the second key of each bigram, by bigram
+        error_rates: Fraction of attempts that were wrong, by expected character
+        wpm_times: Seconds since the first key for each point of the WPM curve
+        wpm_curve: Rolling WPM at each point in wpm_times
+        consistency: 0-100 score, higher when inter-key intervals are more even
+    """
+    key_latency: Dict[str, LatencyStats]
+    bigram_latency: Dict[str, LatencyStats]
+    error_rates: Dict[str, float]
+    wpm_times: np.ndarray
+    wpm_curve: np.ndarray
+    consistency: float
+
+    def slowest_keys(self, n: int = 5, min_count: int = 3) -> List[Tuple[str, LatencyStats]]:
+        """Get the keys with the highest median latency.
+
+        Args:
+            n: Number of keys to return
+            min_count: Ignore keys with fewer samples than this
+
+        Returns:
+            List of (key, stats) sorted slowest first
+        """
+        keys = [(key, stats) for key, stats in self.key_latency.items() if stats.count >= min_count]
+        keys.sort(key=lambda item: item[1].median, reverse=True)
+        return keys[:n]
+
+
+def keylog_arrays(keylog: KeystrokeLog) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Get the columns of a keystroke log as NumPy arrays (without copying).
+
+    Args:
+        keylog: Log to convert
+
+    Returns:
+        Tuple of (timestamps_ns, expected, typed, line_indices)
+    """
+    return (
+        np.frombuffer(keylog.timestamps, dtype=np.int64),
+        np.frombuffer(keylog.expected, dtype=np.uint32),
+        np.frombuffer(keylog.typed, dtype=np.uint32),
+        np.frombuffer(keylog.line_indices, dtype=np.uint32),
+    )
+
+
+def analyze_session(keylog: KeystrokeLog, max_interval_ms: float = DEFAULT_MAX_INTERVAL_MS,
+                    wpm_window_seconds: float = DEFAULT_WPM_WINDOW_SECONDS) -> SessionAnalytics:
+    """Compute analytics for a single session.
+
+    Args:
+        keylog: Keystroke log of the session
+        max_interval_ms: Longer gaps are treated as pauses and ignored for latency
+        wpm_window_seconds: Trailing window of the rolling WPM curve
+
+    Returns:
+        SessionAnalytics for the session
+    """
+    return analyze_sessions([keylog], max_interval_ms, wpm_window_seconds)
+
+
+def analyze_sessions(keylogs: List[KeystrokeLog], max_interval_ms: float = DEFAULT_MAX_INTERVAL_MS,
+                     wpm_window_seconds: float = DEFAULT_WPM_WINDOW_SECONDS) -> SessionAnalytics:
+    """Compute aggregate analytics over many sessions (e.g. a whole class).
+
+    Intervals and bigrams never span two sessions. The WPM curve is the
+    average over sessions, aligned on time since each session's first key.
+
+    Args:
+        keylogs: Keystroke logs to analyze
+        max_interval_ms: Longer gaps are treated as pauses and ignored for latency
+        wpm_window_seconds: Trailing window of the rolling WPM curve
+
+    Returns:
+        SessionAnalytics for all sessions combined
+    """
+    columns = [keylog_arrays(keylog) for keylog in keylogs if len(keylog)]
+    if not columns:
+        empty = np.zeros(0)
+        return SessionAnalytics({}, {}, {}, empty, empty, 0.0)
+
+    timestamps = np.concatenate([c[0] for c in columns])
+    expected = np.concatenate([c[1] for c in columns])
+    typed = np.concatenate([c[2] for c in columns])
+    lines = np.concatenate([c[3] for c in columns])
+    session_ids = np.repeat(np.arange(len(columns)), [len(c[0]) for c in columns])
+
+    # Interval before each key; the first key of a session has none
+    intervals_ms = np.empty(len(timestamps))
+    intervals_ms[0] = np.nan
+    intervals_ms[1:] = np.diff(timestamps) / 1e6
+    intervals_ms[1:][session_ids[1:] != session_ids[:-1]] = np.nan
+
+    is_key = typed != BACKSPACE
+    valid = is_key & ~np.isnan(intervals_ms) & (intervals_ms <= max_interval_ms)
+
+    key_latency = _latency_by_group(expected[valid], intervals_ms[valid], _decode_key)
+
+    # Bigrams: consecutive keys (not backspaces) on the same line of the same session
+    previous_is_key = np.zeros(len(typed), dtype=bool)
+    previous_is_key[1:] = is_key[:-1] & (lines[1:] == lines[:-1]) & (session_ids[1:] == session_ids[:-1])
+    bigram_mask = valid & previous_is_key
+    previous_expected = np.zeros(len(expected), dtype=np.uint64)
+    previous_expected[1:] = expected[:-1]
+    bigram_codes = (previous_expected << np.uint64(32)) | expected.astype(np.uint64)
+    bigram_latency = _latency_by_group(bigram_codes[bigram_mask], intervals_ms[bigram_mask], _decode_bigram)
+
+    error_rates = _error_rates(expected[is_key], typed[is_key] != expected[is_key])
+
+    wpm_times, wpm_curve = _wpm_curve(columns, wpm_window_seconds)
+
+    return SessionAnalytics(
+        key_latency=key_latency,
+        bigram_latency=bigram_latency,
+        error_rates=error_rates,
+        wpm_times=wpm_times,
+        wpm_curve=wpm_curve,
+        consistency=_consistency(intervals_ms[valid]),
+    )
+
+
+def _decode_key(code: int) -> str:
+    return chr(code)
+
+
+def _decode_bigram(code: int) -> str:
+    return chr(code >> 32) + chr(code & 0xFFFFFFFF)
+
+
+def _latency_by_group(groups: np.ndarray, values: np.ndarray, decode) -> Dict[str, LatencyStats]:
+    """Compute latency statistics per group with one sort.
+
+    Args:
+        groups: Group code of each sample
+        values: Latency of each sample in milliseconds
+        decode: Function turning a group code into its key string
+
+    Returns:
+        LatencyStats by decoded group
+    """
+    if len(groups) == 0:
+        return {}
+
+    order = np.lexsort((values, groups))
+    groups = groups[order]
+    values = values[order]
+    codes, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    means = np.add.reduceat(values, starts) / counts
+
+    def percentile(q):
+        position = starts + (counts - 1) * q
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        fraction = position - low
+        return values[low] * (1 - fraction) + values[high] * fraction
+
+    medians = percentile(0.5)
+    p90s = percentile(0.9)
+
+    return {
+        decode(int(code)): LatencyStats(int(count), float(mean), float(median), float(p90))
+        for code, count, mean, median, p90 in zip(codes, counts, means, medians, p90s)
+    }
+
+
+def _error_rates(expected: np.ndarray, wrong: np.ndarray) -> Dict[str, float]:
+    """Compute the fraction of wrong attempts per expected character."""
+    if len(expected) == 0:
+        return {}
+    codes, inverse = np.unique(expected, return_inverse=True)
+    attempts = np.bincount(inverse)
+    errors = np.bincount(inverse, weights=wrong)
+    return {chr(int(code)): float(e / a) for code, e, a in zip(codes, errors, attempts)}
+
+
+def _wpm_curve(columns, window_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the rolling WPM curve, averaged over sessions.
+
+    The curve is sampled once per second. At each sample, WPM counts the
+    correct keys typed in the trailing window.
+
+    Args:
+        columns: Per-session (timestamps, expected, typed, lines) arrays
+        window_seconds: Length of the trailing window
+
+    Returns:
+        Tuple of (sample times in seconds, mean WPM at each sample)
+    """
+    curves = []
+    for timestamps, expected, typed, _ in columns:
+        seconds = (timestamps - timestamps[0]) / 1e9
+        correct_times = seconds[typed == expected]
+        samples = np.arange(1.0, np.ceil(seconds[-1]) + 1.0)
+        ends = np.searchsorted(correct_times, samples, side="right")
+        starts = np.searchsorted(correct_times, samples - window_seconds, side="right")
+        # Early samples only cover the time since the first key
+        spans = np.minimum(samples, window_seconds)
+        curves.append((ends - starts) / CHARS_PER_WORD / (spans / 60.0))
+
+    length = max(len(curve) for curve in curves)
+    padded = np.full((len(curves), length), np.nan)
+    for row, curve in enumerate(curves):
+        padded[row, :len(curve)] = curve
+    with np.errstate(invalid="ignore"):
+        mean_curve = np.nanmean(padded, axis=0) if length else np.zeros(0)
+    return np.arange(1.0, length + 1.0), mean_curve
+
+
+def _consistency(intervals_ms: np.ndarray) -> float:
+    """Score how even the inter-key intervals are (100 = perfectly steady)."""
+    if len(intervals_ms) < 2:
+        return 0.0
+    mean = intervals_ms.mean()
+    if mean <= 0:
+        return 0.0
+    variation = intervals_ms.std() / mean
+    return float(np.clip(100.0 * (1.0 - variation), 0.0, 100.0))
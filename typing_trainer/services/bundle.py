@@ -0,0 +1,268 @@
+"""Packed exercise bundle format.
+
+A bundle is a single file holding many exercises:
+
+    magic       4 bytes   b"TPXB"
+    version     uint16    BUNDLE_VERSION
+    reserved    uint16
+    index_size  uint32    size of the index in bytes
+    index       JSON      list of {id, title, layout, offset, length, word_count, char_count,
+                          grams} (grams is optional)
+    bodies      UTF-8     exercise texts, addressed by offset/length from the start of the file
+
+The loader memory-maps bundles and reads bodies straight from the mapping,
+so opening a bundle costs one file open regardless of how many exercises
+it holds. share_exercises() uses the same format to put already loaded
+texts into a mapping shared by forked processes (the server's sessions).
+
+Build a bundle from directories of .txt files with:
+
+    python -m typing_trainer.services.bundle build typing_trainer/exercises -o exercises.tpxb
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from ..models import Exercise
+from .ngrams import count_grams
+
+
+BUNDLE_MAGIC = b"TPXB"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".tpxb"
+
+_HEADER = struct.Struct("<4sHHI")
+
+
+class ExerciseBundle:
+    """A memory-mapped exercise bundle."""
+
+    def __init__(self, path: Path):
+        """Open a bundle and read its index.
+
+        Args:
+            path: Path to the bundle file
+
+        Raises:
+            ValueError: If the file is not a bundle of a supported version
+        """
+        self.path = Path(path)
+        self._grams: Optional[Dict[str, Optional[Dict[str, int]]]] = None
+        self._file = open(self.path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _, index_size = _HEADER.unpack_from(self._mmap, 0)
+            if magic != BUNDLE_MAGIC:
+                raise ValueError("Not an exercise bundle")
+            if version != BUNDLE_VERSION:
+                raise ValueError(f"Unsupported bundle version {version}")
+            index_start = _HEADER.size
+            self.entries = json.loads(self._mmap[index_start:index_start + index_size].decode('utf-8'))
+        except Exception:
+            self.close()
+            raise
+
+    def exercises(self) -> List[Exercise]:
+        """Get metadata-only records for every exercise in the bundle.
+
+        Returns:
+            Exercises whose text is read from this bundle on demand
+        """
+        return [
+            Exercise(
+                id=entry["id"],
+                title=entry["title"],
+                source_path=self.path,
+                layout=entry["layout"],
+                body_offset=entry["offset"],
+                word_count=entry["word_count"],
+                char_count=entry["char_count"],
+                store=self,
+                body_length=entry["length"]
+            )
+            for entry in self.entries
+        ]
+
+    def grams(self, exercise_id: str) -> Optional[Dict[str, int]]:
+        """Get the character and bigram counts stored for an exercise.
+
+        Args:
+            exercise_id: ID of a bundled exercise
+
+        Returns:
+            Counts as returned by count_grams(), or None if the bundle has none
+        """
+        if self._grams is None:
+            self._grams = {entry["id"]: entry.get("grams") for entry in self.entries}
+        return self._grams.get(exercise_id)
+
+    def read_text(self, offset: int, length: int) -> str:
+        """Decode an exercise body directly from the mapping.
+
+        Args:
+            offset: Byte offset of the body from the start of the file
+            length: Length of the body in bytes
+
+        Returns:
+            The exercise text
+        """
+        with memoryview(self._mmap) as view:
+            return str(view[offset:offset + length], 'utf-8')
+
+    def close(self) -> None:
+        """Unmap and close the bundle file."""
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+def write_bundle(exercises: List[Exercise], out_path: Path) -> None:
+    """Write exercises to a bundle file.
+
+    Args:
+        exercises: Exercises to pack, in the order they should be listed
+        out_path: Path of the bundle to create
+    """
+    texts = [exercise.text for exercise in exercises]
+    bodies = [text.encode('utf-8') for text in texts]
+    grams = [count_grams(text) for text in texts]
+
+    # Offsets depend on the index size, which depends on the offsets, so
+    # lay out the bodies relative to the end of the index and fix up after.
+    def build_index(base: int) -> bytes:
+        entries = []
+        offset = base
+        for exercise, body, counts in zip(exercises, bodies, grams):
+            entries.append({
+                "id": exercise.id,
+                "title": exercise.title,
+                "layout": exercise.layout,
+                "offset": offset,
+                "length": len(body),
+                "word_count": exercise.word_count,
+                "char_count": exercise.char_count,
+                "grams": counts,
+            })
+            offset += len(body)
+        return json.dumps(entries, ensure_ascii=False).encode('utf-8')
+
+    index = build_index(0)
+    while True:
+        base = _HEADER.size + len(index)
+        new_index = build_index(base)
+        if len(new_index) == len(index):
+            index = new_index
+            break
+        index = new_index
+
+    with open(out_path, 'wb') as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, 0, len(index)))
+        f.write(index)
+        for body in bodies:
+            f.write(body)
+
+
+def share_exercises(exercises: List[Exercise], directory: Optional[Path] = None) -> List[Exercise]:
+    """Move exercise texts into a read-only memory mapping shared with forked processes.
+
+    The texts are packed into a temporary bundle that is mapped and then
+    unlinked, so the mapping lives only as long as the processes using it.
+    Processes forked afterwards share its pages instead of each reading the
+    texts into their own strings. Exercises already read from a bundle are
+    kept as they are, since they are mapped from their file already.
+
+    Args:
+        exercises: Exercises to share
+        directory: Where to create the temporary bundle (default: /dev/shm
+            if it exists, so the texts never touch the disk)
+
+    Returns:
+        Records for the same exercises, in the same order, whose text is
+        read from the shared mapping
+    """
+    to_pack = [exercise for exercise in exercises if exercise.store is None]
+    if not to_pack:
+        return list(exercises)
+    if directory is None and os.path.isdir("/dev/shm"):
+        directory = Path("/dev/shm")
+
+    fd, tmp_name = tempfile.mkstemp(prefix="touchpy-", suffix=BUNDLE_SUFFIX, dir=directory)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        write_bundle(to_pack, tmp_path)
+        bundle = ExerciseBundle(tmp_path)
+    finally:
+        tmp_path.unlink()
+
+    shared = {}
+    for exercise, entry in zip(to_pack, bundle.entries):
+        shared[id(exercise)] = Exercise(
+            id=exercise.id,
+            title=exercise.title,
+            source_path=exercise.source_path,
+            layout=exercise.layout,
+            body_offset=entry["offset"],
+            word_count=exercise.word_count,
+            char_count=exercise.char_count,
+            store=bundle,
+            body_length=entry["length"]
+        )
+    return [shared.get(id(exercise), exercise) for exercise in exercises]
+
+
+def build_bundle(source_dirs: List[Path], out_path: Path) -> List[Exercise]:
+    """Build a bundle from directories of .txt exercise files.
+
+    Later directories override earlier ones, like in the app.
+
+    Args:
+        source_dirs: Directories containing .txt exercise files
+        out_path: Path of the bundle to create
+
+    Returns:
+        The exercises that were packed
+    """
+    from .loader import ExerciseLoader
+
+    loader = ExerciseLoader(source_dirs)
+    exercises = [e for e in loader.load_exercises() if e.store is None]
+    for file_path, error in loader.errors:
+        print(f"Warning: Could not load {file_path}: {error}", file=sys.stderr)
+    write_bundle(exercises, Path(out_path))
+    return exercises
+
+
+def main(argv=None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Build or inspect TouchPy exercise bundles.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Pack .txt exercises into a bundle")
+    build_parser.add_argument("dirs", nargs="+", type=Path, help="Directories with .txt exercise files")
+    build_parser.add_argument("-o", "--output", type=Path, required=True, help="Bundle file to write")
+
+    list_parser = subparsers.add_parser("list", help="List the exercises in a bundle")
+    list_parser.add_argument("bundle", type=Path, help="Bundle file to read")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        exercises = build_bundle(args.dirs, args.output)
+        print(f"Wrote {len(exercises)} exercises to {args.output}")
+    else:
+        bundle = ExerciseBundle(args.bundle)
+        for entry in bundle.entries:
+            print(f"{entry['id']}\t{entry['layout']}\t{entry['word_count']} words\t{entry['title']}")
+        bundle.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
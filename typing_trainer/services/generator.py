@@ -0,0 +1,200 @@
+"""Adaptive exercise generator service."""
+
+import random
+import re
+from typing import Dict, Iterable, List, Optional
+from ..keyboard_layouts import get_model
+from ..models import Exercise
+from .history import KeyStat
+
+
+# Words shorter or longer than this are left out of the corpus
+MIN_WORD_LENGTH = 2
+MAX_WORD_LENGTH = 14
+
+# Defaults for generated exercises
+DEFAULT_WORD_COUNT = 48
+DEFAULT_WORDS_PER_LINE = 8
+
+# Keys with fewer attempts than this are not judged
+MIN_ATTEMPTS = 5
+
+# Attempts' worth of the mean error rate mixed into each key's error rate
+ERROR_RATE_PRIOR = 10
+
+# Keys this much slower than the average key (0.25 = 25 %) are weak even without errors
+SLOW_KEY_THRESHOLD = 0.25
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+
+def weak_key_weights(key_stats: Dict[str, KeyStat], bigram_stats: Optional[Dict[str, KeyStat]] = None,
+                     min_attempts: int = MIN_ATTEMPTS, limit: int = 8, bigram_limit: int = 4) -> Dict[str, float]:
+    """Turn per-key and per-bigram statistics into practice weights for the weakest ones.
+
+    A key is weak when its error rate is above the user's mean error rate, or
+    when it is typed clearly slower than the average key. Its weight is how
+    far above the mean it is, relative to the mean, for each of the two.
+    Bigrams are judged the same way against the other bigrams.
+
+    Args:
+        key_stats: KeyStat by character (e.g. from HistoryStore.key_stats())
+        bigram_stats: KeyStat by two-character string (e.g. from HistoryStore.bigram_stats())
+        min_attempts: Ignore keys and bigrams with fewer attempts than this
+        limit: Maximum number of keys to return
+        bigram_limit: Maximum number of bigrams to return
+
+    Returns:
+        Weight by lower-case character or bigram, weakest ones only
+    """
+    weights = _weakest(key_stats, min_attempts, limit)
+    if bigram_stats:
+        weights.update(_weakest(bigram_stats, min_attempts, bigram_limit))
+    return weights
+
+
+def _weakest(stats: Dict[str, KeyStat], min_attempts: int, limit: int) -> Dict[str, float]:
+    """Weigh the keys (or bigrams) of one table against each other."""
+    # Upper and lower case are the same key: (attempts, errors, total latency, timed attempts)
+    merged: Dict[str, List[float]] = {}
+    for key, stat in stats.items():
+        if any(char.isspace() for char in key):
+            continue
+        totals = merged.setdefault(key.lower(), [0, 0, 0.0, 0])
+        totals[0] += stat.attempts
+        totals[1] += stat.errors
+        if stat.mean_latency_ms is not None:
+            totals[2] += stat.mean_latency_ms * stat.attempts
+            totals[3] += stat.attempts
+    judged = {key: totals for key, totals in merged.items() if totals[0] >= min_attempts}
+    if not judged:
+        return {}
+
+    attempts = sum(totals[0] for totals in judged.values())
+    errors = sum(totals[1] for totals in judged.values())
+    mean_rate = errors / attempts
+    latencies = [totals[2] / totals[3] for totals in judged.values() if totals[3]]
+    mean_latency = sum(latencies) / len(latencies) if latencies else 0.0
+
+    weights: Dict[str, float] = {}
+    for key, (key_attempts, key_errors, total_latency, timed) in judged.items():
+        weight = 0.0
+        if key_errors and mean_rate:
+            # Error rate pulled toward the mean, so one slip on a rare key does not dominate
+            error_rate = (key_errors + ERROR_RATE_PRIOR * mean_rate) / (key_attempts + ERROR_RATE_PRIOR)
+            weight += max(error_rate / mean_rate - 1.0, 0.0)
+        if timed and mean_latency:
+            slowness = (total_latency / timed) / mean_latency - 1.0
+            if slowness >= SLOW_KEY_THRESHOLD:
+                weight += slowness
+        if weight > 0:
+            weights[key] = weight
+
+    weakest = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return dict(weakest)
+
+
+class ExerciseGenerator:
+    """Builds practice exercises from a word corpus, focused on given keys and bigrams.
+
+    The corpus is filtered to words that can be typed on the layout, and an
+    index from every character and bigram to the words containing it is
+    built once, so generating an exercise only samples from precomputed lists.
+    """
+
+    def __init__(self, words: Iterable[str], layout: str = "English"):
+        """Build the generator's index.
+
+        Args:
+            words: Corpus words (case is ignored, duplicates are removed)
+            layout: Keyboard layout the exercises are for; words with letters
+                that are not on the layout are left out
+        """
+        self.layout = layout
+        model = get_model(layout)
+
+        unique = set()
+        for word in words:
+            word = word.lower()
+            if MIN_WORD_LENGTH <= len(word) <= MAX_WORD_LENGTH and all(model.normalize_key(ch) for ch in word):
+                unique.add(word)
+        self.words: List[str] = sorted(unique)
+
+        # Word indices by character and by bigram
+        self.index: Dict[str, List[int]] = {}
+        for number, word in enumerate(self.words):
+            grams = set(word)
+            grams.update(word[i:i + 2] for i in range(len(word) - 1))
+            for gram in grams:
+                self.index.setdefault(gram, []).append(number)
+
+    @classmethod
+    def from_exercises(cls, exercises: Iterable[Exercise], layout: str = "English") -> "ExerciseGenerator":
+        """Build a generator from the words of the exercises for a layout.
+
+        Reads every exercise text, so call it from a worker thread.
+
+        Args:
+            exercises: Exercises to take words from
+            layout: Only exercises with this layout are used
+
+        Returns:
+            ExerciseGenerator for the layout
+        """
+        words = set()
+        for exercise in exercises:
+            if exercise.layout == layout:
+                words.update(_WORD_PATTERN.findall(exercise.text))
+        return cls(words, layout)
+
+    def candidates(self, gram: str) -> List[str]:
+        """Get the corpus words containing a character or bigram."""
+        return [self.words[number] for number in self.index.get(gram.lower(), ())]
+
+    def generate(self, weights: Optional[Dict[str, float]] = None, word_count: int = DEFAULT_WORD_COUNT,
+                 words_per_line: int = DEFAULT_WORDS_PER_LINE, seed: Optional[int] = None) -> Optional[Exercise]:
+        """Generate an exercise weighted toward the given keys and bigrams.
+
+        Each word is drawn by first picking a key or bigram in proportion to
+        its weight and then a random word that contains it. Without weights
+        (or if no word contains any of them) words are drawn uniformly.
+
+        Args:
+            weights: Weight by character or bigram (e.g. from weak_key_weights())
+            word_count: Number of words in the exercise
+            words_per_line: Words per line
+            seed: Random seed, for reproducible exercises
+
+        Returns:
+            A new Exercise with its text in memory, or None if the corpus is empty
+        """
+        if not self.words:
+            return None
+
+        rng = random.Random(seed)
+        # Keys and bigrams that some word can drill, strongest first
+        focus_weights: Dict[str, float] = {}
+        for gram, weight in (weights or {}).items():
+            gram = gram.lower()
+            if weight > 0 and gram in self.index:
+                focus_weights[gram] = focus_weights.get(gram, 0.0) + weight
+        grams = sorted(focus_weights, key=focus_weights.get, reverse=True)
+        gram_weights = [focus_weights[gram] for gram in grams]
+
+        chosen = []
+        for _ in range(word_count):
+            if grams:
+                gram = rng.choices(grams, gram_weights)[0]
+                pool = self.index[gram]
+                chosen.append(self.words[pool[rng.randrange(len(pool))]])
+            else:
+                chosen.append(self.words[rng.randrange(len(self.words))])
+
+        lines = [" ".join(chosen[i:i + words_per_line]) for i in range(0, len(chosen), words_per_line)]
+        focus = ", ".join(grams[:5]) if grams else "mixed words"
+        return Exercise(
+            id="generated",
+            title=f"Practice: {focus}",
+            text="\n".join(lines),
+            layout=self.layout,
+        )
@@ -0,0 +1,514 @@
+"""Persistent session history service."""
+
+import getpass
+import os
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from .keylog import BACKSPACE, KeystrokeLog
+
+
+SCHEMA_VERSION = 2
+
+# Maximum number of queued sessions written in one transaction
+WRITE_BATCH_SIZE = 64
+
+# Gaps longer than this are left out of the per-key latency
+MAX_LATENCY_MS = 2000.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    exercise_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    day TEXT NOT NULL,
+    wpm REAL NOT NULL,
+    accuracy REAL NOT NULL,
+    elapsed_time REAL NOT NULL,
+    mistakes INTEGER NOT NULL,
+    typed_chars INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_user_exercise ON sessions (user, exercise_id, wpm);
+CREATE INDEX IF NOT EXISTS sessions_user_day ON sessions (user, day);
+CREATE INDEX IF NOT EXISTS sessions_user_started ON sessions (user, started_at);
+
+CREATE TABLE IF NOT EXISTS key_stats (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    mean_latency_ms REAL,
+    PRIMARY KEY (session_id, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS bigram_stats (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    bigram TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    mean_latency_ms REAL,
+    PRIMARY KEY (session_id, bigram)
+) WITHOUT ROWID;
+"""
+
+
+class KeyStat(NamedTuple):
+    """Per-key statistics of one session.
+
+    Attributes:
+        attempts: Number of times the key was expected and something was typed
+        errors: Number of those attempts that were wrong
+        mean_latency_ms: Mean time before the key (pauses excluded), or None
+    """
+    attempts: int
+    errors: int
+    mean_latency_ms: Optional[float]
+
+
+@dataclass
+class SessionRecord:
+    """A completed typing session as stored in the history.
+
+    Attributes:
+        exercise_id: ID of the exercise that was typed
+        wpm: Words per minute
+        accuracy: Accuracy percentage
+        elapsed_time: Time taken in seconds
+        mistakes: Number of typing mistakes
+        typed_chars: Number of characters typed
+        started_at: Unix time the session started
+        user: Name of the user
+        key_stats: Per-key statistics by expected character
+        bigram_stats: Statistics of the second key of each pair of expected
+            characters typed in a row, by the pair
+        id: Row ID once stored
+    """
+    exercise_id: str
+    wpm: float
+    accuracy: float
+    elapsed_time: float
+    mistakes: int
+    typed_chars: int = 0
+    started_at: float = field(default_factory=time.time)
+    user: str = ""
+    key_stats: Dict[str, KeyStat] = field(default_factory=dict)
+    bigram_stats: Dict[str, KeyStat] = field(default_factory=dict)
+    id: Optional[int] = None
+
+
+class DayProgress(NamedTuple):
+    """Aggregated results of one day.
+
+    Attributes:
+        day: Date as YYYY-MM-DD (local time)
+        sessions: Number of sessions
+        mean_wpm: Average WPM
+        best_wpm: Best WPM
+        mean_accuracy: Average accuracy
+    """
+    day: str
+    sessions: int
+    mean_wpm: float
+    best_wpm: float
+    mean_accuracy: float
+
+
+def default_user() -> str:
+    """Get the user name sessions are recorded under (TOUCHPY_USER or the login name)."""
+    user = os.environ.get("TOUCHPY_USER")
+    if user:
+        return user
+    try:
+        return getpass.getuser()
+    except Exception:
+        return "default"
+
+
+def key_stats_from_keylog(keylog: KeystrokeLog, max_latency_ms: float = MAX_LATENCY_MS) -> Dict[str, KeyStat]:
+    """Summarize a keystroke log per expected character.
+
+    Args:
+        keylog: Keystroke log of the session
+        max_latency_ms: Longer gaps are treated as pauses and left out of the latency
+
+    Returns:
+        KeyStat by expected character
+    """
+    attempts: Dict[int, int] = {}
+    errors: Dict[int, int] = {}
+    latency_sum: Dict[int, float] = {}
+    latency_count: Dict[int, int] = {}
+
+    previous_ns = None
+    for timestamp_ns, expected, typed in zip(keylog.timestamps, keylog.expected, keylog.typed):
+        if typed != BACKSPACE and expected:
+            attempts[expected] = attempts.get(expected, 0) + 1
+            if typed != expected:
+                errors[expected] = errors.get(expected, 0) + 1
+            if previous_ns is not None:
+                interval_ms = (timestamp_ns - previous_ns) / 1e6
+                if interval_ms <= max_latency_ms:
+                    latency_sum[expected] = latency_sum.get(expected, 0.0) + interval_ms
+                    latency_count[expected] = latency_count.get(expected, 0) + 1
+        previous_ns = timestamp_ns
+
+    stats = {}
+    for code, count in attempts.items():
+        samples = latency_count.get(code, 0)
+        mean = latency_sum[code] / samples if samples else None
+        stats[chr(code)] = KeyStat(count, errors.get(code, 0), mean)
+    return stats
+
+
+def bigram_stats_from_keylog(keylog: KeystrokeLog, max_latency_ms: float = MAX_LATENCY_MS) -> Dict[str, KeyStat]:
+    """Summarize a keystroke log per pair of expected characters typed in a row.
+
+    A pair counts when two key presses on the same line follow each other
+    without a backspace in between; its error and latency are those of the
+    second key press.
+
+    Args:
+        keylog: Keystroke log of the session
+        max_latency_ms: Longer gaps are treated as pauses and left out of the latency
+
+    Returns:
+        KeyStat by two-character string
+    """
+    attempts: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+    latency_sum: Dict[str, float] = {}
+    latency_count: Dict[str, int] = {}
+
+    previous = None
+    for timestamp_ns, expected, typed, line_index in zip(keylog.timestamps, keylog.expected,
+                                                         keylog.typed, keylog.line_indices):
+        if typed == BACKSPACE or not expected:
+            previous = None
+            continue
+        if previous is not None and previous[2] == line_index:
+            bigram = chr(previous[1]) + chr(expected)
+            attempts[bigram] = attempts.get(bigram, 0) + 1
+            if typed != expected:
+                errors[bigram] = errors.get(bigram, 0) + 1
+            interval_ms = (timestamp_ns - previous[0]) / 1e6
+            if interval_ms <= max_latency_ms:
+                latency_sum[bigram] = latency_sum.get(bigram, 0.0) + interval_ms
+                latency_count[bigram] = latency_count.get(bigram, 0) + 1
+        previous = (timestamp_ns, expected, line_index)
+
+    stats = {}
+    for bigram, count in attempts.items():
+        samples = latency_count.get(bigram, 0)
+        mean = latency_sum[bigram] / samples if samples else None
+        stats[bigram] = KeyStat(count, errors.get(bigram, 0), mean)
+    return stats
+
+
+class HistoryStore:
+    """SQLite-backed history of completed typing sessions.
+
+    Writes are queued and performed by a background thread in batches, so
+    record() returns immediately and never touches the disk on the caller's
+    thread. The database uses WAL mode, so queries run concurrently with
+    the writer. Queries block and should be run from a worker thread.
+    """
+
+    def __init__(self, db_path: Path, user: Optional[str] = None):
+        """Open (or create) the history database and start the writer thread.
+
+        Args:
+            db_path: Path of the SQLite database file
+            user: Name sessions are recorded and queried under (default_user() if not given)
+
+        Raises:
+            sqlite3.Error, OSError: If the database cannot be opened
+        """
+        self.db_path = Path(db_path)
+        self.user = user or default_user()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Create the schema up front so errors surface here
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executescript(_SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        finally:
+            connection.close()
+
+        self._read_connection: Optional[sqlite3.Connection] = None
+        self._read_lock = threading.Lock()
+
+        self.closed = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the pragmas every connection needs."""
+        connection = sqlite3.connect(str(self.db_path), timeout=10.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        return connection
+
+    def record(self, record: SessionRecord, keylog: Optional[KeystrokeLog] = None) -> None:
+        """Queue a session to be written.
+
+        Args:
+            record: The session to store (user defaults to the store's user)
+            keylog: Keystroke log to derive per-key stats from on the writer thread
+                (when record.key_stats is empty)
+        """
+        if self.closed:
+            return
+        if not record.user:
+            record.user = self.user
+        self._queue.put((record, keylog))
+
+    def record_results(self, results: dict) -> SessionRecord:
+        """Queue the results dictionary built by TypingView for writing.
+
+        Args:
+            results: Results as passed to SummaryView
+
+        Returns:
+            The SessionRecord that was queued
+        """
+        keylog = results.get("keystrokes")
+        elapsed_time = results.get("elapsed_time", 0.0)
+        record = SessionRecord(
+            exercise_id=results["exercise"].id,
+            wpm=results["wpm"],
+            accuracy=results["accuracy"],
+            elapsed_time=elapsed_time,
+            mistakes=results.get("mistakes", 0),
+            typed_chars=results.get("typed_chars", 0),
+            started_at=time.time() - elapsed_time,
+        )
+        self.record(record, keylog)
+        return record
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued session has been written.
+
+        Args:
+            timeout: Maximum seconds to wait (no limit if not given)
+
+        Returns:
+            True if the queue was drained in time
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Write pending sessions and stop the writer thread.
+
+        Args:
+            timeout: Maximum seconds to wait for pending writes
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+        with self._read_lock:
+            if self._read_connection is not None:
+                self._read_connection.close()
+                self._read_connection = None
+
+    def _write_loop(self) -> None:
+        """Write queued sessions in batches until closed (runs in the writer thread)."""
+        connection = self._connect()
+        try:
+            running = True
+            while running:
+                items = [self._queue.get()]
+                # Take whatever else is already waiting, up to one batch
+                while len(items) < WRITE_BATCH_SIZE:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                batch = []
+                waiters = []
+                for item in items:
+                    if item is None:
+                        running = False
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        batch.append(item)
+
+                if batch:
+                    try:
+                        self._write_batch(connection, batch)
+                    except sqlite3.Error:
+                        # History is best effort; never take the app down
+                        pass
+                for waiter in waiters:
+                    waiter.set()
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, batch) -> None:
+        """Insert a batch of sessions and their key stats in one transaction."""
+        with connection:
+            for record, keylog in batch:
+                if not record.key_stats and keylog is not None:
+                    record.key_stats = key_stats_from_keylog(keylog)
+                if not record.bigram_stats and keylog is not None:
+                    record.bigram_stats = bigram_stats_from_keylog(keylog)
+                cursor = connection.execute(
+                    "INSERT INTO sessions (user, exercise_id, started_at, day, wpm, accuracy,"
+                    " elapsed_time, mistakes, typed_chars) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record.user, record.exercise_id, record.started_at, _day(record.started_at),
+                     record.wpm, record.accuracy, record.elapsed_time, record.mistakes,
+                     record.typed_chars))
+                record.id = cursor.lastrowid
+                connection.executemany(
+                    "INSERT INTO key_stats (session_id, key, attempts, errors, mean_latency_ms)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(record.id, key, stat.attempts, stat.errors, stat.mean_latency_ms)
+                     for key, stat in record.key_stats.items()])
+                connection.executemany(
+                    "INSERT INTO bigram_stats (session_id, bigram, attempts, errors, mean_latency_ms)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(record.id, bigram, stat.attempts, stat.errors, stat.mean_latency_ms)
+                     for bigram, stat in record.bigram_stats.items()])
+
+    def _query(self, sql: str, parameters=()) -> list:
+        """Run a read query on the shared read connection."""
+        with self._read_lock:
+            if self._read_connection is None:
+                self._read_connection = self._connect()
+            return self._read_connection.execute(sql, parameters).fetchall()
+
+    def personal_best(self, exercise_id: str, before: Optional[float] = None,
+                      user: Optional[str] = None) -> Optional[SessionRecord]:
+        """Get the fastest session on an exercise.
+
+        Args:
+            exercise_id: Exercise to look up
+            before: Only consider sessions started before this Unix time
+            user: User to look up (the store's user if not given)
+
+        Returns:
+            The session with the highest WPM, or None if there is none
+        """
+        sql = ("SELECT id, user, exercise_id, started_at, wpm, accuracy, elapsed_time, mistakes,"
+               " typed_chars FROM sessions WHERE user = ? AND exercise_id = ?")
+        parameters = [user or self.user, exercise_id]
+        if before is not None:
+            sql += " AND started_at < ?"
+            parameters.append(before)
+        rows = self._query(sql + " ORDER BY wpm DESC LIMIT 1", parameters)
+        return _session_from_row(rows[0]) if rows else None
+
+    def recent_sessions(self, limit: int = 20, exercise_id: Optional[str] = None,
+                        user: Optional[str] = None) -> List[SessionRecord]:
+        """Get the most recent sessions, newest first.
+
+        Args:
+            limit: Maximum number of sessions
+            exercise_id: Only sessions on this exercise
+            user: User to look up (the store's user if not given)
+
+        Returns:
+            List of SessionRecord (without key stats)
+        """
+        sql = ("SELECT id, user, exercise_id, started_at, wpm, accuracy, elapsed_time, mistakes,"
+               " typed_chars FROM sessions WHERE user = ?")
+        parameters = [user or self.user]
+        if exercise_id is not None:
+            sql += " AND exercise_id = ?"
+            parameters.append(exercise_id)
+        rows = self._query(sql + " ORDER BY started_at DESC LIMIT ?", parameters + [limit])
+        return [_session_from_row(row) for row in rows]
+
+    def progress(self, days: int = 30, exercise_id: Optional[str] = None,
+                 user: Optional[str] = None) -> List[DayProgress]:
+        """Get per-day results for progress charts, oldest day first.
+
+        Args:
+            days: Number of most recent days with sessions to include
+            exercise_id: Only sessions on this exercise
+            user: User to look up (the store's user if not given)
+
+        Returns:
+            List of DayProgress
+        """
+        sql = ("SELECT day, COUNT(*), AVG(wpm), MAX(wpm), AVG(accuracy) FROM sessions"
+               " WHERE user = ?")
+        parameters = [user or self.user]
+        if exercise_id is not None:
+            sql += " AND exercise_id = ?"
+            parameters.append(exercise_id)
+        rows = self._query(sql + " GROUP BY day ORDER BY day DESC LIMIT ?", parameters + [days])
+        return [DayProgress(*row) for row in reversed(rows)]
+
+    def key_stats(self, since: Optional[float] = None, user: Optional[str] = None) -> Dict[str, KeyStat]:
+        """Get per-key statistics summed over sessions.
+
+        Args:
+            since: Only sessions started at or after this Unix time
+            user: User to look up (the store's user if not given)
+
+        Returns:
+            KeyStat by character
+        """
+        return self._summed_stats("key_stats", "key", since, user)
+
+    def bigram_stats(self, since: Optional[float] = None, user: Optional[str] = None) -> Dict[str, KeyStat]:
+        """Get per-bigram statistics summed over sessions.
+
+        Args:
+            since: Only sessions started at or after this Unix time
+            user: User to look up (the store's user if not given)
+
+        Returns:
+            KeyStat of the second key, by two-character string
+        """
+        return self._summed_stats("bigram_stats", "bigram", since, user)
+
+    def _summed_stats(self, table: str, column: str, since: Optional[float],
+                      user: Optional[str]) -> Dict[str, KeyStat]:
+        """Sum a per-session statistics table over the user's sessions."""
+        sql = (f"SELECT k.{column}, SUM(k.attempts), SUM(k.errors),"
+               " SUM(k.mean_latency_ms * k.attempts) / SUM(CASE WHEN k.mean_latency_ms IS NULL"
+               " THEN 0 ELSE k.attempts END)"
+               f" FROM sessions s JOIN {table} k ON k.session_id = s.id WHERE s.user = ?")
+        parameters = [user or self.user]
+        if since is not None:
+            sql += " AND s.started_at >= ?"
+            parameters.append(since)
+        rows = self._query(sql + f" GROUP BY k.{column}", parameters)
+        return {key: KeyStat(attempts, errors, latency) for key, attempts, errors, latency in rows}
+
+
+def _day(timestamp: float) -> str:
+    """Format a Unix time as a local YYYY-MM-DD date."""
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp))
+
+
+def _session_from_row(row) -> SessionRecord:
+    """Build a SessionRecord from a sessions row."""
+    session_id, user, exercise_id, started_at, wpm, accuracy, elapsed_time, mistakes, typed_chars = row
+    return SessionRecord(
+        exercise_id=exercise_id,
+        wpm=wpm,
+        accuracy=accuracy,
+        elapsed_time=elapsed_time,
+        mistakes=mistakes,
+        typed_chars=typed_chars,
+        started_at=started_at,
+        user=user,
+        id=session_id,
+    )
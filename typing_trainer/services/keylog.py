@@ -0,0 +1,88 @@
+"""Keystroke event log service."""
+
+import time
+from array import array
+from typing import Iterator, NamedTuple, Optional
+
+
+# Code stored as the typed character for a backspace
+BACKSPACE = 0x08
+
+# Default maximum number of events kept (about 10 MB)
+DEFAULT_MAX_EVENTS = 500_000
+
+
+class KeyEvent(NamedTuple):
+    """A single logged key event.
+
+    Attributes:
+        timestamp_ns: time.perf_counter_ns() when the key was processed
+        expected: Character that should have been typed
+        typed: Character that was typed (BACKSPACE_CHAR for a backspace)
+        line_index: Index of the exercise line being typed
+    """
+    timestamp_ns: int
+    expected: str
+    typed: str
+    line_index: int
+
+
+BACKSPACE_CHAR = chr(BACKSPACE)
+
+
+class KeystrokeLog:
+    """Append-only log of key events stored in typed arrays.
+
+    Each event takes 20 bytes: an int64 timestamp plus three uint32 fields.
+    When the log reaches max_events the oldest half is dropped, so memory
+    stays bounded on very long exercises while appends remain O(1) amortized.
+    """
+
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+        """Initialize an empty log.
+
+        Args:
+            max_events: Maximum number of events to keep
+        """
+        self.max_events = max_events
+        self.timestamps = array('q')
+        self.expected = array('I')
+        self.typed = array('I')
+        self.line_indices = array('I')
+        # Number of events discarded to stay within max_events
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def record(self, expected: str, typed: str, line_index: int,
+               timestamp_ns: Optional[int] = None) -> None:
+        """Append a key event.
+
+        Args:
+            expected: Character that should have been typed
+            typed: Character that was typed (BACKSPACE_CHAR for a backspace)
+            line_index: Index of the exercise line being typed
+            timestamp_ns: Event time from time.perf_counter_ns() (now if not given)
+        """
+        if len(self.timestamps) >= self.max_events:
+            self._drop_oldest(max(1, self.max_events // 2))
+
+        self.timestamps.append(time.perf_counter_ns() if timestamp_ns is None else timestamp_ns)
+        self.expected.append(ord(expected) if expected else 0)
+        self.typed.append(ord(typed))
+        self.line_indices.append(line_index)
+
+    def events(self) -> Iterator[KeyEvent]:
+        """Iterate over the logged events, oldest first."""
+        for timestamp_ns, expected, typed, line_index in zip(
+                self.timestamps, self.expected, self.typed, self.line_indices):
+            yield KeyEvent(timestamp_ns, chr(expected) if expected else "", chr(typed), line_index)
+
+    def _drop_oldest(self, count: int) -> None:
+        """Discard the oldest events."""
+        del self.timestamps[:count]
+        del self.expected[:count]
+        del self.typed[:count]
+        del self.line_indices[:count]
+        self.dropped += count
@@ -1,112 +1,332 @@
 """Exercise loader service."""
 
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
-from ..models import Exercise
+from typing import Callable, Dict, List, Optional
+from ..models import Exercise, decode_exercise_body, text_cache
+from .bundle import BUNDLE_SUFFIX, ExerciseBundle
+from .ngrams import NgramIndex, count_grams
+
+
+# Bump when the layout of index entries changes
+INDEX_VERSION = 4
 
 
 class ExerciseLoader:
-    """Loads exercises from .txt files in one or more directories."""
-    
-    def __init__(self, exercises_dirs):
+    """Loads exercises from .txt files and packed bundles in one or more directories."""
+
+    def __init__(self, exercises_dirs, index_path: Optional[Path] = None):
         """Initialize the loader with exercises directory/directories.
-        
+
         Args:
             exercises_dirs: Path or list of Paths to directories containing exercise files
+            index_path: Optional path of an on-disk index of parsed exercises. Files whose
+                mtime and size match their index entry are not re-read on startup.
         """
         # Support both single path and list of paths
         if isinstance(exercises_dirs, (Path, str)):
             self.exercises_dirs = [Path(exercises_dirs)]
         else:
             self.exercises_dirs = [Path(d) for d in exercises_dirs]
-    
-    def load_exercises(self) -> List[Exercise]:
+        self.index_path = Path(index_path) if index_path else None
+        
+        # (path, error message) for files that failed in the last load
+        self.errors = []
+        
+        # Open bundles by path, and their exercises by directory and ID
+        self.bundles: Dict[Path, ExerciseBundle] = {}
+        self.bundled: Dict[Path, Dict[str, Exercise]] = {}
+        
+        # Characters and bigrams of the loaded exercises
+        self.ngram_index = NgramIndex()
+
+    def load_exercises(self, on_batch: Optional[Callable[[List[Exercise], int, int], None]] = None,
+                       batch_size: int = 64, max_workers: Optional[int] = None) -> List[Exercise]:
         """Load all exercises from .txt files in all exercises directories.
         
+        Files are read in a thread pool. Only metadata is kept in memory; the
+        text of an exercise is read when it is opened. Files that cannot be
+        loaded are skipped and recorded in `errors`.
+        
+        Args:
+            on_batch: Optional callback receiving (new exercises, files done, total files)
+                as loading progresses. Batches arrive in final (sorted) order.
+            batch_size: Number of files per on_batch call
+            max_workers: Size of the thread pool (default chosen by ThreadPoolExecutor)
+        
         Returns:
             List of Exercise objects sorted by filename
         """
+        self.errors = []
+        self.ngram_index = NgramIndex()
+        old_index = self._read_index()
+        new_index = {}
+        
+        candidates = self._find_exercise_files()
+        total = len(candidates)
         exercises = []
-        seen_ids = set()  # Track IDs to avoid duplicates
+        batch = []
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(lambda paths: self._load_first(paths, old_index), candidates)
+            for done, (exercise, entries, errors, grams) in enumerate(results, start=1):
+                new_index.update(entries)
+                self.errors.extend(errors)
+                if exercise is not None:
+                    self.ngram_index.add(exercise.id, grams)
+                    exercises.append(exercise)
+                    batch.append(exercise)
+                if on_batch and (len(batch) >= batch_size or done == total):
+                    on_batch(batch, done, total)
+                    batch = []
         
-        # Load from all directories (external directory first for priority)
+        if new_index != old_index:
+            self._write_index(new_index)
+        
+        return exercises
+    
+    def _find_exercise_files(self) -> List[list]:
+        """Find exercise files and bundled exercises, grouped by exercise ID.
+        
+        Returns:
+            One list of candidates (paths of .txt files or bundled Exercise
+            records) per exercise ID, sorted by ID. Within a list, later
+            directories come first (external overrides internal), and inside
+            a directory .txt files come before bundled exercises.
+        """
+        candidates = {}
         for exercises_dir in reversed(self.exercises_dirs):
             if not exercises_dir.exists():
                 continue
-            
-            # Find all .txt files in the exercises directory
-            txt_files = sorted(exercises_dir.glob("*.txt"))
-            
-            for file_path in txt_files:
+            for file_path in exercises_dir.glob("*.txt"):
+                candidates.setdefault(file_path.stem, []).append(file_path)
+            for exercise in self._load_bundles(exercises_dir).values():
+                candidates.setdefault(exercise.id, []).append(exercise)
+        return [candidates[exercise_id] for exercise_id in sorted(candidates)]
+    
+    def _load_bundles(self, exercises_dir: Path) -> Dict[str, Exercise]:
+        """Open the bundles in a directory (once) and collect their exercises.
+        
+        Args:
+            exercises_dir: Directory to look for bundle files in
+        
+        Returns:
+            Bundled exercises by ID
+        """
+        bundled = {}
+        for bundle_path in sorted(exercises_dir.glob(f"*{BUNDLE_SUFFIX}")):
+            bundle = self.bundles.get(bundle_path)
+            if bundle is None:
                 try:
-                    exercise = self._load_exercise(file_path)
-                    # Only add if we haven't seen this ID before (external overrides internal)
-                    if exercise.id not in seen_ids:
-                        exercises.append(exercise)
-                        seen_ids.add(exercise.id)
+                    bundle = ExerciseBundle(bundle_path)
                 except Exception as e:
-                    # Skip files that can't be loaded
-                    print(f"Warning: Could not load {file_path}: {e}")
+                    self.errors.append((bundle_path, str(e)))
+                    continue
+                self.bundles[bundle_path] = bundle
+            for exercise in bundle.exercises():
+                bundled.setdefault(exercise.id, exercise)
+        self.bundled[exercises_dir] = bundled
+        return bundled
+    
+    def load_candidates(self, paths: list):
+        """Load one exercise from its candidates, skipping the index.
         
-        # Sort by ID to maintain consistent order
-        exercises.sort(key=lambda e: e.id)
-        return exercises
+        Args:
+            paths: Candidate files (or bundled exercises) for one exercise ID in priority order
+        
+        Returns:
+            Tuple of (Exercise or None, list of (path, error message))
+        """
+        exercise, _, errors, grams = self._load_first(paths, {})
+        if exercise is not None:
+            self.ngram_index.add(exercise.id, grams)
+        return exercise, errors
+    
+    def _load_first(self, paths: list, old_index: dict):
+        """Load the first loadable file among candidates for one exercise ID.
+        
+        Args:
+            paths: Candidate files (or bundled exercises) in priority order
+            old_index: Index entries from the previous run
+        
+        Returns:
+            Tuple of (Exercise or None, new index entries, list of (path, error message),
+            gram counts of the exercise text)
+        """
+        entries = {}
+        errors = []
+        for file_path in paths:
+            if isinstance(file_path, Exercise):
+                # Already indexed inside a bundle (older bundles have no gram counts)
+                grams = file_path.store.grams(file_path.id)
+                if grams is None:
+                    grams = count_grams(file_path.text)
+                return file_path, entries, errors, grams
+            try:
+                key = str(file_path.resolve())
+                stat = file_path.stat()
+                entry = old_index.get(key)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    exercise = self._exercise_from_entry(file_path, entry)
+                else:
+                    exercise, entry = self._index_exercise(file_path, stat)
+                entries[key] = entry
+                return exercise, entries, errors, entry["grams"]
+            except Exception as e:
+                # Skip files that can't be loaded
+                errors.append((file_path, str(e)))
+        return None, entries, errors, {}
     
     def _load_exercise(self, file_path: Path) -> Exercise:
         """Load a single exercise from a file.
-        
+
         The file may optionally start with metadata tags like 'keyboard-layout: Norwegian'.
         The first non-metadata line is the title, and the remaining lines are the exercise text.
-        
+
         Args:
             file_path: Path to the exercise file
-            
+
         Returns:
             Exercise object
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
+        with open(file_path, 'rb') as f:
+            data = f.read()
+            stat = os.fstat(f.fileno())
+        exercise = self._parse_exercise(file_path, data)
+        exercise.source_mtime_ns = stat.st_mtime_ns
+        exercise.source_size = stat.st_size
+        return exercise
+
+    def _parse_exercise(self, file_path: Path, data: bytes) -> Exercise:
+        """Parse the contents of an exercise file.
+
+        Args:
+            file_path: Path to the exercise file
+            data: Raw file contents
+
+        Returns:
+            Exercise object (metadata only)
+        """
+        lines = data.splitlines(keepends=True)
+
         if not lines:
             raise ValueError("Exercise file is empty")
-        
+
         layout = "English"
         start_index = 0
-        
+        offset = 0
+
         # Parse metadata
         while start_index < len(lines):
-            line = lines[start_index].strip()
+            line = lines[start_index].decode('utf-8').strip()
             if line.lower().startswith("keyboard-layout:") or line.lower().startswith("language:"):
                 value = line.split(":", 1)[1].strip()
                 if "norwegian" in value.lower():
                     layout = "Norwegian"
                 elif "english" in value.lower():
                     layout = "English"
+                offset += len(lines[start_index])
                 start_index += 1
             else:
                 break
-        
+
         if start_index >= len(lines):
              raise ValueError("Exercise file has only metadata or is empty")
 
         # First non-metadata line is the title
-        title = lines[start_index].strip()
-        
+        title = lines[start_index].decode('utf-8').strip()
+        offset += len(lines[start_index])
+
         # Rest is the exercise text
-        text = ''.join(lines[start_index + 1:]).strip()
-        
+        text = decode_exercise_body(data[offset:])
+
         if not text:
             # If text is empty, maybe the title was the text?
             # But based on spec, title is mandatory.
              raise ValueError("Exercise text is empty")
-        
+
         # Use filename (without extension) as ID
         exercise_id = file_path.stem
-        
+
         return Exercise(
             id=exercise_id,
             title=title,
-            text=text,
             source_path=file_path,
-            layout=layout
+            layout=layout,
+            body_offset=offset,
+            word_count=len(text.split()),
+            char_count=len(text)
+        )
+
+    def _index_exercise(self, file_path: Path, stat: os.stat_result):
+        """Parse an exercise file and build its index entry.
+
+        Args:
+            file_path: Path to the exercise file
+            stat: Result of stat() on the file
+
+        Returns:
+            Tuple of (Exercise, index entry dict)
+        """
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        exercise = self._parse_exercise(file_path, data)
+        exercise.source_mtime_ns = stat.st_mtime_ns
+        exercise.source_size = stat.st_size
+        # The file is new or changed, so any text cached from it is stale
+        text_cache.discard(file_path)
+        entry = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "id": exercise.id,
+            "title": exercise.title,
+            "layout": exercise.layout,
+            "body_offset": exercise.body_offset,
+            "word_count": exercise.word_count,
+            "char_count": exercise.char_count,
+            "grams": count_grams(decode_exercise_body(data[exercise.body_offset:])),
+        }
+        return exercise, entry
+
+    def _exercise_from_entry(self, file_path: Path, entry: dict) -> Exercise:
+        """Build an exercise record from an index entry."""
+        return Exercise(
+            id=entry["id"],
+            title=entry["title"],
+            source_path=file_path,
+            layout=entry["layout"],
+            body_offset=entry["body_offset"],
+            word_count=entry["word_count"],
+            char_count=entry["char_count"],
+            source_mtime_ns=entry["mtime_ns"],
+            source_size=entry["size"]
         )
+
+    def _read_index(self) -> dict:
+        """Read the on-disk index, returning an empty index if unavailable."""
+        if not self.index_path:
+            return {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+
+    def _write_index(self, files: dict) -> None:
+        """Write the on-disk index atomically. Failures are ignored."""
+        if not self.index_path:
+            return
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"version": INDEX_VERSION, "files": files}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # The index is only a cache; running without it is fine
+            pass
@@ -1,6 +1,185 @@
 """Metrics calculation service."""
 
-from typing import Tuple
+from typing import NamedTuple, Optional, Tuple
+
+
+# Standard word length used for WPM
+CHARS_PER_WORD = 5.0
+
+# Smallest band tried by the banded alignment
+MIN_ALIGNMENT_BAND = 8
+
+# Most band cells one alignment pass may compute (about 50 ms in CPython); the
+# band stops growing at this budget
+MAX_ALIGNMENT_CELLS = 100_000
+
+
+class AlignmentResult(NamedTuple):
+    """Edit-distance alignment of typed text against target text.
+    
+    Attributes:
+        matches: Characters typed correctly
+        substitutions: Characters typed wrong
+        insertions: Extra characters typed that are not in the target
+        deletions: Target characters that were skipped
+    """
+    matches: int = 0
+    substitutions: int = 0
+    insertions: int = 0
+    deletions: int = 0
+    
+    @property
+    def errors(self) -> int:
+        """Total number of edits (the edit distance)."""
+        return self.substitutions + self.insertions + self.deletions
+    
+    @property
+    def accuracy(self) -> float:
+        """Percentage of aligned positions that are matches (100 if both texts are empty)."""
+        total = self.matches + self.errors
+        if total == 0:
+            return 100.0
+        return self.matches / total * 100.0
+    
+    def merged(self, other: "AlignmentResult") -> "AlignmentResult":
+        """Combine with the alignment of another part of the text (e.g. the next line)."""
+        return AlignmentResult(
+            self.matches + other.matches,
+            self.substitutions + other.substitutions,
+            self.insertions + other.insertions,
+            self.deletions + other.deletions
+        )
+
+
+def align_texts(target_text: str, typed_text: str, band: Optional[int] = None) -> AlignmentResult:
+    """Align typed text against target text with minimal edits.
+    
+    Uses a banded Levenshtein computation that only keeps two rows of the
+    band in memory, so it runs in O(n * k) time and O(k) memory where k is
+    the band width. The band follows the diagonal from the start of both
+    texts to the end of both, so a difference in length does not widen it.
+    Without an explicit band, the band starts small and is doubled until the
+    result is provably optimal (edit distance < band), but not past
+    MAX_ALIGNMENT_CELLS cells: long lines typed with many errors get the best
+    alignment inside the widest affordable band instead.
+    
+    Args:
+        target_text: The text that should have been typed
+        typed_text: The text that was actually typed
+        band: Fixed band width (may give a non-optimal alignment if too small)
+    
+    Returns:
+        AlignmentResult with matches and separate edit counts
+    """
+    if not target_text or not typed_text:
+        return AlignmentResult(insertions=len(typed_text), deletions=len(target_text))
+    if band is not None:
+        return _banded_alignment(target_text, typed_text, max(band, 1))
+    
+    max_band = max((MAX_ALIGNMENT_CELLS // (len(target_text) + 1) - 1) // 2, MIN_ALIGNMENT_BAND)
+    band = MIN_ALIGNMENT_BAND
+    while True:
+        result = _banded_alignment(target_text, typed_text, band)
+        if result.errors < band or band >= max(len(target_text), len(typed_text)) or band >= max_band:
+            return result
+        band = min(band * 2, max_band)
+
+
+# Edit counts are packed into one int per cell: substitutions, insertions
+# and deletions in 21-bit fields
+_FIELD_BITS = 21
+_SUB = 1
+_INS = 1 << _FIELD_BITS
+_DEL = 1 << (2 * _FIELD_BITS)
+_FIELD_MASK = _INS - 1
+
+
+def _banded_alignment(target_text: str, typed_text: str, band: int) -> AlignmentResult:
+    """Banded edit-distance alignment around the diagonal from (0, 0) to (n, m).
+    
+    Row i keeps the columns within band of its diagonal column i * m // n.
+    An optimal path with e edits never strays more than e + 1 columns from
+    that diagonal, so the result is optimal when its edit distance is below
+    the band. Each cell holds its cost and the packed edit counts of one
+    optimal path to it, so no traceback matrix is needed.
+    
+    Args:
+        target_text: The text that should have been typed (rows, index i), not empty
+        typed_text: The text that was actually typed (columns, index j), not empty
+        band: Band width, at least 1 (widened for typed text much longer than the target)
+    
+    Returns:
+        AlignmentResult for the best path inside the band
+    """
+    n = len(target_text)
+    m = len(typed_text)
+    # The diagonal column may step by up to ceil(m / n) per row; a band at
+    # least that wide keeps every row reachable from the one above
+    band = max(band, -(-m // n))
+    infinity = n + m + 1
+    width = 2 * band + 1
+    
+    # Row i covers columns j = center + d - band for d in range(width)
+    cost = [infinity] * width
+    ops = [0] * width
+    for d in range(band, min(width, band + m + 1)):
+        j = d - band
+        cost[d] = j
+        ops[d] = j * _INS
+    center = 0
+    
+    for i in range(1, n + 1):
+        target_char = target_text[i - 1]
+        previous_center = center
+        center = i * m // n
+        # Offset of the previous row's d for the same column
+        shift = center - previous_center
+        new_cost = [infinity] * width
+        new_ops = [0] * width
+        j_start = max(0, center - band)
+        j_end = min(m, center + band)
+        for j in range(j_start, j_end + 1):
+            d = j - center + band
+            if j == 0:
+                # Only deletions lead here
+                new_cost[d] = i
+                new_ops[d] = i * _DEL
+                continue
+            
+            best = infinity
+            best_ops = 0
+            
+            # Diagonal: previous row, column j - 1
+            diagonal = d + shift - 1
+            if 0 <= diagonal < width:
+                best = cost[diagonal]
+                best_ops = ops[diagonal]
+                if target_char != typed_text[j - 1]:
+                    best += 1
+                    best_ops += _SUB
+            
+            # Deletion (skip target char): previous row, column j
+            above = d + shift
+            if above < width and cost[above] + 1 < best:
+                best = cost[above] + 1
+                best_ops = ops[above] + _DEL
+            
+            # Insertion (extra typed char): this row, column j - 1
+            if d > 0 and new_cost[d - 1] + 1 < best:
+                best = new_cost[d - 1] + 1
+                best_ops = new_ops[d - 1] + _INS
+            
+            new_cost[d] = best
+            new_ops[d] = best_ops
+        cost = new_cost
+        ops = new_ops
+    
+    packed = ops[band]
+    substitutions = packed & _FIELD_MASK
+    insertions = (packed >> _FIELD_BITS) & _FIELD_MASK
+    deletions = packed >> (2 * _FIELD_BITS)
+    matches = n - substitutions - deletions
+    return AlignmentResult(matches, substitutions, insertions, deletions)
 
 
 class MetricsCalculator:
@@ -23,7 +202,7 @@ class MetricsCalculator:
             return 0.0
         
         # Standard: 1 word = 5 characters
-        words = characters_typed / 5.0
+        words = characters_typed / CHARS_PER_WORD
         minutes = elapsed_seconds / 60.0
         
         return words / minutes if minutes > 0 else 0.0
@@ -61,6 +240,22 @@ class MetricsCalculator:
         
         return accuracy
     
+    @staticmethod
+    def calculate_alignment_accuracy(target_text: str, typed_text: str) -> float:
+        """Calculate typing accuracy using edit-distance alignment.
+        
+        Unlike calculate_accuracy, a skipped or extra character only counts
+        as one error instead of shifting everything after it.
+        
+        Args:
+            target_text: The text that should have been typed
+            typed_text: The text that was actually typed
+            
+        Returns:
+            Accuracy percentage (0-100)
+        """
+        return align_texts(target_text, typed_text).accuracy
+    
     @staticmethod
     def get_character_status(target_text: str, typed_text: str, position: int) -> str:
         """Get the status of a character at a specific position.
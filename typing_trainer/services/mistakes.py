@@ -0,0 +1,222 @@
+"""Per-key mistake statistics service."""
+
+import heapq
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+# Number of keys ranked by default (the keyboard highlights three)
+DEFAULT_TOP_K = 3
+
+# Rescale exponentially weighted scores before they can overflow a float
+_MAX_EXPONENT = 500.0
+
+
+def is_rankable(char: str) -> bool:
+    """Whether a mistaken character may appear in the rankings.
+
+    Space counts, other whitespace (such as newlines) does not.
+    """
+    return bool(char) and (char == ' ' or bool(char.strip()))
+
+
+class _TopK:
+    """Ranking of the k highest scores, kept up to date one increment at a time.
+
+    Ties are ranked by which key was seen first, like a stable sort of the
+    scores in insertion order.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.keys: List[str] = []
+        # Order in which keys were first seen, for tie-breaking
+        self.order: Dict[str, int] = {}
+
+    def _ahead(self, key: str, other: str, scores: Dict[str, float]) -> bool:
+        """Whether key ranks ahead of other."""
+        score = scores[key]
+        other_score = scores[other]
+        return score > other_score or (score == other_score and self.order[key] < self.order[other])
+
+    def increased(self, key: str, scores: Dict[str, float]) -> None:
+        """Update the ranking after the score of key went up."""
+        self.order.setdefault(key, len(self.order))
+        keys = self.keys
+        try:
+            position = keys.index(key)
+        except ValueError:
+            if len(keys) < self.k:
+                keys.append(key)
+            elif self._ahead(key, keys[-1], scores):
+                keys[-1] = key
+            else:
+                return
+            position = len(keys) - 1
+
+        # Move up past keys ranked behind it
+        while position > 0 and self._ahead(key, keys[position - 1], scores):
+            keys[position] = keys[position - 1]
+            position -= 1
+        keys[position] = key
+
+    def rebuild(self, scores: Dict[str, float]) -> None:
+        """Recompute the ranking from scratch (after scores went down)."""
+        order = self.order
+        self.keys = heapq.nsmallest(
+            self.k, (key for key, score in scores.items() if score > 0),
+            key=lambda key: (-scores[key], order[key]))
+
+
+class MistakeStats:
+    """Counts mistakes per expected character and keeps the worst keys ranked.
+
+    The top-k keys are maintained incrementally as mistakes are recorded, so
+    reading them on every keystroke never sorts the whole key space.
+
+    The ranking returned by top() can optionally favour recent mistakes:
+
+    - window_seconds: only mistakes from the last N seconds count
+    - half_life_seconds: mistakes are weighted exponentially, halving in
+      weight every half_life_seconds
+
+    Total counts (and top_total()) are never decayed.
+    """
+
+    def __init__(self, k: int = DEFAULT_TOP_K, window_seconds: Optional[float] = None,
+                 half_life_seconds: Optional[float] = None):
+        """Initialize empty statistics.
+
+        Args:
+            k: Number of keys to keep ranked
+            window_seconds: Rank by mistakes within this trailing window
+            half_life_seconds: Rank by exponentially weighted mistakes with this half-life
+
+        Raises:
+            ValueError: If both window_seconds and half_life_seconds are given
+        """
+        if window_seconds is not None and half_life_seconds is not None:
+            raise ValueError("Use either window_seconds or half_life_seconds, not both")
+
+        self.k = k
+        self.window_seconds = window_seconds
+        self.half_life_seconds = half_life_seconds
+
+        # Total mistakes per expected character (all characters, never decayed)
+        self.counts: Dict[str, int] = {}
+        self.total = 0
+        self._total_top = _TopK(k)
+
+        # Decayed scores of rankable characters, only used with a decay option
+        self._scores: Dict[str, float] = {}
+        self._score_top = _TopK(k)
+        self._events: Deque[Tuple[float, str]] = deque()
+        self._origin: Optional[float] = None
+        self._rate = math.log(2) / half_life_seconds if half_life_seconds else 0.0
+
+    @property
+    def decays(self) -> bool:
+        """Whether top() favours recent mistakes."""
+        return self.window_seconds is not None or self.half_life_seconds is not None
+
+    def record(self, char: str, timestamp: Optional[float] = None) -> None:
+        """Record a mistake on an expected character.
+
+        Args:
+            char: The character that should have been typed
+            timestamp: time.perf_counter() of the mistake (now if not given)
+        """
+        self.counts[char] = self.counts.get(char, 0) + 1
+        self.total += 1
+        if not is_rankable(char):
+            return
+
+        self._total_top.increased(char, self.counts)
+        if not self.decays:
+            return
+
+        if timestamp is None:
+            timestamp = time.perf_counter()
+
+        if self.window_seconds is not None:
+            self._expire(timestamp)
+            self._events.append((timestamp, char))
+            self._scores[char] = self._scores.get(char, 0) + 1
+        else:
+            # Weights grow with time instead of old scores shrinking, which
+            # keeps the ordering without touching the other keys
+            if self._origin is None:
+                self._origin = timestamp
+            exponent = (timestamp - self._origin) * self._rate
+            if exponent > _MAX_EXPONENT:
+                self._rescale(timestamp)
+                exponent = 0.0
+            self._scores[char] = self._scores.get(char, 0.0) + math.exp(exponent)
+
+        self._score_top.increased(char, self._scores)
+
+    def top(self, n: Optional[int] = None, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Get the most mistaken keys, using the configured decay.
+
+        Args:
+            n: Number of keys (at most k, default k)
+            now: time.perf_counter() to evaluate the decay at (now if not given)
+
+        Returns:
+            List of (char, score) with the highest score first. Without decay
+            the score is the mistake count; with a window it is the count in
+            the window; with a half-life it is the weighted count at `now`.
+        """
+        if not self.decays:
+            return self.top_total(n)
+
+        if now is None:
+            now = time.perf_counter()
+        if self.window_seconds is not None:
+            self._expire(now)
+            return [(char, self._scores[char]) for char in self._score_top.keys[:n]]
+
+        keys = self._score_top.keys[:n]
+        factor = math.exp(-(now - self._origin) * self._rate) if self._origin is not None else 1.0
+        return [(char, self._scores[char] * factor) for char in keys]
+
+    def top_keys(self, n: Optional[int] = None, now: Optional[float] = None) -> List[str]:
+        """Get just the characters of top()."""
+        if not self.decays:
+            return self._total_top.keys[:n]
+        return [char for char, _ in self.top(n, now)]
+
+    def top_total(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Get the keys with the most mistakes over the whole session.
+
+        Args:
+            n: Number of keys (at most k, default k)
+
+        Returns:
+            List of (char, count) with the highest count first
+        """
+        return [(char, self.counts[char]) for char in self._total_top.keys[:n]]
+
+    def _expire(self, now: float) -> None:
+        """Drop windowed mistakes older than the window."""
+        events = self._events
+        cutoff = now - self.window_seconds
+        rebuild = False
+        while events and events[0][0] <= cutoff:
+            _, char = events.popleft()
+            remaining = self._scores[char] - 1
+            if remaining:
+                self._scores[char] = remaining
+            else:
+                del self._scores[char]
+            rebuild = rebuild or char in self._score_top.keys
+        if rebuild:
+            self._score_top.rebuild(self._scores)
+
+    def _rescale(self, timestamp: float) -> None:
+        """Move the weighting origin to timestamp so weights stay small."""
+        factor = math.exp(-(timestamp - self._origin) * self._rate)
+        self._scores = {char: score * factor for char, score in self._scores.items()}
+        self._origin = timestamp
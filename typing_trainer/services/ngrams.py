@@ -0,0 +1,134 @@
+"""Character and bigram index over the exercise library."""
+
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+
+def count_grams(text: str) -> Dict[str, int]:
+    """Count the characters and bigrams of a text.
+
+    Text is lower-cased (upper and lower case share a key). Whitespace is
+    not counted, except that space counts as a character, and bigrams never
+    span a line break.
+
+    Args:
+        text: Exercise text
+
+    Returns:
+        Count by character and by bigram
+    """
+    counts = Counter()
+    for line in text.lower().splitlines():
+        counts.update(line)
+        counts.update(line[i:i + 2] for i in range(len(line) - 1))
+    for gram in [gram for gram in counts if not gram.strip()]:
+        if gram != " ":
+            del counts[gram]
+    return dict(counts)
+
+
+class NgramIndex:
+    """Inverted index from characters and bigrams to the exercises containing them.
+
+    Exercises are ranked by density (occurrences per character of text), so
+    short drills are not drowned out by long texts. Ranked postings for a
+    single gram are cached, so repeated lookups do not sort again.
+
+    The index is safe to update from a loader or watcher thread while the
+    UI thread queries it.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        # Count by exercise ID, by gram
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # Number of characters counted in each exercise
+        self.sizes: Dict[str, int] = {}
+        # Grams of each exercise, for removal
+        self._grams: Dict[str, List[str]] = {}
+        self._ranked: Dict[str, List[Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def __contains__(self, exercise_id: str) -> bool:
+        return exercise_id in self.sizes
+
+    def add(self, exercise_id: str, counts: Dict[str, int]) -> None:
+        """Add (or replace) an exercise.
+
+        Args:
+            exercise_id: ID of the exercise
+            counts: Gram counts of its text, as returned by count_grams()
+        """
+        with self._lock:
+            self._remove(exercise_id)
+            for gram, count in counts.items():
+                self.postings.setdefault(gram, {})[exercise_id] = count
+                self._ranked.pop(gram, None)
+            self._grams[exercise_id] = list(counts)
+            self.sizes[exercise_id] = max(1, sum(count for gram, count in counts.items() if len(gram) == 1))
+
+    def remove(self, exercise_id: str) -> None:
+        """Remove an exercise (no-op if it is not indexed)."""
+        with self._lock:
+            self._remove(exercise_id)
+
+    def _remove(self, exercise_id: str) -> None:
+        for gram in self._grams.pop(exercise_id, ()):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.pop(exercise_id, None)
+                if not posting:
+                    del self.postings[gram]
+            self._ranked.pop(gram, None)
+        self.sizes.pop(exercise_id, None)
+
+    def count(self, gram: str, exercise_id: str) -> int:
+        """Get how often a character or bigram occurs in an exercise."""
+        return self.postings.get(gram.lower(), {}).get(exercise_id, 0)
+
+    def exercises_for(self, gram: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Rank the exercises that drill one character or bigram.
+
+        Args:
+            gram: Character or bigram (case is ignored)
+            limit: Maximum number of exercises (all if not given)
+
+        Returns:
+            List of (exercise ID, occurrences per character), densest first
+        """
+        gram = gram.lower()
+        with self._lock:
+            ranked = self._ranked.get(gram)
+            if ranked is None:
+                sizes = self.sizes
+                ranked = sorted(((exercise_id, count / sizes[exercise_id])
+                                 for exercise_id, count in self.postings.get(gram, {}).items()),
+                                key=lambda item: (-item[1], item[0]))
+                self._ranked[gram] = ranked
+        return ranked[:limit]
+
+    def rank(self, weights: Dict[str, float], limit: int = 10) -> List[Tuple[str, float]]:
+        """Rank exercises for a weighted set of characters and bigrams.
+
+        Args:
+            weights: Weight by character or bigram (e.g. from weak_key_weights())
+            limit: Maximum number of exercises
+
+        Returns:
+            List of (exercise ID, score) with the best match first, where the
+            score is the weighted sum of the densities of the grams
+        """
+        scores: Dict[str, float] = {}
+        with self._lock:
+            sizes = self.sizes
+            for gram, weight in weights.items():
+                if weight <= 0:
+                    continue
+                for exercise_id, count in self.postings.get(gram.lower(), {}).items():
+                    scores[exercise_id] = scores.get(exercise_id, 0.0) + weight * count / sizes[exercise_id]
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
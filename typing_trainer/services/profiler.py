@@ -0,0 +1,279 @@
+"""Keystroke latency and frame time profiler for the typing view."""
+
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional
+
+
+# Stages of the typing view's work that are timed
+STAGES = ("session", "stats", "target", "keyboard")
+
+# Ticks later than this many seconds past their interval count as overruns
+TICK_OVERRUN_SLACK = 0.005
+
+# Trace events kept per session, so a long session cannot use unbounded memory
+MAX_TRACE_EVENTS = 200_000
+
+# Most recent key presses kept for the latency percentiles; means and the
+# maximum cover the whole session
+LATENCY_WINDOW = 2000
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Get a percentile of sorted values (nearest rank), or 0 if there are none."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class _Keystroke:
+    """Timings of one key press, in seconds of the profiler clock."""
+
+    __slots__ = ("input_time", "handler_start", "handler_end", "painted", "stages")
+
+    def __init__(self, input_time: float, handler_start: float):
+        self.input_time = input_time
+        self.handler_start = handler_start
+        self.handler_end: Optional[float] = None
+        self.painted: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+
+
+class _StageTimer:
+    """Context manager that adds the time spent in its block to a stage."""
+
+    __slots__ = ("profiler", "stage", "start")
+
+    def __init__(self, profiler: "TypingProfiler", stage: str):
+        self.profiler = profiler
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = self.profiler.clock()
+
+    def __exit__(self, *exc_info) -> None:
+        profiler = self.profiler
+        elapsed = profiler.clock() - self.start
+        keystroke = profiler._current
+        if keystroke is not None:
+            keystroke.stages[self.stage] = keystroke.stages.get(self.stage, 0.0) + elapsed
+        elif profiler._in_tick:
+            profiler._add_event(f"tick {self.stage}", self.start, elapsed)
+
+
+class TypingProfiler:
+    """Collects per-keystroke latency, per-stage timings and timer tick overruns.
+
+    A key press is followed from the moment its input event was created,
+    through the handler and each update stage, until the screen has been
+    refreshed after it. Means are kept as running sums and percentiles over
+    the last LATENCY_WINDOW key presses, so memory and summary() stay
+    bounded in long sessions. Trace events (up to MAX_TRACE_EVENTS) are
+    written as a Chrome trace (viewable in chrome://tracing or Perfetto) by
+    dump().
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """Initialize the profiler.
+
+        Args:
+            clock: Clock to time everything with, in seconds
+        """
+        self.clock = clock
+        self.started = clock()
+        # Most recently painted keystrokes
+        self.keystrokes: Deque[_Keystroke] = deque(maxlen=LATENCY_WINDOW)
+        # Running totals over all painted keystrokes, in seconds
+        self.keystroke_count = 0
+        self.max_latency = 0.0
+        self._queued_total = 0.0
+        self._handler_total = 0.0
+        self._stage_totals: Dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        # (keystroke_count, sorted latencies in ms) of the last summary
+        self._sorted_latencies = (0, [])
+        # Keystroke currently being handled, if any
+        self._current: Optional[_Keystroke] = None
+        # Keystrokes handled but not painted yet
+        self._unpainted: List[_Keystroke] = []
+
+        self.ticks = 0
+        self.tick_overruns = 0
+        self.worst_tick_lateness = 0.0
+        self._last_tick: Optional[float] = None
+        self._in_tick = False
+        self._events: List[dict] = []
+
+    def key_started(self, queued: float = 0.0) -> None:
+        """Start timing a key press.
+
+        Args:
+            queued: Seconds the input event waited before it was handled, so
+                latency is counted from when the event was created
+        """
+        now = self.clock()
+        self._current = _Keystroke(now - max(queued, 0.0), now)
+
+    def key_handled(self) -> None:
+        """Finish timing the handler of the current key press."""
+        keystroke = self._current
+        if keystroke is None:
+            return
+        keystroke.handler_end = self.clock()
+        self._current = None
+        self._unpainted.append(keystroke)
+
+    def painted(self) -> None:
+        """Record that the screen was refreshed after the handled key presses."""
+        now = self.clock()
+        for keystroke in self._unpainted:
+            keystroke.painted = now
+            self.keystrokes.append(keystroke)
+            self.keystroke_count += 1
+            self.max_latency = max(self.max_latency, now - keystroke.input_time)
+            self._queued_total += keystroke.handler_start - keystroke.input_time
+            self._handler_total += keystroke.handler_end - keystroke.handler_start
+            for stage, seconds in keystroke.stages.items():
+                self._stage_totals[stage] = self._stage_totals.get(stage, 0.0) + seconds
+            self._add_keystroke_events(keystroke)
+        self._unpainted = []
+
+    def stage(self, stage: str) -> _StageTimer:
+        """Time a block of code as part of a stage.
+
+        Time spent while handling a key press is added to the key press;
+        time spent in a timer tick is recorded as a trace event.
+
+        Args:
+            stage: Name of the stage (see STAGES)
+
+        Returns:
+            Context manager to wrap the block in
+        """
+        return _StageTimer(self, stage)
+
+    def timed_tick(self, interval: float, function: Callable) -> Callable:
+        """Wrap a timer callback to time it and detect overruns.
+
+        A tick overruns when it runs more than TICK_OVERRUN_SLACK seconds
+        after the interval since the previous tick.
+
+        Args:
+            interval: Timer interval in seconds
+            function: Timer callback
+
+        Returns:
+            The wrapped callback
+        """
+        clock = self.clock
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            lateness = 0.0
+            if self._last_tick is not None:
+                lateness = max(0.0, start - self._last_tick - interval)
+            self._last_tick = start
+            self.ticks += 1
+            if lateness > TICK_OVERRUN_SLACK:
+                self.tick_overruns += 1
+                self.worst_tick_lateness = max(self.worst_tick_lateness, lateness)
+            self._in_tick = True
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._in_tick = False
+                self._add_event("tick", start, clock() - start,
+                                {"interval_ms": interval * 1000, "late_ms": round(lateness * 1000, 3)})
+        return wrapper
+
+    def reset_tick(self) -> None:
+        """Forget the last tick time (after the timer was restarted)."""
+        self._last_tick = None
+
+    def summary(self) -> dict:
+        """Summarize the collected timings, in milliseconds.
+
+        Returns:
+            Dict with latency percentiles (of the last LATENCY_WINDOW key
+            presses), maximum and mean times, and tick counts
+        """
+        count = self.keystroke_count
+        if self._sorted_latencies[0] != count:
+            self._sorted_latencies = (count, sorted((k.painted - k.input_time) * 1000 for k in self.keystrokes))
+        latencies = self._sorted_latencies[1]
+        scale = 1000 / count if count else 0.0
+        return {
+            "keystrokes": count,
+            "latency_ms": {
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "p99": _percentile(latencies, 99),
+                "max": self.max_latency * 1000,
+            },
+            "queued_ms_mean": self._queued_total * scale,
+            "handler_ms_mean": self._handler_total * scale,
+            "stage_ms_mean": {stage: self._stage_totals[stage] * scale for stage in STAGES},
+            "ticks": self.ticks,
+            "tick_overruns": self.tick_overruns,
+            "worst_tick_late_ms": self.worst_tick_lateness * 1000,
+        }
+
+    def format_overlay(self) -> str:
+        """Format the live overlay text."""
+        summary = self.summary()
+        latency = summary["latency_ms"]
+        stages = "  ".join(f"{stage} {value:.2f}" for stage, value in summary["stage_ms_mean"].items())
+        return (
+            f"PROFILER (F4)  keys {summary['keystrokes']}  |  input→paint ms: "
+            f"p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  max {latency['max']:.1f}  |  "
+            f"queued {summary['queued_ms_mean']:.2f}  handler {summary['handler_ms_mean']:.2f}\n"
+            f"stage means ms: {stages}  |  ticks {summary['ticks']}  "
+            f"overruns {summary['tick_overruns']}  worst late {summary['worst_tick_late_ms']:.1f}"
+        )
+
+    def dump(self, path: Path, metadata: Optional[dict] = None) -> Path:
+        """Write the collected timings as a Chrome trace file.
+
+        Args:
+            path: File to write (parent directories are created)
+            metadata: Extra information to store with the trace (e.g. the exercise)
+
+        Returns:
+            The path written
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        trace = {
+            "traceEvents": self._events,
+            "displayTimeUnit": "ms",
+            "otherData": {"summary": self.summary(), **(metadata or {})},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        return path
+
+    def _add_keystroke_events(self, keystroke: _Keystroke) -> None:
+        """Add trace events for a painted key press and its stages."""
+        self._add_event("keystroke", keystroke.input_time, keystroke.painted - keystroke.input_time,
+                        {"handler_ms": round((keystroke.handler_end - keystroke.handler_start) * 1000, 3)})
+        self._add_event("handler", keystroke.handler_start, keystroke.handler_end - keystroke.handler_start,
+                        {stage: round(seconds * 1000, 3) for stage, seconds in keystroke.stages.items()})
+
+    def _add_event(self, name: str, start: float, duration: float, args: Optional[dict] = None) -> None:
+        """Add a complete ("X") trace event, in microseconds since the profiler started."""
+        if len(self._events) >= MAX_TRACE_EVENTS:
+            return
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round((start - self.started) * 1e6, 1),
+            "dur": round(duration * 1e6, 1),
+            "pid": 1,
+            "tid": 1,
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
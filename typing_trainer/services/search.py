@@ -0,0 +1,231 @@
+"""Fuzzy exercise search service."""
+
+import time
+from typing import Iterable, List, Optional, Tuple
+from ..models import Exercise
+
+
+# Length filters by word count: (name, minimum words, maximum words)
+LENGTH_FILTERS = [
+    ("Short", 0, 99),
+    ("Medium", 100, 299),
+    ("Long", 300, None),
+]
+
+# Seconds of matching per step, so a search never holds up a frame
+DEFAULT_STEP_BUDGET = 0.008
+
+# Scoring of fuzzy matches
+_MATCH_SCORE = 1
+_CONSECUTIVE_BONUS = 4
+_WORD_START_BONUS = 3
+_PREFIX_BONUS = 6
+
+
+def _char_mask(text: str) -> int:
+    """Hash the characters of a text into a 64-bit mask for quick rejection."""
+    mask = 0
+    for char in text:
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def fuzzy_score(query: str, haystack: str) -> Optional[int]:
+    """Score how well a query matches a text as a subsequence.
+
+    Args:
+        query: Lower-case query
+        haystack: Lower-case text to search
+
+    Returns:
+        Score (higher is better), or None if the query's characters do not
+        all appear in order in the haystack
+    """
+    # A plain substring match always beats a scattered one
+    position = haystack.find(query)
+    if position >= 0:
+        score = len(query) * (_MATCH_SCORE + _CONSECUTIVE_BONUS)
+        if position == 0:
+            score += _PREFIX_BONUS
+        elif not haystack[position - 1].isalnum():
+            score += _WORD_START_BONUS
+        return score + _PREFIX_BONUS
+
+    score = 0
+    previous = -2
+    position = 0
+    for char in query:
+        position = haystack.find(char, position)
+        if position < 0:
+            return None
+        score += _MATCH_SCORE
+        if position == previous + 1:
+            score += _CONSECUTIVE_BONUS
+        if position == 0 or not haystack[position - 1].isalnum():
+            score += _WORD_START_BONUS
+        previous = position
+        position += 1
+    return score
+
+
+class SearchEntry:
+    """Precomputed search data for one exercise."""
+
+    __slots__ = ("exercise", "haystack", "mask", "length_filter")
+
+    def __init__(self, exercise: Exercise):
+        self.exercise = exercise
+        self.haystack = f"{exercise.title} {exercise.id}".lower()
+        self.mask = _char_mask(self.haystack)
+        self.length_filter = length_filter_for(exercise.word_count or 0)
+
+
+def length_filter_for(word_count: int) -> str:
+    """Get the name of the length filter a word count falls into."""
+    for name, minimum, maximum in LENGTH_FILTERS:
+        if word_count >= minimum and (maximum is None or word_count <= maximum):
+            return name
+    return LENGTH_FILTERS[-1][0]
+
+
+class SearchJob:
+    """A search in progress, run in small time-boxed steps.
+
+    Call step() until it returns True, then read results.
+    """
+
+    def __init__(self, entries: List[SearchEntry], query: str,
+                 layout: Optional[str] = None, length: Optional[str] = None, generation: int = 0):
+        """Prepare a search.
+
+        Args:
+            entries: Entries to search (the whole index, or the matches of a
+                previous query that this query extends)
+            query: Text to search for (case is ignored)
+            layout: Only exercises with this layout
+            length: Only exercises in this length filter (see LENGTH_FILTERS)
+            generation: SearchIndex.generation the entries were taken from
+        """
+        self.entries = entries
+        self.generation = generation
+        self.query = query.lower().strip()
+        self.layout = layout
+        self.length = length
+        self.matches: List[Tuple[int, int, SearchEntry]] = []
+        self.position = 0
+        self.done = False
+        self._mask = _char_mask(self.query.replace(" ", ""))
+
+    def step(self, budget: float = DEFAULT_STEP_BUDGET) -> bool:
+        """Match entries until the time budget is used up.
+
+        Args:
+            budget: Seconds to spend in this step
+
+        Returns:
+            True when the search is complete
+        """
+        deadline = time.perf_counter() + budget
+        entries = self.entries
+        terms = self.query.split()
+        query_mask = self._mask
+        layout = self.layout
+        length = self.length
+        end = len(entries)
+
+        position = self.position
+        while position < end:
+            # Check the clock every few hundred entries
+            chunk_end = min(position + 256, end)
+            for index in range(position, chunk_end):
+                entry = entries[index]
+                if layout is not None and entry.exercise.layout != layout:
+                    continue
+                if length is not None and entry.length_filter != length:
+                    continue
+                if query_mask & entry.mask != query_mask:
+                    continue
+                score = 0
+                for term in terms:
+                    term_score = fuzzy_score(term, entry.haystack)
+                    if term_score is None:
+                        break
+                    score += term_score
+                else:
+                    self.matches.append((-score, index, entry))
+            position = chunk_end
+            if time.perf_counter() >= deadline:
+                break
+
+        self.position = position
+        self.done = position >= end
+        return self.done
+
+    @property
+    def results(self) -> List[SearchEntry]:
+        """Matching entries, best first (ties keep index order)."""
+        return [entry for _, _, entry in sorted(self.matches, key=lambda match: match[:2])]
+
+
+class SearchIndex:
+    """Search data for every exercise.
+
+    Entries are built on the first search rather than when exercises are
+    added, so loading and opening the menu do not pay for searches that
+    may never happen.
+    """
+
+    def __init__(self, exercises: Iterable[Exercise] = ()):
+        """Initialize the index.
+
+        Args:
+            exercises: Exercises to index, in display order
+        """
+        self._entries: List[SearchEntry] = []
+        # Exercises added since the entries were last built
+        self._pending: List[Exercise] = list(exercises)
+        # Changes whenever entries change, so stale searches are not narrowed
+        self.generation = 0
+
+    @property
+    def entries(self) -> List[SearchEntry]:
+        """Search entries for every indexed exercise, in display order."""
+        if self._pending:
+            self._entries.extend(SearchEntry(exercise) for exercise in self._pending)
+            self._pending = []
+        return self._entries
+
+    def add(self, exercises: Iterable[Exercise]) -> None:
+        """Append exercises to the index."""
+        self._pending.extend(exercises)
+        self.generation += 1
+
+    def rebuild(self, exercises: Iterable[Exercise]) -> None:
+        """Replace the indexed exercises (e.g. after exercises changed on disk)."""
+        self._entries = []
+        self._pending = list(exercises)
+        self.generation += 1
+
+    def search(self, query: str, layout: Optional[str] = None, length: Optional[str] = None,
+               previous: Optional[SearchJob] = None) -> SearchJob:
+        """Start a search.
+
+        If the previous search is complete, used the same filters and the new
+        query extends its query, only its matches are searched again.
+
+        Args:
+            query: Text to search for in titles and IDs
+            layout: Only exercises with this layout
+            length: Only exercises in this length filter
+            previous: The search run for the previous query, if any
+
+        Returns:
+            A SearchJob to step until done
+        """
+        entries = self.entries
+        if (previous is not None and previous.done and previous.generation == self.generation
+                and previous.layout == layout and previous.length == length
+                and query.lower().strip().startswith(previous.query)):
+            # Narrow down within the earlier matches (they are in entry order)
+            entries = [entry for _, _, entry in previous.matches]
+        return SearchJob(entries, query, layout, length, self.generation)
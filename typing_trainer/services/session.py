@@ -0,0 +1,241 @@
+"""Headless typing session engine."""
+
+from typing import Dict, List, Optional
+from .keylog import BACKSPACE_CHAR, KeystrokeLog
+from .metrics import AlignmentResult, align_texts
+from .mistakes import MistakeStats
+
+
+# Character states for the current line
+PENDING = 0
+CORRECT = 1
+INCORRECT = 2
+
+
+class TypingSession:
+    """Tracks typing progress through an exercise one key event at a time.
+
+    The session knows nothing about Textual. Each key event updates the
+    state of a single character and marks the session as changed, so a
+    view only re-renders after something happened.
+    """
+
+    def __init__(self, lines: List[str], keylog: Optional[KeystrokeLog] = None,
+                 mistake_stats: Optional[MistakeStats] = None):
+        """Initialize the session.
+
+        Args:
+            lines: The lines of the exercise text to type
+            keylog: Log to record every key event in (a new one by default)
+            mistake_stats: Per-key mistake statistics to update (a new,
+                non-decaying one by default)
+        """
+        self.lines = lines
+        self.line_index = 0
+
+        # Per-character state of the current line (PENDING/CORRECT/INCORRECT)
+        self.status = bytearray(len(lines[0])) if lines else bytearray()
+        self.typed: List[str] = []
+
+        # Mistake counters; char_mistakes is the per-key count dict of mistake_stats
+        self.mistakes = 0
+        self.mistake_stats = mistake_stats if mistake_stats is not None else MistakeStats()
+        self.char_mistakes: Dict[str, int] = self.mistake_stats.counts
+
+        # Text typed on completed lines, one segment per line, with running
+        # counters so totals never require joining or re-scanning the text
+        self.completed_lines: List[str] = []
+        self.completed_chars = 0
+        self.completed_correct = 0
+        self.completed_target_chars = 0
+
+        # Correct characters on the current line
+        self.line_correct = 0
+
+        # Edit-distance alignment of completed lines, accumulated line by line
+        self.alignment = AlignmentResult()
+
+        # Timestamped record of every key event
+        self.keylog = keylog if keylog is not None else KeystrokeLog()
+
+        # Whether anything visible changed since the last take_changed()
+        self._changed = True
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether every line has been typed."""
+        return self.line_index >= len(self.lines)
+
+    @property
+    def current_line(self) -> str:
+        """The target text of the current line (empty when complete)."""
+        if self.is_complete:
+            return ""
+        return self.lines[self.line_index]
+
+    @property
+    def cursor(self) -> int:
+        """Position of the next character to type on the current line."""
+        return len(self.typed)
+
+    @property
+    def current_typed_text(self) -> str:
+        """The text typed so far on the current line."""
+        return "".join(self.typed)
+
+    @property
+    def next_char(self) -> Optional[str]:
+        """The next character expected, or None at the end of a line."""
+        line = self.current_line
+        cursor = len(self.typed)
+        if cursor < len(line):
+            return line[cursor]
+        return None
+
+    @property
+    def lines_left(self) -> int:
+        """Number of lines not yet completed."""
+        return len(self.lines) - self.line_index
+
+    @property
+    def typed_chars(self) -> int:
+        """Number of characters typed so far, including the current line."""
+        return self.completed_chars + len(self.typed)
+
+    @property
+    def correct_chars(self) -> int:
+        """Number of characters typed correctly so far, including the current line."""
+        return self.completed_correct + self.line_correct
+
+    @property
+    def position_accuracy(self) -> float:
+        """Position-by-position accuracy of the completed lines (0-100).
+
+        Equivalent to MetricsCalculator.calculate_accuracy on the joined
+        target and typed lines, but read from running counters.
+        """
+        total = max(self.completed_target_chars, self.completed_chars)
+        if total == 0:
+            return 100.0
+        return self.completed_correct / total * 100.0
+
+    @property
+    def line_full(self) -> bool:
+        """Whether the current line has been typed to its full length."""
+        return not self.is_complete and len(self.typed) >= len(self.current_line)
+
+    def type_char(self, char: str) -> bool:
+        """Process a single typed character.
+
+        Args:
+            char: The character that was typed
+
+        Returns:
+            True if the character was a mistake
+        """
+        if self.line_full or self.is_complete:
+            return False
+
+        position = len(self.typed)
+        expected_char = self.current_line[position]
+        self.typed.append(char)
+        self.keylog.record(expected_char, char, self.line_index)
+
+        is_mistake = char != expected_char
+        if is_mistake:
+            self.status[position] = INCORRECT
+            self.mistakes += 1
+            # Track specific character mistake
+            self.mistake_stats.record(expected_char)
+        else:
+            self.status[position] = CORRECT
+            self.line_correct += 1
+
+        self._changed = True
+        return is_mistake
+
+    def backspace(self) -> None:
+        """Remove the last typed character on the current line."""
+        if not self.typed:
+            return
+
+        self.typed.pop()
+        position = len(self.typed)
+        if self.status[position] == CORRECT:
+            self.line_correct -= 1
+        self.status[position] = PENDING
+        self.keylog.record(self.current_line[position], BACKSPACE_CHAR, self.line_index)
+
+        self._changed = True
+
+    def apply_text(self, text: str) -> None:
+        """Bring the current line in sync with the full content of an input widget.
+
+        Appending or deleting at the end of the line (the normal case while
+        typing) is translated into single key events. Any other edit rewinds
+        to the common prefix and replays the rest.
+
+        Args:
+            text: The complete text currently in the input widget
+        """
+        typed_len = len(self.typed)
+        new_len = len(text)
+
+        if new_len == typed_len + 1 and text[-1:] and self._typed_matches(text, typed_len):
+            self.type_char(text[-1])
+            return
+
+        if new_len < typed_len and self._typed_matches(text, new_len):
+            for _ in range(typed_len - new_len):
+                self.backspace()
+            return
+
+        # General edit (paste, selection replace, mid-line edit)
+        common = 0
+        limit = min(typed_len, new_len)
+        while common < limit and self.typed[common] == text[common]:
+            common += 1
+        for _ in range(typed_len - common):
+            self.backspace()
+        for char in text[common:]:
+            if self.line_full:
+                break
+            self.type_char(char)
+
+    def advance_line(self) -> None:
+        """Finish the current line and move on to the next one."""
+        if self.is_complete:
+            return
+
+        typed_line = "".join(self.typed)
+        self.completed_lines.append(typed_line)
+        self.completed_chars += len(typed_line)
+        self.completed_correct += self.line_correct
+        self.completed_target_chars += len(self.current_line)
+        self.line_correct = 0
+        self.alignment = self.alignment.merged(align_texts(self.current_line, typed_line))
+        self.line_index += 1
+        self.typed = []
+        self.status = bytearray(len(self.current_line))
+        self._changed = True
+
+    def take_changed(self) -> bool:
+        """Return and clear whether the session changed since the last call.
+
+        A new session, a key event and moving to the next line all count as
+        changes.
+
+        Returns:
+            True if the current line needs to be rendered again
+        """
+        changed = self._changed
+        self._changed = False
+        return changed
+
+    def _typed_matches(self, text: str, length: int) -> bool:
+        """Check whether the first `length` typed characters equal text[:length]."""
+        # Only the character next to the edit can differ in practice, so
+        # compare it first to reject general edits cheaply.
+        if length and self.typed[length - 1] != text[length - 1]:
+            return False
+        return "".join(self.typed[:length]) == text[:length]
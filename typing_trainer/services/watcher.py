@@ -0,0 +1,133 @@
+"""Exercise directory watcher service."""
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+from ..models import Exercise, text_cache
+from .loader import ExerciseLoader
+
+
+@dataclass
+class ExerciseChanges:
+    """Exercises added, updated and removed since the last poll.
+
+    Attributes:
+        added: Newly available exercises
+        updated: Exercises whose file changed (or that now come from another file)
+        removed: IDs of exercises that are no longer available
+        errors: (path, error message) for files that could not be loaded
+    """
+    added: List[Exercise] = field(default_factory=list)
+    updated: List[Exercise] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    errors: List[Tuple[Path, str]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed or self.errors)
+
+
+class ExerciseWatcher:
+    """Watches the exercise directories by polling and diffing file stats.
+
+    Each poll only stats the directory entries; files are parsed only when
+    they were added or their mtime/size changed. Polling is portable and
+    works on network shares where change notifications are unreliable.
+    """
+
+    def __init__(self, loader: ExerciseLoader):
+        """Initialize the watcher and take the first snapshot.
+
+        Create the watcher before loading exercises so changes made while
+        loading are picked up by the first poll.
+
+        Args:
+            loader: Loader whose directories are watched and which parses changed files
+        """
+        self.loader = loader
+        self.snapshot = self._scan()
+        # Currently known exercises by ID
+        self.exercises: Dict[str, Exercise] = {}
+
+    def set_exercises(self, exercises: List[Exercise]) -> None:
+        """Set the exercises that are currently shown.
+
+        Args:
+            exercises: Exercises as returned by the loader
+        """
+        self.exercises = {exercise.id: exercise for exercise in exercises}
+
+    def poll(self) -> ExerciseChanges:
+        """Check the directories for changes.
+
+        Returns:
+            The changes since the previous poll (falsy if nothing changed)
+        """
+        snapshot = self._scan()
+        changes = ExerciseChanges()
+
+        changed_paths = {path for path, stat in snapshot.items() if self.snapshot.get(path) != stat}
+        changed_paths.update(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        if not changed_paths:
+            return changes
+
+        for path in changed_paths:
+            text_cache.discard(path)
+
+        for exercise_id in sorted({path.stem for path in changed_paths}):
+            candidates = self._candidates(exercise_id)
+            exercise, errors = self.loader.load_candidates(candidates) if candidates else (None, [])
+            changes.errors.extend(errors)
+
+            known = exercise_id in self.exercises
+            if exercise is None:
+                self.loader.ngram_index.remove(exercise_id)
+                if known:
+                    del self.exercises[exercise_id]
+                    changes.removed.append(exercise_id)
+            elif known:
+                self.exercises[exercise_id] = exercise
+                changes.updated.append(exercise)
+            else:
+                self.exercises[exercise_id] = exercise
+                changes.added.append(exercise)
+
+        return changes
+
+    def _candidates(self, exercise_id: str) -> list:
+        """Get the existing files (or bundled exercises) for an exercise ID in priority order."""
+        candidates = []
+        for exercises_dir in reversed(self.loader.exercises_dirs):
+            path = exercises_dir / f"{exercise_id}.txt"
+            if path in self.snapshot:
+                candidates.append(path)
+            bundled = self.loader.bundled.get(exercises_dir, {}).get(exercise_id)
+            if bundled is not None:
+                candidates.append(bundled)
+        return candidates
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        """Stat every exercise file.
+
+        Returns:
+            Mapping of path to (mtime_ns, size)
+        """
+        snapshot = {}
+        for exercises_dir in self.loader.exercises_dirs:
+            try:
+                entries = os.scandir(exercises_dir)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if not entry.name.endswith(".txt"):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[exercises_dir / entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
@@ -0,0 +1,156 @@
+"""Startup timing report: import time per module and time to first menu paint."""
+
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class StartupReport:
+    """Collects import times and named milestones from the start of the process."""
+
+    def __init__(self):
+        """Start the clock."""
+        self.started = time.perf_counter()
+        # (milestone, seconds since start), in the order they were reached
+        self.marks: List[Tuple[str, float]] = []
+        # (module, self seconds, cumulative seconds), in the order imports finished
+        self.imports: List[Tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> None:
+        """Record a milestone. Only the first time a milestone is reached counts.
+
+        Args:
+            name: Name of the milestone (e.g. "first menu paint")
+        """
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            if all(existing != name for existing, _ in self.marks):
+                self.marks.append((name, elapsed))
+
+    def add_import(self, module: str, self_time: float, cumulative: float) -> None:
+        """Record the time spent importing a module."""
+        with self._lock:
+            self.imports.append((module, self_time, cumulative))
+
+    def format(self, limit: int = 20) -> str:
+        """Format the report for printing.
+
+        Args:
+            limit: Number of modules to list, slowest (cumulative) first
+
+        Returns:
+            The report as text
+        """
+        with self._lock:
+            marks = list(self.marks)
+            imports = list(self.imports)
+
+        lines = ["Startup report", ""]
+        for name, elapsed in marks:
+            lines.append(f"  {elapsed * 1000:8.1f} ms  {name}")
+
+        total = sum(self_time for _, self_time, _ in imports)
+        lines.append("")
+        lines.append(f"Imports: {len(imports)} modules, {total * 1000:.1f} ms")
+        lines.append(f"  {'self ms':>8}  {'cumul. ms':>9}  module")
+        slowest = sorted(imports, key=lambda item: item[2], reverse=True)[:limit]
+        for module, self_time, cumulative in slowest:
+            lines.append(f"  {self_time * 1000:8.1f}  {cumulative * 1000:9.1f}  {module}")
+        return "\n".join(lines)
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module."""
+
+    def __init__(self, loader, timer: "_ImportTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        create_module = getattr(self._loader, "create_module", None)
+        return create_module(spec) if create_module is not None else None
+
+    def exec_module(self, module):
+        try:
+            self._timer.run(module.__name__, self._loader.exec_module, module)
+        finally:
+            # Hand the module its real loader once it is imported
+            module.__loader__ = self._loader
+            if getattr(module, "__spec__", None) is not None:
+                module.__spec__.loader = self._loader
+
+
+class _ImportTimer:
+    """Meta path finder that finds modules with the other finders and times their execution."""
+
+    def __init__(self, report: StartupReport):
+        self.report = report
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def run(self, name, exec_module, module) -> None:
+        """Execute a module, recording its time minus the time of nested imports."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Time spent in nested imports, subtracted to get the module's own time
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            self.report.add_import(name, cumulative - nested, cumulative)
+
+
+# The report of this run, or None when startup timing is not enabled
+report: Optional[StartupReport] = None
+
+
+def enable() -> StartupReport:
+    """Start timing imports and milestones. Call before importing the app.
+
+    Returns:
+        The StartupReport being collected
+    """
+    global report
+    if report is None:
+        report = StartupReport()
+        sys.meta_path.insert(0, _ImportTimer(report))
+    return report
+
+
+def mark(name: str) -> None:
+    """Record a startup milestone (does nothing unless enabled).
+
+    Args:
+        name: Name of the milestone
+    """
+    if report is not None:
+        report.mark(name)
@@ -21,8 +21,8 @@ Filen må følge dette formatet:
 Language: Norwegian
 Min egen øvelse
 Dette er teksten som skal skrives.
-[bold green]Steg 4: Start på nytt[/]
-Start TouchPy på nytt, og øvelsen vil dukke opp i listen!
+[bold green]Steg 4: Lagre filen[/]
+Øvelsen dukker opp i listen i løpet av noen sekunder, uten omstart!
 """
 
 INSTRUCTIONS_ENGLISH = """
@@ -41,8 +41,8 @@ The file must follow this format:
 Language: English
 My Custom Exercise
 This is the text that should be typed.
-[bold green]Step 4: Restart[/]
-Restart TouchPy, and your exercise will appear in the list!
+[bold green]Step 4: Save the File[/]
+Your exercise will appear in the list within a few seconds, no restart needed!
 """
 
 class CustomExerciseInstructionsView(Screen):
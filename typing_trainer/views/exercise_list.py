@@ -0,0 +1,254 @@
+"""Virtualized list of exercises for the menu."""
+
+from typing import List, Optional
+from rich.segment import Segment
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from ..models import Exercise
+
+
+class ExerciseRow:
+    """The exercise on one row of an ExerciseList.
+
+    Has the same attributes the menu checks on list items, so selection
+    code works the same for both.
+    """
+
+    __slots__ = ("exercise", "index")
+
+    is_about = False
+    is_map = False
+    is_separator = False
+
+    def __init__(self, exercise: Exercise, index: int):
+        self.exercise = exercise
+        self.index = index
+
+
+class ExerciseList(ScrollView, can_focus=True):
+    """A list of exercises that only renders the rows in view.
+
+    Rows are drawn with the Line API straight from the exercise records, so
+    no widget is created per exercise and the cost of showing the list does
+    not grow with the size of the library.
+    """
+
+    BINDINGS = [
+        Binding("enter", "select_cursor", "Select", show=False),
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+    ]
+
+    COMPONENT_CLASSES = {"exercise-list--cursor"}
+
+    DEFAULT_CSS = """
+    ExerciseList {
+        background: $surface;
+        overflow-x: hidden;
+        & > .exercise-list--cursor {
+            color: $block-cursor-blurred-foreground;
+            background: $block-cursor-blurred-background;
+            text-style: $block-cursor-blurred-text-style;
+        }
+        &:focus {
+            background-tint: $foreground 5%;
+            & > .exercise-list--cursor {
+                color: $block-cursor-foreground;
+                background: $block-cursor-background;
+                text-style: $block-cursor-text-style;
+            }
+        }
+    }
+    """
+
+    index = reactive[Optional[int]](None, init=False)
+    """The index of the highlighted row."""
+
+    class Highlighted(Message):
+        """Posted when the highlighted row changes."""
+
+        def __init__(self, exercise_list: "ExerciseList", item: Optional[ExerciseRow]):
+            super().__init__()
+            self.exercise_list = exercise_list
+            self.item = item
+
+        @property
+        def control(self) -> "ExerciseList":
+            return self.exercise_list
+
+    class Selected(Message):
+        """Posted when a row is selected with Enter or a click."""
+
+        def __init__(self, exercise_list: "ExerciseList", item: ExerciseRow):
+            super().__init__()
+            self.exercise_list = exercise_list
+            self.item = item
+
+        @property
+        def control(self) -> "ExerciseList":
+            return self.exercise_list
+
+    def __init__(self, exercises: Optional[List[Exercise]] = None, *, id: Optional[str] = None):
+        """Initialize the list.
+
+        Args:
+            exercises: Exercises to show
+            id: Widget ID
+        """
+        super().__init__(id=id)
+        self.exercises: List[Exercise] = list(exercises or [])
+        self._update_virtual_size()
+
+    def __len__(self) -> int:
+        return len(self.exercises)
+
+    @staticmethod
+    def label(exercise: Exercise) -> str:
+        """Get the text shown for an exercise."""
+        return f"🔤 {exercise.title}"
+
+    @property
+    def highlighted_child(self) -> Optional[ExerciseRow]:
+        """The highlighted row, or None if nothing is highlighted."""
+        if self.index is None or not 0 <= self.index < len(self.exercises):
+            return None
+        return ExerciseRow(self.exercises[self.index], self.index)
+
+    def set_exercises(self, exercises: List[Exercise]) -> None:
+        """Replace the shown exercises and highlight the first one.
+
+        Args:
+            exercises: Exercises to show
+        """
+        self.exercises = list(exercises)
+        self._changed()
+        self.scroll_to(y=0, animate=False)
+        self.index = 0 if exercises else None
+
+    def extend(self, exercises: List[Exercise]) -> None:
+        """Append exercises, highlighting the first row if the list was empty."""
+        was_empty = not self.exercises
+        self.exercises.extend(exercises)
+        self._changed()
+        if was_empty and self.exercises:
+            self.index = 0
+
+    def insert(self, position: int, exercise: Exercise) -> None:
+        """Insert an exercise, keeping the same exercise highlighted."""
+        self.exercises.insert(position, exercise)
+        if self.index is not None and position <= self.index:
+            self.set_reactive(ExerciseList.index, self.index + 1)
+        self._changed()
+        if self.index is None:
+            self.index = 0
+
+    def remove(self, position: int) -> None:
+        """Remove the exercise at a position."""
+        del self.exercises[position]
+        if self.index is not None and (position < self.index or self.index >= len(self.exercises)):
+            self.set_reactive(ExerciseList.index, self.index - 1 if self.exercises else None)
+        self._changed()
+
+    def replace(self, position: int, exercise: Exercise) -> None:
+        """Replace the exercise at a position (e.g. after it changed on disk)."""
+        self.exercises[position] = exercise
+        self.refresh_line(position)
+
+    def _changed(self) -> None:
+        """Refresh after the rows changed."""
+        self._update_virtual_size()
+        self.refresh(layout=True)
+
+    def _update_virtual_size(self) -> None:
+        self.virtual_size = Size(0, len(self.exercises))
+
+    def validate_index(self, index: Optional[int]) -> Optional[int]:
+        """Clamp the index to the rows, or None if the list is empty."""
+        if index is None or not self.exercises:
+            return None
+        return max(0, min(index, len(self.exercises) - 1))
+
+    def watch_index(self, old_index: Optional[int], new_index: Optional[int]) -> None:
+        """Scroll the highlighted row into view and redraw the old and new rows."""
+        if old_index is not None:
+            self.refresh_line(old_index)
+        if new_index is not None:
+            self.refresh_line(new_index)
+            self._scroll_to_index(new_index)
+        self.post_message(self.Highlighted(self, self.highlighted_child))
+
+    def _scroll_to_index(self, index: int) -> None:
+        """Scroll the least amount needed to show a row."""
+        height = self.scrollable_content_region.height
+        if height <= 0:
+            return
+        top = round(self.scroll_y)
+        if index < top:
+            self.scroll_to(y=index, animate=False, force=True)
+        elif index >= top + height:
+            self.scroll_to(y=index - height + 1, animate=False, force=True)
+
+    def render_line(self, y: int) -> Strip:
+        """Render one row of the visible part of the list."""
+        row = y + round(self.scroll_y)
+        width = self.scrollable_content_region.width
+        base_style = self.rich_style
+        if row >= len(self.exercises):
+            return Strip.blank(width, base_style)
+
+        style = base_style
+        if row == self.index:
+            style = base_style + self.get_component_rich_style("exercise-list--cursor")
+        strip = Strip([Segment(self.label(self.exercises[row]), style)])
+        return strip.crop_extend(0, width, style)
+
+    def action_cursor_up(self) -> None:
+        if self.index is None:
+            self.index = 0
+        else:
+            self.index -= 1
+
+    def action_cursor_down(self) -> None:
+        if self.index is None:
+            self.index = 0
+        else:
+            self.index += 1
+
+    def action_page_up(self) -> None:
+        if self.index is not None:
+            self.index -= max(1, self.scrollable_content_region.height - 1)
+
+    def action_page_down(self) -> None:
+        if self.index is not None:
+            self.index += max(1, self.scrollable_content_region.height - 1)
+
+    def action_first(self) -> None:
+        self.index = 0
+
+    def action_last(self) -> None:
+        self.index = len(self.exercises) - 1
+
+    def action_select_cursor(self) -> None:
+        """Select the highlighted row."""
+        item = self.highlighted_child
+        if item is not None:
+            self.post_message(self.Selected(self, item))
+
+    def _on_click(self, event: events.Click) -> None:
+        """Highlight and select the clicked row."""
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        row = offset.y + round(self.scroll_y)
+        if 0 <= row < len(self.exercises):
+            self.index = row
+            self.action_select_cursor()
@@ -2,14 +2,19 @@
 
 from textual.app import ComposeResult
 from textual.screen import Screen
-from textual.widgets import Header, Footer, Static, ListItem, ListView
+from textual.widgets import Header, Footer, Static, Input
 from textual.binding import Binding
-from typing import List
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, List, Optional
 from ..models import Exercise
-from .typing_view import TypingView
-from .about_view import AboutView
-from .finger_map_view import FingerMapView
-from .custom_exercise_view import CustomExerciseInstructionsView
+from ..services.search import LENGTH_FILTERS, SearchIndex, SearchJob
+from .. import startup
+from .exercise_list import ExerciseList
+
+# The other screens (and the finger map markup they carry) are imported when
+# first opened, so they do not slow down showing the menu
+if TYPE_CHECKING:
+    from ..services.generator import ExerciseGenerator
 
 
 class MenuView(Screen):
@@ -21,6 +26,13 @@ class MenuView(Screen):
         Binding("enter", "select_exercise", "Select", show=True),
         Binding("f", "show_map", "Finger Map", show=True),
         Binding("a", "show_about", "About", show=True),
+        Binding("g", "generate_exercise", "Practice Weak Keys", show=True),
+        Binding("w", "toggle_weak_key_exercises", "Exercises for Weak Keys", show=True),
+        Binding("slash", "focus_search", "Search", show=True),
+        Binding("f2", "cycle_layout_filter", "Layout Filter", show=True),
+        Binding("f3", "cycle_length_filter", "Length Filter", show=True),
+        Binding("down", "focus_list", "List", show=False),
+        Binding("escape", "focus_list", "List", show=False),
     ]
     
     CSS = """
@@ -43,17 +55,32 @@ class MenuView(Screen):
         margin: 0 0;
     }
     
-    ListView {
+    #loading {
+        width: 100%;
+        content-align: left middle;
+        color: $warning;
+        margin: 0 0;
+    }
+    
+    #search {
+        width: 80;
+        margin: 0 0;
+    }
+    
+    #filters {
+        width: 80;
+        content-align: left middle;
+        color: $text-muted;
+        margin: 0 0;
+    }
+    
+    ExerciseList {
         width: 80;
         height: auto;
         max-height: 20;
         border: solid $primary;
         margin: 0 0;
     }
-    
-    ListItem {
-        padding: 0 0;
-    }
     """
     
     def __init__(self, exercises: List[Exercise]):
@@ -64,31 +91,117 @@ class MenuView(Screen):
         """
         super().__init__()
         self.exercises = exercises
+        # Exercise generators by layout, built on first use
+        self._generators: Dict[str, "ExerciseGenerator"] = {}
+        # Whether the list shows every exercise, or only those ranked for the weak keys
+        self._showing_all = True
+        self._showing_weak_keys = False
+        # Weights and ranked exercise IDs behind the weak key list
+        self._weak_key_weights: Dict[str, float] = {}
+        self._weak_key_ids: List[str] = []
+        
+        # Search over titles and IDs, with layout and length filters (None = all)
+        self.search_index = SearchIndex(exercises)
+        self._search_job: Optional[SearchJob] = None
+        self._layout_filter: Optional[str] = None
+        self._length_filter: Optional[str] = None
     
     def compose(self) -> ComposeResult:
         """Compose the menu view."""
         yield Header()
         yield Static("Touch Typing Trainer", id="title")
         yield Static("Select an exercise to begin", id="instructions")
-        yield ListView(id="exercise_list")
+        yield Static("Loading exercises...", id="loading")
+        yield Input(placeholder="Search exercises (/)", id="search")
+        yield Static(self._format_filters(), id="filters")
+        yield ExerciseList(id="exercise_list")
         yield Footer()
     
     def on_mount(self) -> None:
         """Populate the list view and focus it when the screen is mounted."""
-        list_view = self.query_one(ListView)
+        list_view = self.query_one(ExerciseList)
         
-        # Add exercise items
-        for exercise in self.exercises:
-            item = ListItem(Static(f"🔤 {exercise.title}"))
-            item.exercise = exercise  # Store exercise reference
-            item.is_about = False
-            list_view.append(item)
+        # Show the exercises (some may already have been streamed in by the loader)
+        if self._showing_all:
+            list_view.set_exercises(self.exercises)
+        if self.exercises:
+            self.query_one("#loading", Static).display = False
         
         # Focus the list view
         list_view.focus()
+        self.call_after_refresh(startup.mark, "first menu paint")
     
-    def on_list_view_selected(self, event: ListView.Selected) -> None:
-        """Handle ListView selection (Enter key or click)."""
+    def add_exercises(self, exercises: List[Exercise], done: int, total: int) -> None:
+        """Add exercises to the list while they are being loaded.
+        
+        Args:
+            exercises: Newly loaded exercises
+            done: Number of files processed so far
+            total: Total number of files to process
+        """
+        self.exercises.extend(exercises)
+        self.search_index.add(exercises)
+        if self._showing_all:
+            self.query_one(ExerciseList).extend(exercises)
+        elif self._search_active:
+            self._start_search()
+        
+        loading = self.query_one("#loading", Static)
+        if done >= total:
+            loading.display = False
+        else:
+            loading.update(f"Loading exercises... {done}/{total}")
+    
+    def apply_changes(self, changes) -> None:
+        """Apply exercises added, updated or removed on disk while running.
+        
+        Args:
+            changes: ExerciseChanges from the exercise watcher
+        """
+        # The list is edited in place when it shows every exercise; a search
+        # or the weak key list is applied again to the updated exercises
+        list_view = self.query_one(ExerciseList) if self._showing_all else None
+        
+        def position_of(exercise_id):
+            return next((i for i, e in enumerate(self.exercises) if e.id == exercise_id), None)
+        
+        for exercise_id in changes.removed:
+            position = position_of(exercise_id)
+            if position is not None:
+                del self.exercises[position]
+                if list_view is not None:
+                    list_view.remove(position)
+        
+        for exercise in changes.updated:
+            position = position_of(exercise.id)
+            if position is None:
+                continue
+            self.exercises[position] = exercise
+            if list_view is not None:
+                list_view.replace(position, exercise)
+        
+        for exercise in changes.added:
+            # Keep the list sorted by ID like the loader does
+            position = bisect_left([e.id for e in self.exercises], exercise.id)
+            self.exercises.insert(position, exercise)
+            if list_view is not None:
+                list_view.insert(position, exercise)
+        
+        # The word corpus and the searchable exercises changed
+        self._generators.clear()
+        self.search_index.rebuild(self.exercises)
+        if self._search_active:
+            self._start_search()
+        elif self._showing_weak_keys:
+            # Drop removed exercises right away, then rank the library again
+            # so added and edited exercises are placed too
+            weights = self._weak_key_weights
+            self._show_weak_key_exercises(weights, self._weak_key_ids, refresh=True)
+            self.run_worker(lambda: self._rank_weak_key_exercises(weights), thread=True,
+                            exclusive=True, group="weak_keys")
+    
+    def on_exercise_list_selected(self, event: ExerciseList.Selected) -> None:
+        """Handle list selection (Enter key or click)."""
         selected_item = event.item
         
         # Check if it's a separator (do nothing)
@@ -97,21 +210,18 @@ class MenuView(Screen):
         
         # Check if it's the About item
         if hasattr(selected_item, 'is_about') and selected_item.is_about:
-            about_screen = AboutView()
-            self.app.push_screen(about_screen)
+            self.action_show_about()
         # Check if it's the Finger Map item
         elif hasattr(selected_item, 'is_map') and selected_item.is_map:
             self.action_show_map()
         # Otherwise it's an exercise
         elif hasattr(selected_item, 'exercise'):
-            exercise = selected_item.exercise
             # Switch to typing view with the selected exercise
-            typing_screen = TypingView(exercise)
-            self.app.push_screen(typing_screen)
+            self._start_exercise(selected_item.exercise)
     
     def action_select_exercise(self) -> None:
         """Handle exercise selection via key binding."""
-        list_view = self.query_one(ListView)
+        list_view = self.query_one(ExerciseList)
         
         if list_view.highlighted_child:
             selected_item = list_view.highlighted_child
@@ -122,30 +232,215 @@ class MenuView(Screen):
             
             # Check if it's the About item
             if hasattr(selected_item, 'is_about') and selected_item.is_about:
-                about_screen = AboutView()
-                self.app.push_screen(about_screen)
+                self.action_show_about()
             # Check if it's the Finger Map item
             elif hasattr(selected_item, 'is_map') and selected_item.is_map:
                 self.action_show_map()
             # Otherwise it's an exercise
             elif hasattr(selected_item, 'exercise'):
-                exercise = selected_item.exercise
                 # Switch to typing view with the selected exercise
-                typing_screen = TypingView(exercise)
-                self.app.push_screen(typing_screen)
+                self._start_exercise(selected_item.exercise)
+    
+    def _start_exercise(self, exercise: Exercise) -> None:
+        """Open the typing view for an exercise."""
+        from .typing_view import TypingView
+        try:
+            # Read the text now, so a file deleted or edited since loading is reported here
+            exercise.text
+        except OSError as e:
+            self.notify(f"Could not open {exercise.title}: {e}", severity="error")
+            check_exercises = getattr(self.app, "check_exercises", None)
+            if check_exercises is not None:
+                check_exercises()
+            return
+        self.app.push_screen(TypingView(exercise))
+    
+    def action_generate_exercise(self) -> None:
+        """Generate an exercise for the user's weakest keys in the background."""
+        if not self.exercises:
+            return
+        list_view = self.query_one(ExerciseList)
+        highlighted = list_view.highlighted_child
+        layout = highlighted.exercise.layout if hasattr(highlighted, 'exercise') else "English"
+        self.run_worker(lambda: self._generate_exercise(layout), thread=True,
+                        exclusive=True, group="generate")
+    
+    def _generate_exercise(self, layout: str) -> None:
+        """Build a generated exercise (runs in a worker thread)."""
+        from ..services.generator import ExerciseGenerator, weak_key_weights
+        generator = self._generators.get(layout)
+        if generator is None:
+            generator = ExerciseGenerator.from_exercises(list(self.exercises), layout)
+            self._generators[layout] = generator
+        
+        history = getattr(self.app, "history", None)
+        weights = weak_key_weights(history.key_stats(), history.bigram_stats()) if history is not None else {}
+        exercise = generator.generate(weights)
+        self.app.call_from_thread(self._start_generated_exercise, exercise)
+    
+    def _start_generated_exercise(self, exercise) -> None:
+        """Open a generated exercise."""
+        if exercise is None:
+            self.notify("No words to build an exercise from.", severity="warning")
+            return
+        self._start_exercise(exercise)
+    
+    def action_toggle_weak_key_exercises(self) -> None:
+        """Show the exercises that drill the weakest keys, or all exercises again."""
+        if self._showing_weak_keys:
+            self._show_all()
+            return
+        if not self.exercises:
+            return
+        self.run_worker(self._rank_weak_key_exercises, thread=True, exclusive=True, group="weak_keys")
+    
+    def _rank_weak_key_exercises(self, weights: Optional[Dict[str, float]] = None) -> None:
+        """Rank exercises for the weakest keys (runs in a worker thread).
+        
+        Args:
+            weights: Weights to rank by again when the exercises changed
+                (computed from the history if not given)
+        """
+        from ..services.generator import weak_key_weights
+        refresh = weights is not None
+        if weights is None:
+            history = getattr(self.app, "history", None)
+            weights = weak_key_weights(history.key_stats(), history.bigram_stats()) if history is not None else {}
+        ranked = self.app.loader.ngram_index.rank(weights, limit=20) if weights else []
+        self.app.call_from_thread(self._show_weak_key_exercises, weights,
+                                  [exercise_id for exercise_id, _ in ranked], refresh)
+    
+    def _show_weak_key_exercises(self, weights: Dict[str, float], exercise_ids: List[str],
+                                 refresh: bool = False) -> None:
+        """Show ranked exercises for the weak keys.
+        
+        Args:
+            weights: Weight by key or bigram
+            exercise_ids: Exercise IDs, best match first
+            refresh: Whether this updates a weak key list already shown (and is
+                dropped if the user has left it meanwhile)
+        """
+        if refresh and not self._showing_weak_keys:
+            return
+        if not exercise_ids and not refresh:
+            self.notify("No weak keys yet. Complete a few exercises first.", severity="information")
+            return
+        by_id = {exercise.id: exercise for exercise in self.exercises}
+        exercises = [by_id[exercise_id] for exercise_id in exercise_ids if exercise_id in by_id]
+        keys = ", ".join("SPACE" if key == " " else key for key in list(weights)[:5])
+        # The weak key list replaces any search
+        self._reset_search()
+        self._show_exercises(exercises, f"Exercises for your weak keys: {keys}  (w: show all)")
+        self._showing_weak_keys = True
+        self._weak_key_weights = weights
+        self._weak_key_ids = exercise_ids
+    
+    def _show_all(self) -> None:
+        """Show every exercise."""
+        self._show_exercises(self.exercises, "Select an exercise to begin", showing_all=True)
+    
+    def _show_exercises(self, exercises: List[Exercise], instructions: str, showing_all: bool = False) -> None:
+        """Replace the list contents with the given exercises."""
+        self._showing_all = showing_all
+        self._showing_weak_keys = False
+        self.query_one("#instructions", Static).update(instructions)
+        self.query_one(ExerciseList).set_exercises(exercises)
+    
+    @property
+    def _search_active(self) -> bool:
+        """Whether a search query or filter is set."""
+        return bool(self.query_one("#search", Input).value.strip()
+                    or self._layout_filter or self._length_filter)
+    
+    def _format_filters(self) -> str:
+        """Format the filter status line."""
+        layout = self._layout_filter or "All"
+        length = self._length_filter or "All"
+        return f"Layout: {layout} (F2)  |  Length: {length} (F3)"
+    
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Search as the query is typed."""
+        if event.input.id == "search":
+            self._start_search()
+    
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Move to the results when Enter is pressed in the search box."""
+        if event.input.id == "search":
+            self.action_focus_list()
+    
+    def _start_search(self) -> None:
+        """Start (or restart) the search for the current query and filters."""
+        if not self._search_active:
+            self._search_job = None
+            if not self._showing_all:
+                self._show_all()
+            return
+        query = self.query_one("#search", Input).value
+        self._search_job = self.search_index.search(
+            query, self._layout_filter, self._length_filter, previous=self._search_job)
+        self._continue_search(self._search_job)
+    
+    def _continue_search(self, job: SearchJob) -> None:
+        """Run one time-boxed step of a search, yielding to the UI between steps."""
+        if job is not self._search_job:
+            # A newer query replaced this one
+            return
+        if not job.step():
+            self.call_later(self._continue_search, job)
+            return
+        results = [entry.exercise for entry in job.results]
+        count = "No" if not results else str(len(results))
+        self._show_exercises(results, f"{count} matching exercise{'s' if len(results) != 1 else ''}")
+    
+    def _reset_search(self) -> None:
+        """Clear the query and filters without running a search."""
+        search = self.query_one("#search", Input)
+        with search.prevent(Input.Changed):
+            search.value = ""
+        self._layout_filter = None
+        self._length_filter = None
+        self._search_job = None
+        self.query_one("#filters", Static).update(self._format_filters())
+    
+    def action_focus_search(self) -> None:
+        """Focus the search box."""
+        self.query_one("#search", Input).focus()
+    
+    def action_focus_list(self) -> None:
+        """Focus the exercise list."""
+        self.query_one(ExerciseList).focus()
+    
+    def action_cycle_layout_filter(self) -> None:
+        """Cycle the layout filter through All and each layout in the library."""
+        layouts = [None] + sorted({exercise.layout for exercise in self.exercises})
+        position = layouts.index(self._layout_filter) if self._layout_filter in layouts else 0
+        self._layout_filter = layouts[(position + 1) % len(layouts)]
+        self.query_one("#filters", Static).update(self._format_filters())
+        self._start_search()
+    
+    def action_cycle_length_filter(self) -> None:
+        """Cycle the length filter through All, Short, Medium and Long."""
+        lengths = [None] + [name for name, _, _ in LENGTH_FILTERS]
+        position = lengths.index(self._length_filter) if self._length_filter in lengths else 0
+        self._length_filter = lengths[(position + 1) % len(lengths)]
+        self.query_one("#filters", Static).update(self._format_filters())
+        self._start_search()
     
     def action_show_about(self) -> None:
         """Show the About screen."""
+        from .about_view import AboutView
         about_screen = AboutView()
         self.app.push_screen(about_screen)
 
     def action_show_map(self) -> None:
         """Show the Finger Map screen."""
+        from .finger_map_view import FingerMapView
         map_screen = FingerMapView()
         self.app.push_screen(map_screen)
     
     def action_show_custom_help(self) -> None:
         """Show the custom exercises help screen."""
+        from .custom_exercise_view import CustomExerciseInstructionsView
         help_screen = CustomExerciseInstructionsView()
         self.app.push_screen(help_screen)
 
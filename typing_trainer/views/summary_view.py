@@ -1,5 +1,6 @@
 """Summary view showing results after exercise completion."""
 
+import sqlite3
 from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.widgets import Header, Footer, Static, Button
@@ -64,9 +65,15 @@ class SummaryView(Screen):
                 - exercise: The completed exercise
                 - wpm: Words per minute
                 - accuracy: Accuracy percentage
+                - alignment: Optional AlignmentResult with substitution/insertion/deletion counts
                 - elapsed_time: Time taken in seconds
                 - mistakes: Number of typing mistakes
                 - top_mistake_letters: List of tuples (char, count) for top 3 mistakes
+                - mistake_stats: Optional MistakeStats, used when top_mistake_letters is missing
+                - typed_chars: Number of characters typed
+                - keystrokes: KeystrokeLog with every key event of the session
+                - session_record: Optional SessionRecord queued in the history,
+                  used to look up the previous personal best
         """
         super().__init__()
         self.results = results
@@ -96,8 +103,18 @@ class SummaryView(Screen):
                 classes="stat"
             )
             
+            # Break down the final errors by kind if available
+            alignment = self.results.get('alignment')
+            if alignment is not None and alignment.errors:
+                yield Static(
+                    f"✏️  Wrong: {alignment.substitutions}  |  Skipped: {alignment.deletions}  |  Extra: {alignment.insertions}",
+                    classes="stat"
+                )
+            
             # Display top 3 mistake letters if available
-            top_mistakes = self.results.get('top_mistake_letters', [])
+            top_mistakes = self.results.get('top_mistake_letters')
+            if top_mistakes is None and self.results.get('mistake_stats') is not None:
+                top_mistakes = self.results['mistake_stats'].top_total()
             if top_mistakes:
                 mistake_str = ", ".join([f"'{char if char != ' ' else 'SPACE'}' ({count})" for char, count in top_mistakes])
                 yield Static(
@@ -105,12 +122,38 @@ class SummaryView(Screen):
                     classes="stat"
                 )
             
-            yield Static("", classes="stat")  # Spacer
+            # Filled in from the history by a worker once it has been queried
+            yield Static("", classes="stat", id="personal_best")
             yield Static(self._get_performance_message(), id="message")
             yield Button("Back to Menu", variant="success", id="menu_button")
         
         yield Footer()
     
+    def on_mount(self) -> None:
+        """Look up the personal best in the background."""
+        if getattr(self.app, "history", None) is not None and self.results.get('session_record'):
+            self.run_worker(self._load_personal_best, thread=True, group="history")
+    
+    def _load_personal_best(self) -> None:
+        """Query the previous personal best (runs in a worker thread)."""
+        record = self.results['session_record']
+        try:
+            best = self.app.history.personal_best(record.exercise_id, before=record.started_at)
+        except sqlite3.Error:
+            return
+        self.app.call_from_thread(self._show_personal_best, best)
+    
+    def _show_personal_best(self, best) -> None:
+        """Show how this session compares to the previous personal best."""
+        wpm = self.results['wpm']
+        if best is None:
+            message = "🏆 First time on this exercise!"
+        elif wpm > best.wpm:
+            message = f"🏆 New personal best! (previous: {best.wpm:.1f} WPM)"
+        else:
+            message = f"🏆 Personal best: {best.wpm:.1f} WPM"
+        self.query_one("#personal_best", Static).update(message)
+    
     def _get_performance_message(self) -> str:
         """Get a performance message based on results."""
         wpm = self.results['wpm']
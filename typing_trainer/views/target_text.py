@@ -0,0 +1,144 @@
+"""Windowed rendering of the target text for the typing view."""
+
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import accumulate, groupby
+from typing import Optional, Tuple
+from rich.cells import cell_len, get_character_cell_size, set_cell_size
+from rich.text import Text, Span
+from ..services.session import TypingSession, CORRECT
+
+
+CORRECT_STYLE = "bold green"
+INCORRECT_STYLE = "bold red underline"
+CURSOR_STYLE = "bold white on blue"
+PENDING_STYLE = "dim"
+
+# Marker shown where a line is cut off at the edge of the window (one cell wide)
+ELLIPSIS = "…"
+
+
+@lru_cache(maxsize=64)
+def _cell_offsets(line: str) -> Optional[Tuple[int, ...]]:
+    """Get the cell offset of each character of a line, for lines with wide characters.
+
+    Args:
+        line: Line of target text
+
+    Returns:
+        Tuple of len(line) + 1 offsets (the last one is the line's width), or
+        None if every character is one cell wide and offsets equal indexes
+    """
+    if cell_len(line) == len(line):
+        return None
+    return (0,) + tuple(accumulate(get_character_cell_size(char) for char in line))
+
+
+def _window(line: str, cursor: int, width: int) -> Tuple[int, int]:
+    """Choose the characters of a line that fit in the window.
+
+    The cursor is kept about a third into the window for long lines, and a
+    cell is left for the ellipsis on each side that is cut off.
+
+    Args:
+        line: Line of target text
+        cursor: Position of the cursor in the line
+        width: Width of the window in cells
+
+    Returns:
+        (start, end) character range of the line to show
+    """
+    offsets = _cell_offsets(line)
+    if offsets is None:
+        if len(line) <= width:
+            return 0, len(line)
+        start = max(0, min(cursor - width // 3, len(line) - width))
+        end = start + width
+        # Make room for the ellipsis markers
+        if start > 0:
+            start += 1
+        if end < len(line):
+            end -= 1
+        return start, end
+
+    total = offsets[-1]
+    if total <= width:
+        return 0, len(line)
+    # First character starting at or after the wanted first cell
+    start = bisect_left(offsets, max(0, min(offsets[cursor] - width // 3, total - width)))
+    if start > 0:
+        start = bisect_left(offsets, offsets[start] + 1)
+    available = width - (1 if start > 0 else 0)
+    # Last character boundary within the available cells
+    end = min(bisect_right(offsets, offsets[start] + available) - 1, len(line))
+    if end < len(line):
+        end = bisect_right(offsets, offsets[end] - 1) - 1
+    return start, end
+
+
+def render_target_window(session: TypingSession, width: int, preview_lines: int = 0) -> Text:
+    """Render the visible part of the current line around the cursor.
+
+    Only a window of at most `width` terminal cells is materialized (wide
+    characters such as CJK and emoji take two cells), and runs of characters
+    with the same status share a single span, so the cost depends on the
+    terminal width rather than the line length.
+
+    Args:
+        session: Typing session to render
+        width: Available width in cells
+        preview_lines: Number of upcoming lines to show (dimmed) below
+
+    Returns:
+        Rich Text with the window and any preview lines
+    """
+    line = session.current_line
+    cursor = session.cursor
+    width = max(width, 8)
+
+    start, end = _window(line, cursor, width)
+
+    plain = []
+    spans = []
+    offset = 0
+
+    def add(segment: str, style: str) -> None:
+        nonlocal offset
+        if not segment:
+            return
+        plain.append(segment)
+        spans.append(Span(offset, offset + len(segment), style))
+        offset += len(segment)
+
+    if start > 0:
+        add(ELLIPSIS, PENDING_STYLE)
+
+    # Typed part: one span per run of correct or incorrect characters
+    typed_end = min(cursor, end)
+    position = start
+    for status, run in groupby(session.status[start:typed_end]):
+        length = len(list(run))
+        add(line[position:position + length], CORRECT_STYLE if status == CORRECT else INCORRECT_STYLE)
+        position += length
+
+    # Cursor and pending part
+    if start <= cursor < end:
+        add(line[cursor], CURSOR_STYLE)
+        add(line[cursor + 1:end], PENDING_STYLE)
+    else:
+        add(line[max(start, typed_end):end], PENDING_STYLE)
+
+    if end < len(line):
+        add(ELLIPSIS, PENDING_STYLE)
+
+    # Upcoming lines
+    next_index = session.line_index + 1
+    for preview in session.lines[next_index:next_index + preview_lines]:
+        add("\n", PENDING_STYLE)
+        if cell_len(preview) > width:
+            preview = set_cell_size(preview, width - 1).rstrip() + ELLIPSIS
+        add(preview, PENDING_STYLE)
+
+    text = Text("".join(plain))
+    text.spans = spans
+    return text
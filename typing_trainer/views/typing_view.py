@@ -4,21 +4,32 @@ from textual.app import ComposeResult
 from textual.screen import Screen
 from textual.widgets import Header, Footer, Static, TextArea
 from textual.binding import Binding
+from textual.message import Message
 from textual.reactive import reactive
 from rich.text import Text
+from contextlib import nullcontext
+from pathlib import Path
 import time
 from ..models import Exercise
 from ..services.metrics import MetricsCalculator
+from ..services.mistakes import MistakeStats
+from ..services.session import TypingSession
 from .summary_view import SummaryView
+from .target_text import render_target_window
 from ..keyboard_layouts import get_layout
 
 
+# Stands in for a profiler stage while profiling is off
+_NOT_PROFILING = nullcontext()
+
+
 class TypingView(Screen):
     """Typing practice screen."""
     
     BINDINGS = [
         Binding("escape", "back_to_menu", "Menu"),
         Binding("f1", "toggle_finger_map", "Toggle Finger Map"),
+        Binding("f4", "toggle_profiler", "Profiler", show=False),
     ]
     
     CSS = """
@@ -65,6 +76,13 @@ class TypingView(Screen):
         background: $surface;
         margin: 0 1;
     }
+    
+    #profiler_overlay {
+        width: 100%;
+        height: 2;
+        background: $warning 20%;
+        color: $text;
+    }
     """
     
     # Reactive attributes
@@ -74,16 +92,52 @@ class TypingView(Screen):
     lines_left = reactive(0)
     show_finger_map = reactive(True)
     
-    def __init__(self, exercise: Exercise):
+    # Stats refresh rates (seconds between timer ticks)
+    TICK_SECONDS = 0.1
+    IDLE_TICK_SECONDS = 1.0
+    # Drop to the idle tick rate when no key has been pressed for this long
+    IDLE_AFTER_SECONDS = 5.0
+    
+    # How accuracy is scored: "alignment" (edit distance, a skipped character
+    # is one error) or "position" (character-by-character comparison)
+    ACCURACY_MODE = "alignment"
+    
+    # Favour recent mistakes when highlighting error keys on the keyboard:
+    # a trailing window or an exponential half-life in seconds (None = whole session)
+    MISTAKE_WINDOW_SECONDS = None
+    MISTAKE_HALF_LIFE_SECONDS = None
+    
+    # Upcoming lines shown dimmed below the current one
+    PREVIEW_LINES = 0
+    
+    # Seconds between profiler overlay updates, and where traces are written
+    # (None = a "traces" folder in the data directory)
+    PROFILER_OVERLAY_SECONDS = 0.5
+    TRACE_DIR = None
+    # Target text width used before the screen has been laid out
+    DEFAULT_TARGET_WIDTH = 80
+    
+    def __init__(self, exercise: Exercise, tick_seconds: float = None,
+                 idle_tick_seconds: float = None, idle_after_seconds: float = None):
         """Initialize the typing view.
         
         Args:
             exercise: The exercise to practice
+            tick_seconds: Stats refresh interval while typing (default TICK_SECONDS)
+            idle_tick_seconds: Stats refresh interval while idle (default IDLE_TICK_SECONDS)
+            idle_after_seconds: Seconds without a key press before going idle
+                (default IDLE_AFTER_SECONDS)
         """
         super().__init__()
         self.exercise = exercise
         self.start_time: float = None
         
+        self.tick_seconds = tick_seconds or self.TICK_SECONDS
+        self.idle_tick_seconds = idle_tick_seconds or self.IDLE_TICK_SECONDS
+        self.idle_after_seconds = idle_after_seconds or self.IDLE_AFTER_SECONDS
+        self.last_key_time: float = None
+        self.idle = False
+        
         # Split text into lines for display and tracking
         raw_lines = self.exercise.text.splitlines()
         # Filter out empty lines if any, though usually we want to preserve paragraph structure
@@ -93,23 +147,27 @@ class TypingView(Screen):
         if not self.lines:
             self.lines = ["Error: No text found"]
 
-        self.current_line_idx = 0
-        self.lines_left = len(self.lines)
-        
-        # Track text typed for completed lines
-        self.completed_text = ""
-        
-        # Track character mistakes
-        self.char_mistakes = {}
-        
-        # Current line typing state
-        self.current_typed_text = ""
-        self.previous_current_typed_text = ""
+        mistake_stats = MistakeStats(window_seconds=self.MISTAKE_WINDOW_SECONDS,
+                                     half_life_seconds=self.MISTAKE_HALF_LIFE_SECONDS)
+        self.session = TypingSession(self.lines, mistake_stats=mistake_stats)
+        self.lines_left = self.session.lines_left
         
         self.timer_started = False
         self.exercise_completed = False
         self.metrics_calculator = MetricsCalculator()
         self.update_timer_callback = None
+        
+        # Rendered window of the target line and the width it was rendered for
+        self._target_text: Text = None
+        self._target_text_width = 0
+        
+        # Last content pushed to each widget, to skip redundant updates
+        self._last_stats: str = None
+        self._last_layout: Text = None
+        
+        # Key press profiler (F4); None while profiling is off
+        self.profiler = None
+        self._profiler_timer = None
     
     def compose(self) -> ComposeResult:
         """Compose the typing view."""
@@ -139,171 +197,193 @@ class TypingView(Screen):
         self.query_one("#typing_input", TextArea).focus()
         self._update_display()
     
+    def on_resize(self) -> None:
+        """Re-render the target window for the new width."""
+        if not self.session.is_complete:
+            # Widget sizes are updated by the next layout pass
+            self.call_after_refresh(self._refresh_target)
+    
     def _format_stats(self) -> str:
         """Format the stats display."""
         return f"⏱️  Time: {self.elapsed_time:.1f}s  |  ⚡ WPM: {self.wpm:.1f}  |  ❌ Mistakes: {self.mistakes}  | Lines Left: {self.lines_left}  |  ESC: Quit"
     
     def _render_target_text(self) -> Text:
-        """Render the target text with highlighting."""
+        """Render the target text with highlighting.
+        
+        Only the window of the current line around the cursor is rendered
+        (see render_target_window), and it is rebuilt only when the session
+        reports a change or the available width changed.
+        """
+        session = self.session
+        
         # Only render the current line
-        if self.current_line_idx >= len(self.lines):
+        if session.is_complete:
             return Text("Exercise Completed!", style="bold green")
 
-        current_target_line = self.lines[self.current_line_idx]
-        text = Text()
+        width = self._target_width()
+        changed = session.take_changed()
+        if changed or self._target_text is None or width != self._target_text_width:
+            self._target_text = render_target_window(session, width, self.PREVIEW_LINES)
+            self._target_text_width = width
         
-        for i, char in enumerate(current_target_line):
-            status = 'pending'
-            
-            # Check against currently typed text for this line
-            if i < len(self.current_typed_text):
-                typed_char = self.current_typed_text[i]
-                if typed_char == char:
-                    status = 'correct'
-                else:
-                    status = 'incorrect'
-            
-            if status == 'correct':
-                text.append(char, style="bold green")
-            elif status == 'incorrect':
-                text.append(char, style="bold red underline")
-            else:  # pending
-                if i == len(self.current_typed_text):
-                    # This is the next character to type - highlight it!
-                    text.append(char, style="bold white on blue")
-                else:
-                    text.append(char, style="dim")
-        
-        return text
+        return self._target_text
+    
+    def _target_width(self) -> int:
+        """Get the width available for the target text (before layout, a default)."""
+        if self.is_mounted:
+            width = self.query_one("#target_text_container", Static).content_size.width
+            if width > 0:
+                return width
+        return self.DEFAULT_TARGET_WIDTH
     
     def _update_display(self) -> None:
-        """Update the display elements."""
-        # Update stats
-        stats_widget = self.query_one("#stats", Static)
-        stats_widget.update(self._format_stats())
-        
-        # Update target text with highlighting
-        target_widget = self.query_one("#target_text_container", Static)
-        target_widget.update(self._render_target_text())
-        
-        # Update keyboard layout highlighting
+        """Update all display elements after the typing state changed."""
+        self._refresh_stats()
+        self._refresh_target()
         self._update_keyboard_layout()
-        
+    
+    def _refresh_stats(self) -> None:
+        """Update the stats widget if its text changed."""
+        with self._profile("stats"):
+            stats = self._format_stats()
+            if stats != self._last_stats:
+                self._last_stats = stats
+                self.query_one("#stats", Static).update(stats)
+    
+    def _refresh_target(self) -> None:
+        """Update the target text with highlighting."""
+        with self._profile("target"):
+            target_widget = self.query_one("#target_text_container", Static)
+            target_widget.update(self._render_target_text())
+    
     def _update_keyboard_layout(self) -> None:
         """Update the keyboard layout with the next character highlighted."""
-        next_char = None
-        
-        # Determine the next character expected
-        if self.current_line_idx < len(self.lines):
-            current_line = self.lines[self.current_line_idx]
-            typed_len = len(self.current_typed_text)
+        with self._profile("keyboard"):
+            # Determine the next character expected
+            next_char = self.session.next_char
             
-            if typed_len < len(current_line):
-                next_char = current_line[typed_len]
-        
-        # Get top 3 mistakes (allowing space but excluding other whitespace like newline)
-        sorted_mistakes = sorted(self.char_mistakes.items(), key=lambda x: x[1], reverse=True)
-        error_keys = []
-        for char, _ in sorted_mistakes:
-            if char and (char == ' ' or char.strip()):
-                error_keys.append(char)
-                if len(error_keys) >= 3:
-                    break
+            # Top mistaken keys, ranked incrementally as mistakes happen
+            error_keys = self.session.mistake_stats.top_keys()
 
-        # Update the layout widget
-        layout_widget = self.query_one("#keyboard_layout", Static)
-        layout_text = get_layout(self.exercise.layout, highlight_key=next_char, error_keys=error_keys)
-        layout_widget.update(layout_text)
+            # Update the layout widget (rendered layouts are cached, so an
+            # unchanged highlight returns the same object)
+            layout_text = get_layout(self.exercise.layout, highlight_key=next_char, error_keys=error_keys)
+            if layout_text is not self._last_layout:
+                self._last_layout = layout_text
+                self.query_one("#keyboard_layout", Static).update(layout_text)
+    
+    def _profile(self, stage: str):
+        """Time a block as a profiler stage (does nothing unless profiling).
+        
+        Args:
+            stage: Name of the stage (see services.profiler.STAGES)
+        
+        Returns:
+            Context manager to wrap the block in
+        """
+        profiler = self.profiler
+        return profiler.stage(stage) if profiler is not None else _NOT_PROFILING
     
     def _start_timer(self) -> None:
         """Start the timer when first character is typed."""
         if not self.timer_started:
             self.timer_started = True
-            self.start_time = time.time()
-            self.update_timer_callback = self.set_interval(0.1, self._update_metrics_timer)
+            self.start_time = time.perf_counter()
+            self.last_key_time = self.start_time
+            self._set_tick(self.tick_seconds)
+    
+    def _set_tick(self, seconds: float) -> None:
+        """(Re)start the stats timer with the given interval."""
+        if self.update_timer_callback:
+            self.update_timer_callback.stop()
+        callback = self._update_metrics_timer
+        if self.profiler is not None:
+            callback = self.profiler.timed_tick(seconds, callback)
+            self.profiler.reset_tick()
+        self.update_timer_callback = self.set_interval(seconds, callback)
+    
+    def _note_key_press(self) -> None:
+        """Record a key press and leave idle mode if needed."""
+        self.last_key_time = time.perf_counter()
+        if self.idle and self.update_timer_callback:
+            self.idle = False
+            self._set_tick(self.tick_seconds)
     
     def _update_metrics_timer(self) -> None:
-        """Update the elapsed time and WPM."""
+        """Update the elapsed time and WPM.
+        
+        Only the stats widget is refreshed here; the target text and
+        keyboard only change when a key is pressed.
+        """
         if self.start_time:
-            self.elapsed_time = time.time() - self.start_time
+            now = time.perf_counter()
+            self.elapsed_time = now - self.start_time
             
             # Total chars = completed lines chars + current line chars
-            total_chars = len(self.completed_text) + len(self.current_typed_text)
+            total_chars = self.session.typed_chars
             
             self.wpm = self.metrics_calculator.calculate_wpm(
                 total_chars, 
                 self.elapsed_time
             )
-            self._update_display()
+            self._refresh_stats()
+            
+            # Slow down while nobody is typing
+            if not self.idle and now - self.last_key_time >= self.idle_after_seconds:
+                self.idle = True
+                self._set_tick(self.idle_tick_seconds)
     
     def on_text_area_changed(self, event: TextArea.Changed) -> None:
         """Handle text area changes."""
         # Don't process if exercise is already completed
-        if self.exercise_completed or self.current_line_idx >= len(self.lines):
+        if self.exercise_completed or self.session.is_complete:
             return
         
         # Get the text area content
-        text_area = event.text_area
-        new_text = text_area.text
+        new_text = event.text_area.text
         
-        # For simplicity in this line-based mode, prevent newlines in input if they aren't finishing the line?
-        # Actually, let's treat newlines as "submit line" or just ignore them until line is full?
-        # The prompt says: "when the colored letters are at the end of that line, a new line is inserted"
-        # This implies auto-advance when length is reached.
+        # Clearing the input after a line is not a key press
+        profiler = self.profiler
+        profiling = profiler is not None and bool(new_text or self.session.typed)
+        if profiling:
+            # A new message is stamped with the same clock as the event, so
+            # the difference is how long the event waited to be handled
+            profiler.key_started(Message().time - event.time)
         
         # Start timer on first character
         if new_text and not self.timer_started:
             self._start_timer()
+        elif self.timer_started:
+            self._note_key_press()
         
-        current_target_line = self.lines[self.current_line_idx]
-
-        # Handle mistakes counting
-        if len(new_text) > len(self.previous_current_typed_text):
-             # User typed a new character
-            char_position = len(self.previous_current_typed_text)
-            
-            # Only check if within bounds of target line
-            if char_position < len(current_target_line):
-                expected_char = current_target_line[char_position]
-                typed_char = new_text[char_position]
-                if expected_char != typed_char:
-                    self.mistakes += 1
-                    # Track specific character mistake
-                    self.char_mistakes[expected_char] = self.char_mistakes.get(expected_char, 0) + 1
-        
-        self.previous_current_typed_text = new_text
-        self.current_typed_text = new_text
+        # Feed the edit to the session as key events
+        with self._profile("session"):
+            self.session.apply_text(new_text)
+        self.mistakes = self.session.mistakes
         
         # Check if current line is complete
-        # We check if length >= target length.
-        if len(self.current_typed_text) >= len(current_target_line):
-            # Check accuracy of the line? 
-            # Usually typing trainers block you if you are wrong, or let you pass with errors.
-            # We will assume passing with errors is allowed, similar to original logic.
-            
+        # We assume passing with errors is allowed, similar to original logic.
+        if self.session.line_full:
             # Move to next line
             self._advance_line()
         else:
             self._update_display()
+        
+        if profiling:
+            profiler.key_handled()
+            self.call_after_refresh(profiler.painted)
 
     def _advance_line(self):
         """Advance to the next line."""
-        # Add current input to completed text
-        self.completed_text += self.current_typed_text
-        
-        # Move index
-        self.current_line_idx += 1
-        self.lines_left = len(self.lines) - self.current_line_idx
+        with self._profile("session"):
+            self.session.advance_line()
+        self.lines_left = self.session.lines_left
         
         # Clear input for next line
         text_area = self.query_one("#typing_input", TextArea)
-        text_area.text = "" # This might trigger on_text_area_changed again with empty text
+        text_area.text = "" # This triggers on_text_area_changed again with empty text, which is a no-op
         
-        # Reset current tracking
-        self.current_typed_text = ""
-        self.previous_current_typed_text = ""
-        
-        if self.current_line_idx >= len(self.lines):
+        if self.session.is_complete:
             self._complete_exercise()
         else:
              self._update_display()
@@ -318,37 +398,37 @@ class TypingView(Screen):
         if self.update_timer_callback:
             self.update_timer_callback.stop()
             self.update_timer_callback = None
+        self._stop_profiler()
+        
+        if self.ACCURACY_MODE == "alignment":
+            # Accumulated per line as the session went, so nothing spikes here
+            accuracy = self.session.alignment.accuracy
+        else:
+            # Same as calculate_accuracy on the joined lines, from running counters
+            accuracy = self.session.position_accuracy
         
-        # Reconstruct full exercise text for accuracy calc
-        # Note: self.completed_text contains what user typed. 
-        # But we skipped spaces/newlines between lines?
-        # Let's reconstruct target text from lines.
-        exercise_text = "".join(self.lines)
-        final_text = self.completed_text # This corresponds to joined lines
-        
-        accuracy = self.metrics_calculator.calculate_accuracy(
-            exercise_text,
-            final_text
-        )
-        
-        # Get top 3 most mistaken letters
-        sorted_mistakes = sorted(self.char_mistakes.items(), key=lambda x: x[1], reverse=True)
-        top_mistakes = []
-        for char, count in sorted_mistakes:
-            if char and (char == ' ' or char.strip()):
-                top_mistakes.append((char, count))
-                if len(top_mistakes) >= 3:
-                    break
+        # Get top 3 most mistaken letters over the whole session
+        top_mistakes = self.session.mistake_stats.top_total()
         
         # Switch to summary view
         results = {
             "exercise": self.exercise,
             "wpm": self.wpm,
             "accuracy": accuracy,
+            "alignment": self.session.alignment,
             "elapsed_time": self.elapsed_time,
             "mistakes": self.mistakes,
-            "top_mistake_letters": top_mistakes
+            "top_mistake_letters": top_mistakes,
+            "mistake_stats": self.session.mistake_stats,
+            "typed_chars": self.session.typed_chars,
+            "keystrokes": self.session.keylog
         }
+        
+        # Save to the history; the write happens on the history's own thread
+        history = getattr(self.app, "history", None)
+        if history is not None:
+            results["session_record"] = history.record_results(results)
+        
         summary_screen = SummaryView(results)
         self.app.push_screen(summary_screen)
     
@@ -358,8 +438,76 @@ class TypingView(Screen):
         keyboard_widget = self.query_one("#keyboard_layout", Static)
         keyboard_widget.display = self.show_finger_map
     
+    def action_toggle_profiler(self) -> None:
+        """Start or stop profiling key presses.
+        
+        While profiling, a live overlay shows input-to-paint latency, time
+        spent in each update stage and timer tick overruns. A trace file is
+        saved when profiling stops or the exercise ends.
+        """
+        if self.profiler is None:
+            self._start_profiler()
+        else:
+            self._stop_profiler()
+    
+    def _start_profiler(self) -> None:
+        """Time the update stages and show the profiler overlay."""
+        # Imported here so nothing is loaded unless profiling is used
+        from ..services.profiler import TypingProfiler
+        
+        profiler = self.profiler = TypingProfiler()
+        if self.update_timer_callback:
+            self._set_tick(self.idle_tick_seconds if self.idle else self.tick_seconds)
+        
+        self.mount(Static(profiler.format_overlay(), id="profiler_overlay"), before="#stats")
+        self._profiler_timer = self.set_interval(self.PROFILER_OVERLAY_SECONDS, self._refresh_profiler_overlay)
+    
+    def _refresh_profiler_overlay(self) -> None:
+        """Update the profiler overlay."""
+        if self.profiler is not None:
+            self.query_one("#profiler_overlay", Static).update(self.profiler.format_overlay())
+    
+    def _stop_profiler(self) -> None:
+        """Stop profiling, remove the overlay and save the trace."""
+        profiler = self.profiler
+        if profiler is None:
+            return
+        self.profiler = None
+        
+        if self.update_timer_callback:
+            self._set_tick(self.idle_tick_seconds if self.idle else self.tick_seconds)
+        if self._profiler_timer:
+            self._profiler_timer.stop()
+            self._profiler_timer = None
+        for overlay in self.query("#profiler_overlay"):
+            overlay.remove()
+        
+        # Count a key press still waiting for its paint as painted now
+        profiler.key_handled()
+        profiler.painted()
+        if profiler.keystroke_count:
+            self._save_trace(profiler)
+    
+    def _save_trace(self, profiler) -> None:
+        """Write a profiler trace and tell the user where it is."""
+        if self.TRACE_DIR:
+            trace_dir = Path(self.TRACE_DIR)
+        else:
+            from ..app import get_data_dir
+            trace_dir = get_data_dir() / "traces"
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+        path = trace_dir / f"{stamp}-{self.exercise.id}.json"
+        try:
+            profiler.dump(path, {"exercise": self.exercise.id, "layout": self.exercise.layout})
+        except OSError as e:
+            self.app.notify(f"Could not save the profiler trace: {e}", severity="warning")
+            return
+        self.app.notify(f"Profiler trace saved to {path}", timeout=10)
+    
     def action_back_to_menu(self) -> None:
         """Return to the menu."""
         if self.update_timer_callback:
             self.update_timer_callback.stop()
+        self._stop_profiler()
         self.app.pop_screen()